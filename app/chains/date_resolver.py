@@ -0,0 +1,242 @@
+# =================================================================================================
+#
+#                       RESOLVEDOR DETERMINÍSTICO DE PERÍODOS (DE/ATE)
+#
+# Visão Geral do Módulo:
+#
+# Datas são a parte mais sujeita a erro (e a mais cara em tokens) do `JSON_PARSER_PROMPT`.
+# Este módulo reconhece, em Python, as expressões de período em português e calcula DE/ATE
+# a partir do contexto de datas da requisição (`_get_current_dates`, em `master_chain.py`):
+#
+# 1. Expressões Reconhecidas:
+#    - Relativas do DICIONÁRIO DE VARIÁVEIS DE TEMPO: "hoje", "ontem", "última semana" /
+#      "semana passada", "esta semana", "este mês", "este semestre".
+#    - Outras relativas: "anteontem", "mês passado", "este ano", "ano passado",
+#      "últimos N dias", "últimas N semanas".
+#    - Explícitas: "22/10", "01/09/2025 até 10/09/2025", "entre 1 e 15 de setembro de 2025",
+#      "15 de setembro", "em setembro", "setembro de 2024", "no ano de 2024", "emitidas em 2024".
+#    - Um nome de mês sozinho só é data depois de "em", "de", "desde", "até" ou "durante", ou
+#      seguido de "de <ano>" (`MONTH_DATE_PATTERN`): "cliente Marco Aurelio" e "transportadora
+#      Maio Transportes" não são períodos.
+#    - Anos isolados só contam entre 1900 e 2099 e depois de "ano" ou de um evento de data
+#      ("emitidas em 2024"): "valor acima de 2000" e "NF de 1234" não são períodos.
+#
+# 2. Segurança:
+#    - Expressões de performance de prazo ("previsto para hoje", "previstas para amanhã",
+#      "previsto para daqui a 2 dias") são do `StatusAnaliseData` e NÃO são períodos: são
+#      descartadas antes da extração. Sem "previsto", "agenda para hoje" continua sendo período.
+#    - Se a pergunta tiver dois períodos diferentes, o resolvedor não decide (retorna None).
+#    - Se houver número de NF, os demais campos são null (regra de negócio) e nada é alterado.
+#
+# 3. Aplicação:
+#    - O DE/ATE resolvido sobrescreve o do LLM. Cada divergência é contada e registrada em log.
+#    - Os valores de Cliente e Transportadora extraídos pelo LLM são retirados da pergunta antes
+#      da resolução: uma data dentro de um nome ("de Maio Transportes") nunca sobrescreve DE/ATE.
+#
+# =================================================================================================
+
+import calendar
+import logging
+import re
+import threading
+from datetime import date, timedelta
+from typing import Optional, Tuple
+
+from app.prompts.vocabulary import normalize_text
+
+logger = logging.getLogger(__name__)
+
+MONTHS = {
+    "janeiro": 1, "fevereiro": 2, "marco": 3, "abril": 4, "maio": 5, "junho": 6,
+    "julho": 7, "agosto": 8, "setembro": 9, "outubro": 10, "novembro": 11, "dezembro": 12,
+}
+_MONTH = "(" + "|".join(MONTHS) + ")"
+_NUMERIC_DATE = r"(\d{1,2}/\d{1,2}(?:/\d{2,4})?)"
+_THIS = r"(?:este|esse|neste|nesse|deste|desse|esta|essa|nesta|nessa|desta|dessa)"
+_YEAR = r"((?:19|20)\d{2})"
+
+# Nome de mês usado como data: após uma preposição/palavra de data ou seguido de "de <ano>".
+_MONTH_AS_DATE = (
+    r"\b(?:(?<=\bem )|(?<=\bde )|(?<=\bdesde )|(?<=\bate )|(?<=\bdurante )|(?=\w+\s+de\s+\d{4}\b))" + _MONTH
+)
+
+# Menção a mês como data, sobre o texto normalizado (também usada pelo cache e pelo roteador).
+MONTH_DATE_PATTERN = re.compile(_MONTH_AS_DATE + r"\b")
+
+# Campos do JSON com nomes próprios, retirados da pergunta antes da resolução.
+_NAME_FIELDS = ("Cliente", "Transportadora")
+
+# Eventos de data que, seguidos de "em"/"de" + ano, indicam um período ("emitidas em 2024").
+_DATE_EVENT = r"(?:emitid[ao]s?|emissao|entregues?|entregad[ao]s?|entrega|agendad[ao]s?|agenda|baixad[ao]s?|previst[ao]s?|previsao|periodo|durante)"
+
+# Expressões de performance de prazo (StatusAnaliseData), removidas antes da extração.
+_PERFORMANCE_PATTERN = re.compile(
+    r"\b(?:com )?(?:entrega )?previst[ao]s? para (?:hoje|amanha|o dia seguinte|dia seguinte|daqui a (?:2|dois) dias)\b"
+)
+
+
+def _parse_numeric(text: str, today: date) -> date:
+    """
+    Converte "dd/mm", "dd/mm/aa" ou "dd/mm/aaaa" em data (ano atual se omitido).
+    """
+    parts = [int(part) for part in text.split("/")]
+    year = parts[2] if len(parts) > 2 else today.year
+    if year < 100:
+        year += 2000
+    return date(_year_of(str(year), today), parts[1], parts[0])
+
+
+def _month_range(year: int, month: int) -> Tuple[date, date]:
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def _year_of(text: Optional[str], today: date) -> int:
+    """
+    Ano informado (ou o atual). Anos fora de 1900-2099 levantam ValueError (o LLM decide).
+    """
+    if not text:
+        return today.year
+    if not 1900 <= int(text) <= 2099:
+        raise ValueError(f"Ano fora do intervalo aceito: {text}")
+    return int(text)
+
+
+# Regras de extração, em ordem de prioridade. Cada uma é (padrão, função que recebe
+# (match, today, dates) e devolve (DE, ATE) como datas ou como chaves do contexto de datas).
+# O trecho reconhecido é removido da frase antes das regras seguintes.
+_RULES = (
+    # Faixas explícitas: "de 01/09/2025 até 10/09/2025", "entre 01/09 e 10/09".
+    (
+        rf"(?:\b(?:de|entre|desde|do dia)\s+)?{_NUMERIC_DATE}\s+(?:ate|a|e|ao dia)\s+{_NUMERIC_DATE}",
+        lambda m, today, dates: (_parse_numeric(m.group(1), today), _parse_numeric(m.group(2), today)),
+    ),
+    # Faixas de dias no mês: "entre 1 e 15 de setembro de 2025", "do dia 1 ao dia 15 de setembro".
+    (
+        rf"\b(?:(?:entre|de|do|dos)\s+)?(?:(?:os\s+|o\s+)?dias?\s+)?(\d{{1,2}})\s+(?:e|a|ate|ao)\s+(?:(?:o\s+)?dia\s+)?(\d{{1,2}})\s+de\s+{_MONTH}(?:\s+de\s+(\d{{4}}))?",
+        lambda m, today, dates: (
+            date(_year_of(m.group(4), today), MONTHS[m.group(3)], int(m.group(1))),
+            date(_year_of(m.group(4), today), MONTHS[m.group(3)], int(m.group(2))),
+        ),
+    ),
+    # Dia explícito: "15 de setembro de 2025", "dia 15 de setembro".
+    (
+        rf"\b(?:dia\s+)?(\d{{1,2}})\s+de\s+{_MONTH}(?:\s+de\s+(\d{{4}}))?",
+        lambda m, today, dates: (date(_year_of(m.group(3), today), MONTHS[m.group(2)], int(m.group(1))),) * 2,
+    ),
+    # Data numérica isolada: "22/10", "22/10/2025".
+    (
+        rf"(?<![\w/]){_NUMERIC_DATE}(?![\w/])",
+        lambda m, today, dates: (_parse_numeric(m.group(1), today),) * 2,
+    ),
+    # Mês inteiro: "em setembro", "setembro de 2024" (mês solto não é período).
+    (
+        rf"{_MONTH_AS_DATE}(?:\s+de\s+(\d{{4}}))?\b",
+        lambda m, today, dates: _month_range(_year_of(m.group(2), today), MONTHS[m.group(1)]),
+    ),
+    # Últimos N dias / últimas N semanas (incluindo hoje).
+    (
+        r"\bultimos\s+(\d{1,3})\s+dias\b",
+        lambda m, today, dates: (today - timedelta(days=int(m.group(1)) - 1), today),
+    ),
+    (
+        r"\bultimas\s+(\d{1,2})\s+semanas\b",
+        lambda m, today, dates: (today - timedelta(days=7 * int(m.group(1)) - 1), today),
+    ),
+    # Períodos do DICIONÁRIO DE VARIÁVEIS DE TEMPO (chaves do contexto de datas).
+    (r"\b(?:ult(?:ima)?\s+sem(?:ana)?|semana\s+passada)\b", lambda m, today, dates: ("last_week_start", "last_week_end")),
+    (rf"\b{_THIS}\s+semana\b", lambda m, today, dates: ("week_start", "week_end")),
+    (rf"\b{_THIS}\s+mes\b", lambda m, today, dates: ("month_start", "month_end")),
+    (rf"\b{_THIS}\s+semestre\b", lambda m, today, dates: ("semester_start", "semester_end")),
+    (r"\banteontem\b", lambda m, today, dates: (today - timedelta(days=2),) * 2),
+    (r"\bontem\b", lambda m, today, dates: ("yesterday", "yesterday")),
+    (r"\bhoje\b", lambda m, today, dates: ("today", "today")),
+    # Outros períodos relativos.
+    (
+        r"\b(?:mes\s+passado|ultimo\s+mes)\b",
+        lambda m, today, dates: _month_range(*((today.year, today.month - 1) if today.month > 1 else (today.year - 1, 12))),
+    ),
+    (rf"\b{_THIS}\s+ano\b", lambda m, today, dates: (date(today.year, 1, 1), date(today.year, 12, 31))),
+    (r"\bano\s+passado\b", lambda m, today, dates: (date(today.year - 1, 1, 1), date(today.year - 1, 12, 31))),
+    # Ano inteiro: "no ano de 2024", "ano 2024", "emitidas em 2024".
+    (
+        rf"\b(?:(?:no\s+)?ano\s+(?:de\s+)?|{_DATE_EVENT}\s+(?:em|de|no\s+ano\s+de)\s+){_YEAR}\b",
+        lambda m, today, dates: (date(int(m.group(1)), 1, 1), date(int(m.group(1)), 12, 31)),
+    ),
+)
+_COMPILED_RULES = tuple((re.compile(pattern), build) for pattern, build in _RULES)
+
+
+class DateResolver:
+    """
+    Extrai o período (DE, ATE) da pergunta e o aplica ao JSON de filtros do LLM.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.resolved = 0
+        self.unresolved = 0
+        self.ambiguous = 0
+        self.overrides = 0
+
+    def resolve(self, query: str, dates: dict) -> Optional[Tuple[str, str]]:
+        """
+        Retorna (DE, ATE) no formato AAAA-MM-DD, ou None se não houver período
+        reconhecido ou se houver mais de um período diferente.
+        """
+        text = _PERFORMANCE_PATTERN.sub(" ", normalize_text(query))
+        today = date.fromisoformat(dates["today"])
+        periods = set()
+        for pattern, build in _COMPILED_RULES:
+            for match in pattern.finditer(text):
+                try:
+                    start, end = build(match, today, dates)
+                except ValueError:
+                    # Data inexistente (ex: 31/02): deixa a decisão para o LLM.
+                    return None
+                start = dates[start] if isinstance(start, str) else start.isoformat()
+                end = dates[end] if isinstance(end, str) else end.isoformat()
+                periods.add((start, end))
+            text = pattern.sub(" ", text)
+        if len(periods) != 1:
+            if periods:
+                with self._lock:
+                    self.ambiguous += 1
+            return None
+        return periods.pop()
+
+    def apply(self, query: str, dates: dict, parsed_json):
+        """
+        Sobrescreve DE/ATE do JSON de filtros com o período resolvido, quando houver. Os
+        nomes de Cliente e Transportadora do JSON não participam da resolução.
+        """
+        if not isinstance(parsed_json, dict) or parsed_json.get("NF") is not None:
+            return parsed_json
+        text = normalize_text(query)
+        for field in _NAME_FIELDS:
+            name = normalize_text(parsed_json.get(field)) if isinstance(parsed_json.get(field), str) else ""
+            if name:
+                text = text.replace(name, " ")
+        period = self.resolve(text, dates)
+        if period is None:
+            with self._lock:
+                self.unresolved += 1
+            return parsed_json
+        de, ate = period
+        overridden = (parsed_json.get("DE"), parsed_json.get("ATE")) != (de, ate)
+        with self._lock:
+            self.resolved += 1
+            self.overrides += overridden
+        if overridden:
+            logger.info(
+                f"Resolvedor de datas corrigiu DE/ATE de ({parsed_json.get('DE')}, {parsed_json.get('ATE')}) "
+                f"para ({de}, {ate}) na query: '{query[:50]}'"
+            )
+        return {**parsed_json, "DE": de, "ATE": ate}
+
+    def stats(self) -> dict:
+        return {
+            "resolved": self.resolved,
+            "unresolved": self.unresolved,
+            "ambiguous": self.ambiguous,
+            "llm_overrides": self.overrides,
+        }
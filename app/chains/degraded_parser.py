@@ -0,0 +1,100 @@
+# =================================================================================================
+#
+#                       PARSER DEGRADADO (SEM LLM, PARA INCIDENTES DOS PROVEDORES)
+#
+# Visão Geral do Módulo:
+#
+# Quando nenhum provedor de LLM está disponível (circuitos abertos, rate limit, timeout), o
+# serviço ainda devolve um filtro útil em vez de um erro 500. Este parser é deliberadamente
+# conservador e só preenche o que reconhece por palavra-chave:
+#
+# 1. Campos do Caminho Rápido (`FastPathParser.extract`): NF, CNPJRaizTransp, Operacao,
+#    UFDestino e SituacaoNF, sem a exigência de confiança total.
+# 2. Conceitos de Negócio (`CONCEPT_PATTERN`):
+#    - StatusAnaliseData: "com atraso", "previsto para amanhã", "daqui a 2 dias", "futuro".
+#    - TipoData: o evento de data ("entregues", "emitidas"...), apenas quando há um período.
+#    - Ordenação por valor: "maior valor" / "mais barato".
+#    - Perguntas com negação ("não", "exceto") não recebem SituacaoNF/StatusAnaliseData.
+# 3. Período (`DateResolver.resolve`): DE/ATE calculados em Python.
+#
+# O resultado é marcado pelo chamador com o caminho 'degraded' (ver `master_chain.py`).
+#
+# =================================================================================================
+
+import threading
+
+from app.chains.date_resolver import DateResolver
+from app.chains.fast_path import FastPathParser
+from app.prompts.vocabulary import CONCEPT_PATTERN, FILTER_FIELDS, TIPO_DATA, normalize_text
+
+# Conceito -> StatusAnaliseData.
+_STATUS_BY_CONCEPT = {
+    "atraso": "ATRASO",
+    "dia_seguinte": "DIA SEGUINTE",
+    "dois_dias": "PREVISTO PARA 2 DIAS",
+    "futuro": "FUTURO",
+}
+
+# Conceito -> evento de data (chave de `TIPO_DATA`).
+_EVENT_BY_CONCEPT = {
+    "agenda": "agenda",
+    "entregue": "entregue",
+    "emitido": "emitido",
+    "previsto": "previsto",
+    "previsao_real": "previsão real",
+    "baixada": "baixada",
+}
+
+
+class DegradedParser:
+    """
+    Interpretação por palavras-chave, usada apenas quando o caminho com LLM falha.
+    """
+
+    def __init__(self, date_resolver: DateResolver):
+        self.date_resolver = date_resolver
+        self._lock = threading.Lock()
+        self.served = 0
+        self.empty = 0
+
+    def parse(self, query: str, dates: dict) -> dict:
+        """
+        Retorna o JSON de filtros completo (todos os campos, null nos não reconhecidos).
+        """
+        found = FastPathParser.extract(query)
+        if "NF" not in found:
+            concepts = {match.lastgroup for match in CONCEPT_PATTERN.finditer(normalize_text(query))}
+            negated = "negacao" in concepts
+            if negated:
+                found.pop("SituacaoNF", None)
+
+            statuses = {_STATUS_BY_CONCEPT[name] for name in concepts if name in _STATUS_BY_CONCEPT}
+            if len(statuses) == 1 and not negated:
+                found["StatusAnaliseData"] = statuses.pop()
+
+            period = self.date_resolver.resolve(query, dates)
+            if period is not None:
+                found["DE"], found["ATE"] = period
+                # "previsto" ao lado de um status de prazo ("previsto para amanhã") não é evento de data.
+                events = {_EVENT_BY_CONCEPT[name] for name in concepts if name in _EVENT_BY_CONCEPT}
+                if "StatusAnaliseData" in found:
+                    events.discard("previsto")
+                if len(events) == 1:
+                    found["TipoData"] = TIPO_DATA[events.pop()]
+
+            if "valor" in concepts and ("desc" in concepts) != ("asc" in concepts):
+                found["SortColumn"] = "valor_nf"
+                found["SortDirection"] = "DESC" if "desc" in concepts else "ASC"
+        else:
+            found = {"NF": found["NF"]}
+
+        with self._lock:
+            if found:
+                self.served += 1
+            else:
+                self.empty += 1
+        return {field: found.get(field) for field in FILTER_FIELDS}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"served": self.served, "empty": self.empty}
@@ -0,0 +1,164 @@
+# =================================================================================================
+#
+#                       PROMPT DINÂMICO DO PARSER (SELEÇÃO DE EXEMPLOS E SEÇÕES)
+#
+# Visão Geral do Módulo:
+#
+# O `parser_template` envia, em TODA chamada, cerca de 200 linhas de regras e todos os exemplos
+# do banco. Tokens de prompt custam latência e consomem o limite de tokens por minuto do provedor
+# (o mesmo limite que obrigou a desativação do Chain of Thought). Este módulo monta, para cada
+# requisição, um prompt menor:
+#
+# 1. Seleção de Exemplos (BM25):
+#    - O banco `PARSER_EXAMPLES` é indexado localmente com BM25. Os termos de cada texto são as
+#      palavras normalizadas (sem acento) mais os conceitos de negócio encontrados
+#      (`CONCEPT_PATTERN`), para que "rodando" e "em trânsito" recuperem os mesmos exemplos.
+#    - Apenas os k exemplos mais relevantes para a pergunta normalizada entram no prompt,
+#      na ordem original do banco.
+#
+# 2. Seções Opcionais:
+#    - Seções de regras de `PARSER_OPTIONAL_SECTIONS` (ordenação, operação, localização) só são
+#      enviadas quando a pergunta tem um gatilho da entidade correspondente.
+#
+# 3. Métricas:
+#    - Tokens de prompt por requisição (estimativa de ~4 caracteres por token, sem tokenizador
+#      local) comparados com o prompt estático equivalente, e a economia acumulada. O tamanho do
+#      prompt estático é medido uma vez por contexto de datas (só a pergunta varia entre as
+#      requisições do dia), sem renderizá-lo a cada requisição.
+#
+# =================================================================================================
+
+import logging
+import math
+import re
+import threading
+from collections import Counter
+
+from app.prompts.filter_prompts import PARSER_EXAMPLES, PARSER_OPTIONAL_SECTIONS, render_parser_examples
+from app.prompts.vocabulary import CONCEPT_PATTERN, normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Marcadores que delimitam a lista de exemplos em qualquer variante do `parser_template`.
+EXAMPLES_MARKER = "Exemplos:\n---\n"
+CLOSING_MARKER = "\nAgora, analise o seguinte texto."
+
+# Caracteres por token na estimativa (sem tokenizador local).
+CHARS_PER_TOKEN = 4
+
+# Parâmetros clássicos do BM25.
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimativa de tokens (~4 caracteres por token), suficiente para comparar prompts.
+    """
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _terms(text: str) -> list:
+    """
+    Termos indexados: palavras normalizadas mais os conceitos de negócio (prefixados com '#').
+    """
+    normalized = normalize_text(text)
+    return normalized.split() + [f"#{match.lastgroup}" for match in CONCEPT_PATTERN.finditer(normalized)]
+
+
+class DynamicParserPrompt:
+    """
+    Monta o prompt do Parser por requisição a partir de um template base (completo, esparso
+    ou estruturado), com os k exemplos mais relevantes e apenas as seções necessárias.
+    """
+
+    def __init__(self, base_template: str, sparse: bool = False, k: int = 4):
+        self.rules, rest = base_template.split(EXAMPLES_MARKER, 1)
+        self.closing = rest[rest.index(CLOSING_MARKER):]
+        self.static_template = base_template
+        self.sparse = sparse
+        self.k = max(1, k)
+
+        # Índice BM25 do banco de exemplos.
+        self._documents = [Counter(_terms(text)) for text, _ in PARSER_EXAMPLES]
+        self._lengths = [sum(doc.values()) for doc in self._documents]
+        self._average_length = sum(self._lengths) / len(self._lengths)
+        frequency = Counter(term for doc in self._documents for term in doc)
+        total = len(self._documents)
+        self._idf = {term: math.log(1 + (total - n + 0.5) / (n + 0.5)) for term, n in frequency.items()}
+
+        self._lock = threading.Lock()
+        self._static_length = (None, 0)
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.static_tokens = 0
+
+    def _score(self, query_terms: Counter, index: int) -> float:
+        doc, length = self._documents[index], self._lengths[index]
+        score = 0.0
+        for term in query_terms:
+            tf = doc.get(term, 0)
+            if tf:
+                norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / self._average_length)
+                score += self._idf[term] * tf * (BM25_K1 + 1) / norm
+        return score
+
+    def select_examples(self, query: str) -> list:
+        """
+        Retorna os k exemplos do banco mais relevantes para a pergunta, na ordem do banco.
+        """
+        query_terms = Counter(_terms(query))
+        ranked = sorted(range(len(PARSER_EXAMPLES)), key=lambda i: (-self._score(query_terms, i), i))
+        return [PARSER_EXAMPLES[i] for i in sorted(ranked[:self.k])]
+
+    def template_for(self, query: str) -> str:
+        """
+        Template do Parser para a pergunta: regras sem as seções opcionais não acionadas,
+        exemplos selecionados e o fechamento original.
+        """
+        normalized = normalize_text(query)
+        rules = self.rules
+        for _, section, trigger in PARSER_OPTIONAL_SECTIONS:
+            if not re.search(trigger, normalized):
+                rules = re.sub(section, "", rules, flags=re.DOTALL)
+        examples = render_parser_examples(self.select_examples(query), sparse=self.sparse)
+        return rules + EXAMPLES_MARKER + examples + self.closing
+
+    def _static_tokens(self, inputs: dict) -> int:
+        """
+        Tokens do prompt estático equivalente: o tamanho do template renderizado sem a pergunta
+        (medido uma vez por contexto de datas) mais o tamanho da pergunta.
+        """
+        query = inputs["enhanced_query"]
+        context = tuple(sorted((name, value) for name, value in inputs.items() if name != "enhanced_query"))
+        with self._lock:
+            cached_context, length = self._static_length
+        if cached_context != context:
+            length = len(self.static_template.format(**{**inputs, "enhanced_query": ""}))
+            with self._lock:
+                self._static_length = (context, length)
+        return math.ceil((length + len(query)) / CHARS_PER_TOKEN)
+
+    def format(self, inputs: dict) -> str:
+        """
+        Formata o prompt dinâmico com as variáveis do Parser ('enhanced_query' e as datas),
+        registrando os tokens enviados e os do prompt estático equivalente.
+        """
+        prompt = self.template_for(inputs["enhanced_query"]).format(**inputs)
+        prompt_tokens = estimate_tokens(prompt)
+        static_tokens = self._static_tokens(inputs)
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += prompt_tokens
+            self.static_tokens += static_tokens
+        logger.info(f"Prompt dinâmico do Parser: ~{prompt_tokens} tokens (estático: ~{static_tokens}).")
+        return prompt
+
+    def stats(self) -> dict:
+        return {
+            "k": self.k,
+            "requests": self.requests,
+            "avg_prompt_tokens": round(self.prompt_tokens / self.requests, 1) if self.requests else 0.0,
+            "avg_static_prompt_tokens": round(self.static_tokens / self.requests, 1) if self.requests else 0.0,
+            "token_savings_rate": round(1 - self.prompt_tokens / self.static_tokens, 4) if self.static_tokens else 0.0,
+        }
@@ -0,0 +1,151 @@
+# =================================================================================================
+#
+#                               CAMINHO RÁPIDO DETERMINÍSTICO (SEM LLM)
+#
+# Visão Geral do Módulo:
+#
+# Boa parte do tráfego é trivialmente estruturada: "nota 123456", "NF 998877", "notas para SP",
+# "transportadora CNPJ 12345678", "notas em trânsito". Este módulo é um pré-parser baseado em
+# regras (expressões regulares + tabelas do `app/prompts/vocabulary.py`) que roda ANTES das
+# cadeias de LLM:
+#
+# 1. Reconhecedores:
+#    - NF: número após "nota", "nf", "nota fiscal"...
+#    - CNPJRaizTransp: raiz de 8 dígitos após "cnpj" (CNPJ completo é reduzido à raiz).
+#    - UFDestino: sigla da lista oficial após "para", "destino", "estado de"...
+#    - Operacao: códigos exatos (ex: "OutBound-SPO").
+#    - SituacaoNF: "em trânsito"/"rodando"/"a caminho", "retidas"/"bloqueadas",
+#      "status entregue"/"situação logística entregue".
+#
+# 2. Confiança Total:
+#    - Cada trecho reconhecido é removido da frase. O que sobrar precisa ser composto
+#      APENAS por palavras de preenchimento ("me mostre as notas que estão...").
+#    - Qualquer palavra desconhecida, negação, ou dois valores para o mesmo campo
+#      (ex: "rodando e retidas", ambiguidade que o LLM deve resolver) faz a pergunta
+#      seguir para as cadeias de LLM normalmente.
+#
+# 3. Regras de Negócio:
+#    - Se um número de NF for encontrado, todos os outros campos são null (prioridade absoluta).
+#
+# =================================================================================================
+
+import re
+from typing import Optional
+
+from app.prompts.vocabulary import FILTER_FIELDS, OPERACOES, UF_SIGLAS, normalize_text
+
+# Palavras que não carregam nenhum filtro e podem ser ignoradas com segurança.
+FILLER_WORDS = frozenset({
+    "me", "mostre", "mostra", "mostrar", "liste", "lista", "listar", "exiba", "exibir", "traga",
+    "busque", "buscar", "procure", "ver", "veja", "quero", "quais", "qual", "sao", "tem", "existem",
+    "a", "o", "as", "os", "de", "do", "da", "dos", "das", "para", "com", "que", "em", "no", "na",
+    "estao", "esta", "foram", "e", "todas", "todos", "nota", "notas", "fiscal", "fiscais", "nf", "nfs",
+    "operacao", "operacoes", "tipo", "situacao", "status", "atual", "atualmente", "por", "favor",
+})
+
+_NF_PATTERN = re.compile(
+    r"\b(?:numero (?:da |de )?)?(?:notas? fisca(?:l|is)|notas?|nfs?|nf-e|nfe)"
+    r"(?: (?:de )?(?:numero|n|no))? (\d{1,9})\b"
+)
+_CNPJ_PATTERN = re.compile(
+    r"(?:\b(?:d[ao] )?transportadora (?:de |com )?(?:o )?)?\bcnpj(?: raiz)?(?: d[ao] transportadora)?(?: de)? "
+    r"(\d{2})\.?(\d{3})\.?(\d{3})(?:/?\d{4}-?\d{2})?(?![\w/])"
+)
+_UF_PATTERN = re.compile(
+    r"\b(?:para|pra|destino|com destino (?:a|ao|para)|(?:no |do )?estado(?: de| do| da)?|uf)"
+    r"(?: o| a)? (" + "|".join(uf.lower() for uf in UF_SIGLAS) + r")\b"
+)
+_OPERACAO_PATTERN = re.compile(
+    r"(?<![\w.-])(" + "|".join(re.escape(op.lower()) for op in OPERACOES) + r")(?![\w.-])"
+)
+_SITUACAO_PATTERNS = (
+    (re.compile(r"\b(?:em transito|transito|rodando|viajando|a caminho)\b"), "TRÂNSITO"),
+    (re.compile(r"\b(?:retidas?|bloqueadas?|paradas? na fiscalizacao)\b"), "RETIDA"),
+    (re.compile(r"\b(?:situacao logistica|status)(?: de)? entregues?\b"), "ENTREGUE"),
+)
+
+_OPERACOES_BY_LOWER = {op.lower(): op for op in OPERACOES}
+
+# Reconhecedores, na ordem de aplicação: (padrão, campo, conversão do match em valor).
+_STEPS = (
+    (_CNPJ_PATTERN, "CNPJRaizTransp", lambda m: "".join(m.groups())),
+    (_NF_PATTERN, "NF", lambda m: int(m.group(1))),
+    (_OPERACAO_PATTERN, "Operacao", lambda m: _OPERACOES_BY_LOWER[m.group(1)]),
+    (_UF_PATTERN, "UFDestino", lambda m: m.group(1).upper()),
+) + tuple((pattern, "SituacaoNF", lambda m, v=value: v) for pattern, value in _SITUACAO_PATTERNS)
+
+
+class FastPathParser:
+    """
+    Pré-parser determinístico. Retorna o JSON de filtros completo quando tem confiança
+    total na interpretação, ou None para que a pergunta siga para o LLM.
+    """
+
+    def __init__(self):
+        self.served = 0
+        self.fallthrough = 0
+
+    @staticmethod
+    def _collect(pattern, text: str, found: dict, field: str, convert) -> Optional[str]:
+        """
+        Registra em `found[field]` os valores encontrados por `pattern` e remove os trechos
+        reconhecidos do texto. Retorna None se o campo receber dois valores diferentes.
+        """
+        for match in pattern.finditer(text):
+            value = convert(match)
+            if found.get(field, value) != value:
+                return None
+            found[field] = value
+        return pattern.sub(" ", text)
+
+    def _interpret(self, query: str) -> Optional[dict]:
+        text = normalize_text(query)
+        found: dict = {}
+        for pattern, field, convert in _STEPS:
+            text = self._collect(pattern, text, found, field, convert)
+            if text is None:
+                return None
+
+        # Confiança total: nada além de palavras de preenchimento pode sobrar.
+        if not found or any(word not in FILLER_WORDS for word in text.split()):
+            return None
+
+        # Regra de negócio: NF tem prioridade absoluta e anula os demais filtros.
+        if "NF" in found:
+            found = {"NF": found["NF"]}
+        return {field: found.get(field) for field in FILTER_FIELDS}
+
+    @staticmethod
+    def extract(query: str) -> dict:
+        """
+        Reconhecimento SEM a exigência de confiança total (usado pelo modo degradado): devolve
+        apenas os campos reconhecidos, ignorando o resto da frase. Campos que receberam dois
+        valores diferentes ficam de fora.
+        """
+        text = normalize_text(query)
+        found, conflicts = {}, set()
+        for pattern, field, convert in _STEPS:
+            for match in pattern.finditer(text):
+                if found.setdefault(field, convert(match)) != convert(match):
+                    conflicts.add(field)
+            text = pattern.sub(" ", text)
+        return {field: value for field, value in found.items() if field not in conflicts}
+
+    def parse(self, query: str) -> Optional[dict]:
+        """
+        Tenta interpretar a pergunta sem LLM, atualizando os contadores de uso.
+        """
+        result = self._interpret(query)
+        if result is None:
+            self.fallthrough += 1
+        else:
+            self.served += 1
+        return result
+
+    def stats(self) -> dict:
+        total = self.served + self.fallthrough
+        return {
+            "served": self.served,
+            "fallthrough": self.fallthrough,
+            "served_rate": round(self.served / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,278 @@
+# =================================================================================================
+#
+#                       VALIDADOR E NORMALIZADOR DO JSON DE FILTROS (PÓS-PARSER)
+#
+# Visão Geral do Módulo:
+#
+# O LLM às vezes devolve valores "quase certos" ("EM TRÂNSITO" em vez de "TRÂNSITO", "ATRASADO"
+# em vez de "ATRASO", "Outbound-SPO" em vez de "OutBound-SPO"). A procedure `SP_TK_NOTAS_AI_HOM`
+# compara esses campos por igualdade: um valor fora da lista não casa com nada, e o resultado
+# é uma lista vazia (ou uma nova tentativa). Este módulo corrige o JSON em Python, sem LLM:
+#
+# 1. Campos de Lista (`StatusAnaliseData`, `SituacaoNF`, `Operacao`, `UFDestino`, `TipoData`,
+#    `SortColumn`, `SortDirection`):
+#    - O valor é comparado sem acentos, maiúsculas e pontuação com os valores de `vocabulary.py`.
+#    - Sem igualdade exata, tenta-se um valor contido na resposta como palavra inteira
+#      ("EM TRANSITO" -> "TRÂNSITO") e, por fim, a distância de edição ("ATRASADO" -> "ATRASO").
+#    - `UFDestino` também aceita o nome do estado ("São Paulo" -> "SP"), `TipoData` o nome do
+#      evento ("entregue" -> "2") e `SortDirection` a direção por extenso ("decrescente" -> "DESC").
+#    - Um valor que não se aproxima de nenhum da lista vira null (filtro descartado), assim como
+#      um valor negado ("NÃO ENTREGUE") ou ambíguo (dois valores aceitos igualmente próximos).
+#
+# 2. NF e Regras de Negócio:
+#    - `NF` é inteiro, como em `FilterSchema`: "123" ou "123.456" viram 123 / 123456; um valor
+#      não numérico vira null (filtro descartado, registrado em log).
+#    - Consulta por NF: todos os outros campos são null.
+#    - `SortDirection` é null quando `SortColumn` é null.
+#
+# 3. Datas (`DE`, `ATE`):
+#    - Convertidas para AAAA-MM-DD a partir de "DD/MM/AAAA", "AAAA/MM/DD", "AAAAMMDD" ou com
+#      horário ("2025-09-01T00:00:00"). Datas impossíveis viram null.
+#
+# Cada correção é contada por tipo e por campo (ver `stats`). As comparações são memorizadas,
+# então o custo por requisição fica na casa dos microssegundos.
+#
+# =================================================================================================
+
+import logging
+import re
+import threading
+from collections import Counter
+from datetime import date
+from functools import lru_cache
+from typing import Optional
+
+from app.prompts.vocabulary import (
+    FILTER_FIELDS, OPERACOES, SITUACOES_NF, SORT_COLUMNS, SORT_DIRECTIONS, STATUS_ANALISE, TIPO_DATA, UF_NOMES,
+    UF_SIGLAS, strip_accents,
+)
+
+logger = logging.getLogger(__name__)
+
+# Valores aceitos por campo de lista, com os sinônimos aceitos (forma -> valor aceito).
+ENUM_FIELDS = {
+    "StatusAnaliseData": {value: value for value in STATUS_ANALISE},
+    "SituacaoNF": {value: value for value in SITUACOES_NF},
+    "Operacao": {value: value for value in OPERACOES},
+    "UFDestino": {**{value: value for value in UF_SIGLAS}, **UF_NOMES},
+    "TipoData": {**{code: code for code in TIPO_DATA.values()}, **TIPO_DATA},
+    "SortColumn": {value: value for value in SORT_COLUMNS},
+    "SortDirection": {
+        **{value: value for value in SORT_DIRECTIONS},
+        "ascending": "ASC", "crescente": "ASC", "descending": "DESC", "decrescente": "DESC",
+    },
+}
+
+_DATE_FORMATS = (
+    (re.compile(r"^(\d{4})-(\d{1,2})-(\d{1,2})"), (1, 2, 3)),
+    (re.compile(r"^(\d{4})/(\d{1,2})/(\d{1,2})$"), (1, 2, 3)),
+    (re.compile(r"^(\d{1,2})[/.-](\d{1,2})[/.-](\d{4})$"), (3, 2, 1)),
+    (re.compile(r"^(\d{4})(\d{2})(\d{2})$"), (1, 2, 3)),
+)
+
+
+def _key(value: str) -> str:
+    """
+    Forma de comparação: sem acentos, minúsculas e apenas letras, dígitos e espaços.
+    Ex: "OutBound-BAR-MAT.PRIMA" -> "outbound bar mat prima".
+    """
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", strip_accents(value).casefold()).split())
+
+
+def _edit_distance(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+# Formas de comparação de cada campo: {campo: ((forma, valor aceito), ...)}, com as formas mais
+# longas primeiro (prioridade na busca por valor contido).
+_FIELD_KEYS = {
+    field: tuple(sorted(((_key(form), value) for form, value in forms.items()), key=lambda item: -len(item[0])))
+    for field, forms in ENUM_FIELDS.items()
+}
+
+
+# Negações: "NÃO ENTREGUE" não é "ENTREGUE". Um valor negado não se aproxima de nenhum aceito.
+_NEGATION_TOKENS = {"nao", "sem", "exceto"}
+
+# Preposições que o LLM às vezes deixa antes da UF ("para SP", "pra SP", "de SP").
+_UF_PREPOSITION_PATTERN = re.compile(r"^(?:(?:para|pra|pro|de|do|da|em|no|na)\s+)+")
+
+# Formas que também são palavras comuns ("para") ficam de fora da busca por valor contido.
+_NON_CONTAINABLE_FORMS = {"para"}
+
+
+@lru_cache(maxsize=1024)
+def snap_value(field: str, value: str) -> Optional[str]:
+    """
+    Aproxima `value` de um valor aceito do campo. Retorna None se nenhum for próximo o bastante,
+    se o valor for negado ou se mais de um valor aceito for igualmente próximo.
+    """
+    key = _key(value)
+    if not key:
+        return None
+    candidates = _FIELD_KEYS[field]
+    for form, accepted in candidates:
+        if key == form:
+            return accepted
+    if _NEGATION_TOKENS & set(key.split()):
+        return None
+    if field == "UFDestino":
+        key = _UF_PREPOSITION_PATTERN.sub("", key)
+        for form, accepted in candidates:
+            if key == form:
+                return accepted
+    # Valor aceito contido na resposta como palavra inteira ("em transito" -> "transito").
+    # Siglas de UF (2 letras) ficam de fora: "para sp" é melhor tratado pela distância. Formas
+    # contidas em outra forma encontrada ("mato grosso" em "mato grosso do sul") não contam.
+    contained = [
+        (form, accepted) for form, accepted in candidates
+        if len(form) > 2 and form not in _NON_CONTAINABLE_FORMS and re.search(rf"\b{re.escape(form)}\b", key)
+    ]
+    contained = {
+        accepted for form, accepted in contained
+        if not any(form != other and re.search(rf"\b{re.escape(form)}\b", other) for other, _ in contained)
+    }
+    if contained:
+        return contained.pop() if len(contained) == 1 else None
+    # Distância de edição, tolerando ~1/3 do tamanho do valor aceito (sem espaços). Um empate
+    # entre valores diferentes é ambíguo.
+    compact = key.replace(" ", "")
+    best, best_distance = set(), None
+    for form, accepted in candidates:
+        form_compact = form.replace(" ", "")
+        distance = _edit_distance(compact, form_compact)
+        if distance > len(form_compact) // 3:
+            continue
+        if best_distance is None or distance < best_distance:
+            best, best_distance = {accepted}, distance
+        elif distance == best_distance:
+            best.add(accepted)
+    return best.pop() if len(best) == 1 else None
+
+
+def coerce_nf(value) -> Optional[int]:
+    """
+    Converte o número da NF para inteiro ("123", "123.456", 123.0). Retorna None se não for numérico.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else None
+    text = re.sub(r"[\s.]", "", str(value))
+    return int(text) if text.isdigit() else None
+
+
+def coerce_date(value) -> Optional[str]:
+    """
+    Converte uma data em formato conhecido para AAAA-MM-DD. Retorna None se não for uma data válida.
+    """
+    text = str(value).strip()
+    for pattern, (year, month, day) in _DATE_FORMATS:
+        match = pattern.match(text)
+        if match:
+            try:
+                return date(int(match.group(year)), int(match.group(month)), int(match.group(day))).isoformat()
+            except ValueError:
+                return None
+    return None
+
+
+def rejected_fields(parsed_json: dict) -> list:
+    """
+    Campos com valores que o validador descartaria (fora de qualquer lista aceita ou datas
+    impossíveis), sem corrigir nada. Usado pelo roteador de modelos (`model_router.py`) para
+    escalar para o modelo mais forte.
+    """
+    rejected = ["NF"] if parsed_json.get("NF") is not None and coerce_nf(parsed_json["NF"]) is None else []
+    rejected += [field for field in ("DE", "ATE") if parsed_json.get(field) is not None and coerce_date(parsed_json[field]) is None]
+    rejected += [
+        field for field in ENUM_FIELDS
+        if parsed_json.get(field) is not None and snap_value(field, str(parsed_json[field])) is None
+    ]
+    return rejected
+
+
+class FilterValidator:
+    """
+    Normaliza o JSON de filtros para os valores aceitos pela procedure e conta as correções.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.validated = 0
+        self.corrected = 0
+        self.corrections = Counter()
+
+    def validate(self, parsed_json):
+        """
+        Retorna uma cópia corrigida do JSON de filtros. Saídas que não são dicionários
+        são devolvidas inalteradas.
+        """
+        if not isinstance(parsed_json, dict):
+            return parsed_json
+        result = dict(parsed_json)
+        fired = []
+
+        nf = result.get("NF")
+        if nf is not None:
+            coerced = coerce_nf(nf)
+            if coerced is None:
+                logger.warning(f"Validador de filtros descartou NF não numérica: {nf!r}")
+            if coerced is None or type(nf) is not int:
+                result["NF"] = coerced
+                fired.append(f"{'nf_type' if coerced is not None else 'nf_invalid'}:NF")
+
+        if result.get("NF") is not None:
+            for field in FILTER_FIELDS:
+                if field != "NF" and result.get(field) is not None:
+                    result[field] = None
+                    fired.append(f"nf_only:{field}")
+
+        for field in ("DE", "ATE"):
+            value = result.get(field)
+            if value is not None:
+                coerced = coerce_date(value)
+                if coerced != value:
+                    result[field] = coerced
+                    fired.append(f"{'date_format' if coerced else 'date_invalid'}:{field}")
+
+        for field in ENUM_FIELDS:
+            value = result.get(field)
+            if value is None:
+                continue
+            snapped = snap_value(field, str(value))
+            if snapped != value:
+                result[field] = snapped
+                fired.append(f"{'snapped' if snapped else 'rejected'}:{field}")
+
+        if result.get("SortColumn") is None and result.get("SortDirection") is not None:
+            result["SortDirection"] = None
+            fired.append("sort_direction_without_column:SortDirection")
+
+        with self._lock:
+            self.validated += 1
+            if fired:
+                self.corrected += 1
+                self.corrections.update(fired)
+        if fired:
+            fields = {name.split(":")[1] for name in fired}
+            changes = {field: (parsed_json.get(field), result.get(field)) for field in FILTER_FIELDS if field in fields}
+            logger.info(f"Validador de filtros corrigiu o JSON: {changes}")
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "validated": self.validated,
+                "corrected": self.corrected,
+                "correction_rate": round(self.corrected / self.validated, 4) if self.validated else 0.0,
+                "corrections": dict(sorted(self.corrections.items())),
+            }
@@ -0,0 +1,180 @@
+# =================================================================================================
+#
+#                       EXECUÇÃO COM HEDGING ENTRE PROVEDORES DE LLM
+#
+# Visão Geral do Módulo:
+#
+# A latência de cauda (p99) do serviço é dominada por respostas lentas ocasionais do provedor.
+# Com hedging, cada etapa (Enhancer, Parser, chamada fundida) tem um provedor primário e um
+# secundário:
+#
+# 1. Disparo:
+#    - A etapa é enviada ao provedor primário.
+#    - Se ele não responder dentro do atraso de hedging, a MESMA etapa é enviada ao secundário.
+#    - O atraso é um percentil (ex: p90) das latências recentes do primário, ou seja, só as
+#      chamadas mais lentas que o normal disparam a segunda requisição. Até haver amostras
+#      suficientes, vale um atraso inicial fixo.
+#
+# 2. Corrida:
+#    - A primeira resposta que passar na validação da etapa (ex: JSON reparável) vence.
+#    - A perdedora é cancelada (no modo assíncrono; no síncrono, seu resultado é descartado).
+#    - Se uma resposta falhar ou for inválida, espera-se a outra. Se nenhuma for válida, a
+#      resposta inválida do primário segue adiante (para o reparo de JSON / OutputFixingParser);
+#      se ambas falharem, o erro do primário é propagado.
+#
+# 3. Métricas (por etapa):
+#    - Taxa de hedging (requisições em que o secundário foi disparado), vitórias e taxa de
+#      vitória de cada provedor, falhas e o atraso atual.
+#
+# =================================================================================================
+
+import asyncio
+import logging
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+logger = logging.getLogger(__name__)
+
+# Amostras de latência do primário consideradas no cálculo do percentil.
+LATENCY_WINDOW = 200
+# Mínimo de amostras antes de trocar o atraso inicial pelo percentil.
+MIN_SAMPLES = 20
+# Piso do atraso de hedging, para não duplicar toda requisição quando o primário é muito rápido.
+MIN_DELAY_SECONDS = 0.05
+
+# Threads usadas pelas chamadas síncronas (`invoke`). As chamadas assíncronas usam o event loop.
+_thread_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="nt-ai-hedge")
+
+
+class HedgedStage:
+    """
+    Executa uma etapa da cadeia no provedor primário e, se ele demorar, também no secundário.
+    """
+
+    def __init__(self, stage: str, primary: str, secondary: str, percentile: float = 0.9, initial_delay: float = 1.0):
+        self.stage = stage
+        self.primary = primary
+        self.secondary = secondary
+        self.percentile = min(max(percentile, 0.0), 1.0)
+        self.initial_delay = initial_delay
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedged = 0
+        self.failures = 0
+        self.wins = Counter()
+
+    def delay(self) -> float:
+        """
+        Atraso atual de hedging: o percentil configurado das latências recentes do primário.
+        """
+        with self._lock:
+            if len(self._latencies) < MIN_SAMPLES:
+                return self.initial_delay
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(self.percentile * len(ordered)))
+        return max(MIN_DELAY_SECONDS, ordered[index])
+
+    def _record(self, hedged: bool, winner=None, primary_latency=None) -> None:
+        with self._lock:
+            self.requests += 1
+            self.hedged += hedged
+            if winner is None:
+                self.failures += 1
+            else:
+                self.wins[winner] += 1
+            if primary_latency is not None:
+                self._latencies.append(primary_latency)
+
+    def _finish(self, outcomes: dict, hedged: bool, primary_latency):
+        """
+        Sem resposta válida: devolve a resposta (inválida) do primário, se houver, ou propaga
+        o erro do primário.
+        """
+        self._record(hedged, primary_latency=primary_latency)
+        logger.warning(f"Hedging ({self.stage}): nenhum provedor devolveu uma resposta válida.")
+        for provider in (self.primary, self.secondary):
+            error, result = outcomes.get(provider, (None, None))
+            if error is None and provider in outcomes:
+                return result
+        raise outcomes[self.primary][0]
+
+    async def ainvoke(self, primary: Runnable, secondary: Runnable, inputs, config: RunnableConfig, validate: Callable):
+        start = time.perf_counter()
+        tasks = {asyncio.ensure_future(primary.ainvoke(inputs, config=config)): self.primary}
+        done, _ = await asyncio.wait(tasks, timeout=self.delay())
+        hedged = not done
+        outcomes, primary_latency = {}, None
+        try:
+            while True:
+                for task in done:
+                    provider = tasks.pop(task)
+                    error = task.exception()
+                    result = None if error else task.result()
+                    outcomes[provider] = (error, result)
+                    if provider == self.primary:
+                        primary_latency = time.perf_counter() - start
+                    if error is None and validate(result):
+                        self._record(hedged, provider, primary_latency)
+                        if provider == self.secondary:
+                            logger.info(f"Hedging ({self.stage}): '{self.secondary}' respondeu antes de '{self.primary}'.")
+                        return result
+                if self.secondary not in outcomes and not any(p == self.secondary for p in tasks.values()):
+                    # Primário lento, com erro ou inválido: dispara o secundário.
+                    hedged = True
+                    tasks[asyncio.ensure_future(secondary.ainvoke(inputs, config=config))] = self.secondary
+                if not tasks:
+                    return self._finish(outcomes, hedged, primary_latency)
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def invoke(self, primary: Runnable, secondary: Runnable, inputs, config: RunnableConfig, validate: Callable):
+        start = time.perf_counter()
+        futures = {_thread_pool.submit(primary.invoke, inputs, config=config): self.primary}
+        done, _ = wait(futures, timeout=self.delay())
+        hedged = not done
+        outcomes, primary_latency = {}, None
+        try:
+            while True:
+                for future in done:
+                    provider = futures.pop(future)
+                    error = future.exception()
+                    result = None if error else future.result()
+                    outcomes[provider] = (error, result)
+                    if provider == self.primary:
+                        primary_latency = time.perf_counter() - start
+                    if error is None and validate(result):
+                        self._record(hedged, provider, primary_latency)
+                        return result
+                if self.secondary not in outcomes and not any(p == self.secondary for p in futures.values()):
+                    hedged = True
+                    futures[_thread_pool.submit(secondary.invoke, inputs, config=config)] = self.secondary
+                if not futures:
+                    return self._finish(outcomes, hedged, primary_latency)
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+        finally:
+            # Chamadas síncronas em andamento não podem ser interrompidas: o resultado é descartado.
+            for future in futures:
+                future.cancel()
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests, hedged, failures, wins = self.requests, self.hedged, self.failures, dict(self.wins)
+        return {
+            "primary": self.primary,
+            "secondary": self.secondary,
+            "requests": requests,
+            "hedged": hedged,
+            "hedge_rate": round(hedged / requests, 4) if requests else 0.0,
+            "wins": wins,
+            "win_rate": {provider: round(count / requests, 4) for provider, count in wins.items()} if requests else {},
+            "failures": failures,
+            "delay_seconds": round(self.delay(), 3),
+        }
@@ -0,0 +1,211 @@
+# =================================================================================================
+#
+#                               REPARO LOCAL DE JSON (ANTES DO OutputFixingParser)
+#
+# Visão Geral do Módulo:
+#
+# Quando a saída do Parser não é um JSON válido, o `OutputFixingParser` pede ao LLM que corrija
+# o próprio erro: uma TERCEIRA ida ao LLM. Na prática, quase todas as falhas são de formatação
+# e podem ser corrigidas localmente, sem rede:
+#
+# 1. Extração:
+#    - Remove cercas de markdown (```json ... ```).
+#    - Descarta tudo antes do marcador "JSON FINAL:" (resquício do Chain of Thought / chamada única).
+#    - Isola o primeiro objeto `{...}` balanceado, ignorando texto explicativo antes ou depois.
+#
+# 2. Correções (aplicadas apenas se o JSON extraído não for válido):
+#    - Vírgulas sobrando antes de `}` ou `]`.
+#    - Aspas simples no lugar de aspas duplas.
+#    - Literais do Python (`None`, `True`, `False`) no lugar de `null`, `true`, `false`.
+#    - Vírgulas e literais só são corrigidos FORA de strings ("None Ltda" continua intacto).
+#
+# 3. Validação:
+#    - O resultado precisa ser um objeto JSON (dicionário). Se o reparo local falhar, a saída
+#      original segue para o `OutputFixingParser` (LLM). Cada uma dessas chamadas é contada
+#      e registrada em log, para acompanharmos com que frequência o caminho caro é usado.
+#
+# =================================================================================================
+
+import json
+import logging
+import re
+from collections import Counter
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_FENCE_PATTERN = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.DOTALL | re.IGNORECASE)
+_MARKER_PATTERN = re.compile(r"JSON FINAL\s*:?", re.IGNORECASE)
+_TRAILING_COMMA_PATTERN = re.compile(r",\s*([}\]])")
+_PYTHON_LITERALS = {"None": "null", "True": "true", "False": "false"}
+_PYTHON_LITERAL_PATTERN = re.compile(r"\b(None|True|False)\b")
+
+
+def _first_object(text: str) -> Optional[str]:
+    """
+    Retorna o primeiro objeto `{...}` balanceado do texto, respeitando chaves dentro de strings.
+    Se o objeto não fechar, retorna do primeiro `{` até o último `}` encontrado.
+    """
+    start = text.find("{")
+    if start < 0:
+        return None
+    depth, quote, escaped = 0, None, False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if quote:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == quote:
+                quote = None
+        elif ch in "\"'":
+            quote = ch
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    end = text.rfind("}")
+    return text[start:end + 1] if end > start else None
+
+
+def _swap_single_quotes(text: str) -> str:
+    """
+    Troca as aspas simples que delimitam strings por aspas duplas, preservando
+    apóstrofos dentro de strings já delimitadas por aspas duplas.
+    """
+    result, quote = [], None
+    for ch in text:
+        if quote is None and ch in "\"'":
+            quote = ch
+            result.append('"')
+        elif ch == quote:
+            quote = None
+            result.append('"')
+        elif ch == '"' and quote == "'":
+            result.append('\\"')
+        else:
+            result.append(ch)
+    return "".join(result)
+
+
+def _sub_outside_strings(pattern, repl, text: str) -> str:
+    """
+    Aplica `pattern.sub(repl, ...)` apenas aos trechos fora de strings, para que valores como
+    "None Ltda" ou "A, B}" nunca sejam alterados.
+    """
+    parts, start, quote, escaped = [], 0, None, False
+    for i, ch in enumerate(text):
+        if quote:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == quote:
+                quote = None
+                parts.append(text[start:i + 1])
+                start = i + 1
+        elif ch in "\"'":
+            parts.append(pattern.sub(repl, text[start:i]))
+            quote, start = ch, i
+    parts.append(text[start:] if quote else pattern.sub(repl, text[start:]))
+    return "".join(parts)
+
+
+# Correções aplicadas, em ordem, sobre o objeto extraído. Cada uma é cumulativa.
+_FIXES = (
+    ("trailing_comma", lambda text: _sub_outside_strings(_TRAILING_COMMA_PATTERN, r"\1", text)),
+    ("single_quotes", _swap_single_quotes),
+    ("python_literals", lambda text: _sub_outside_strings(_PYTHON_LITERAL_PATTERN, lambda m: _PYTHON_LITERALS[m.group(1)], text)),
+)
+
+
+def _loads_object(text: str) -> Optional[dict]:
+    try:
+        value = json.loads(text)
+    except (json.JSONDecodeError, TypeError):
+        return None
+    return value if isinstance(value, dict) else None
+
+
+def repair_json(llm_output: str) -> Tuple[Optional[dict], Optional[list]]:
+    """
+    Reparo local, sem contadores. Retorna (objeto, correções aplicadas); as correções são None
+    quando o texto já era um JSON válido, e o objeto é None se o reparo não for possível.
+    """
+    text = llm_output or ""
+    parsed = _loads_object(text.strip())
+    if parsed is not None:
+        return parsed, None
+
+    applied = []
+    fence = _FENCE_PATTERN.search(text)
+    if fence:
+        text = fence.group(1)
+        applied.append("code_fence")
+    parts = _MARKER_PATTERN.split(text)
+    if len(parts) > 1:
+        text = parts[-1]
+        applied.append("final_marker")
+    candidate = _first_object(text)
+    if candidate is None:
+        return None, applied
+    if candidate != text.strip():
+        applied.append("extra_text")
+
+    parsed = _loads_object(candidate)
+    for name, fix in _FIXES:
+        if parsed is not None:
+            break
+        fixed = fix(candidate)
+        if fixed != candidate:
+            candidate = fixed
+            applied.append(name)
+            parsed = _loads_object(candidate)
+    return parsed, applied
+
+
+class JsonRepairer:
+    """
+    Reparo determinístico da saída do Parser, com contadores de uso do `OutputFixingParser`.
+    """
+
+    def __init__(self):
+        self.direct = 0
+        self.repaired = 0
+        self.fixes = Counter()
+        self.fixer_calls = 0
+
+    def repair(self, llm_output: str) -> Optional[dict]:
+        """
+        Tenta obter o objeto JSON da saída do LLM sem nenhuma chamada de rede.
+        Retorna o dicionário, ou None se o reparo local não for possível.
+        """
+        parsed, applied = repair_json(llm_output)
+        if parsed is None:
+            return None
+        if applied is None:
+            self.direct += 1
+        else:
+            self.repaired += 1
+            self.fixes.update(applied)
+        return parsed
+
+    def record_fixer_call(self, llm_output: str) -> None:
+        """
+        Registra que a saída seguiu para o `OutputFixingParser` (ida extra ao LLM).
+        """
+        self.fixer_calls += 1
+        logger.warning(f"Reparo local de JSON falhou; acionando o OutputFixingParser (LLM). Saída: '{(llm_output or '')[:200]}'")
+
+    def stats(self) -> dict:
+        total = self.direct + self.repaired + self.fixer_calls
+        return {
+            "direct": self.direct,
+            "repaired_locally": self.repaired,
+            "fixes_applied": dict(self.fixes),
+            "llm_fixer_calls": self.fixer_calls,
+            "llm_fixer_rate": round(self.fixer_calls / total, 4) if total else 0.0,
+        }
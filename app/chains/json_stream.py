@@ -0,0 +1,184 @@
+# =================================================================================================
+#
+#                       LEITURA INCREMENTAL DO JSON (PARADA ANTECIPADA DA GERAÇÃO)
+#
+# Visão Geral do Módulo:
+#
+# O Parser às vezes continua gerando texto (explicações, espaços) depois de fechar o objeto JSON,
+# e a cadeia só segue quando a geração inteira termina. Aqui, a resposta do LLM é lida token a
+# token (streaming):
+#
+# 1. Varredura Incremental (`JsonObjectScanner`):
+#    - Acompanha o texto recebido até o momento, ignorando tudo antes do primeiro `{` (cercas de
+#      markdown, "JSON FINAL:", a pergunta normalizada do modo de chamada única) e respeitando
+#      chaves e colchetes dentro de strings.
+#    - Detecta o fechamento do objeto de nível superior.
+#
+# 2. Parada Antecipada (`JsonStreamReader`):
+#    - Assim que o objeto fecha E passa pelo reparo local de JSON, a leitura para e o stream é
+#      fechado, o que cancela a geração no provedor. O texto lido até ali segue para a cadeia
+#      como se fosse a resposta completa.
+#    - Se o objeto fechado não for um JSON válido, a leitura vai até o fim (o reparo / o
+#      OutputFixingParser tratam a resposta completa, como antes).
+#
+# 3. Campos Parciais:
+#    - A cada campo de nível superior concluído, os campos lidos até ali podem ser publicados
+#      (ex: para uma interface progressiva, ver `/parse-query/stream`).
+#
+# 4. Métricas:
+#    - Leituras, paradas antecipadas e caracteres recebidos depois do fechamento do objeto.
+#
+# =================================================================================================
+
+import json
+import threading
+from typing import AsyncIterator, Awaitable, Callable, Iterator, Optional
+
+from langchain_core.messages import AIMessageChunk
+
+from app.chains.json_repair import repair_json
+
+
+def _chunk_text(chunk) -> str:
+    return chunk.content if isinstance(chunk.content, str) else str(chunk.content)
+
+
+class JsonObjectScanner:
+    """
+    Varredura incremental do primeiro objeto JSON de um texto recebido em pedaços.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.start = None
+        self.end = None
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._last_comma = None
+
+    @property
+    def closed(self) -> bool:
+        return self.end is not None
+
+    def feed(self, text: str) -> bool:
+        """
+        Acrescenta um pedaço do texto. Retorna True se um novo campo de nível superior foi
+        concluído (ver `partial_fields`).
+        """
+        self.text += text
+        new_field = False
+        while self._pos < len(self.text) and self.end is None:
+            ch = self.text[self._pos]
+            if self.start is None:
+                if ch == "{":
+                    self.start, self._depth = self._pos, 1
+            elif self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self.end = self._pos + 1
+            elif ch == "," and self._depth == 1:
+                self._last_comma, new_field = self._pos, True
+            self._pos += 1
+        return new_field
+
+    def partial_fields(self) -> Optional[dict]:
+        """
+        Campos de nível superior concluídos até o momento (None se ainda não houver nenhum).
+        """
+        if self.start is None or self._last_comma is None:
+            return None
+        try:
+            parsed = json.loads(self.text[self.start:self._last_comma] + "}")
+        except ValueError:
+            return None
+        return parsed if isinstance(parsed, dict) else None
+
+    def complete_object(self) -> Optional[dict]:
+        """
+        O objeto de nível superior, se ele já fechou e é um JSON válido (após o reparo local).
+        """
+        if self.end is None:
+            return None
+        return repair_json(self.text[:self.end])[0]
+
+
+class JsonStreamReader:
+    """
+    Lê o stream de um LLM até o fechamento do objeto JSON e devolve a mensagem acumulada.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reads = 0
+        self.early_stops = 0
+        self.trailing_chars = 0
+
+    def _record(self, scanner: JsonObjectScanner, stopped: bool) -> None:
+        with self._lock:
+            self.reads += 1
+            self.early_stops += stopped
+            if scanner.closed:
+                self.trailing_chars += len(scanner.text) - scanner.end
+
+    def read(self, chunks: Iterator):
+        """
+        Consome `chunks` (ex: `llm.stream(...)`) e devolve a soma dos pedaços lidos.
+        """
+        scanner, message, stopped = JsonObjectScanner(), None, False
+        try:
+            for chunk in chunks:
+                message = chunk if message is None else message + chunk
+                scanner.feed(_chunk_text(chunk))
+                if scanner.closed and scanner.complete_object() is not None:
+                    stopped = True
+                    break
+        finally:
+            if hasattr(chunks, "close"):
+                chunks.close()
+        self._record(scanner, stopped)
+        return message if message is not None else AIMessageChunk(content="")
+
+    async def aread(self, chunks: AsyncIterator, on_fields: Callable[[dict], Awaitable] = None):
+        """
+        Versão assíncrona de `read` (ex: `llm.astream(...)`). `on_fields` recebe os campos
+        de nível superior concluídos, a cada novo campo.
+        """
+        scanner, message, stopped = JsonObjectScanner(), None, False
+        try:
+            async for chunk in chunks:
+                message = chunk if message is None else message + chunk
+                if scanner.feed(_chunk_text(chunk)) and on_fields:
+                    fields = scanner.partial_fields()
+                    if fields:
+                        await on_fields(fields)
+                if scanner.closed and scanner.complete_object() is not None:
+                    stopped = True
+                    break
+        finally:
+            # Fechar o stream encerra a requisição HTTP e, com ela, a geração no provedor.
+            if hasattr(chunks, "aclose"):
+                await chunks.aclose()
+        self._record(scanner, stopped)
+        return message if message is not None else AIMessageChunk(content="")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "reads": self.reads,
+                "early_stops": self.early_stops,
+                "early_stop_rate": round(self.early_stops / self.reads, 4) if self.reads else 0.0,
+                "trailing_chars": self.trailing_chars,
+            }
@@ -16,6 +16,8 @@
 #      segura e previsível, sem alterar a intenção original.
 #    - Ação: Expande abreviações (ex: "nf" -> "nota fiscal") e mapeia sinônimos de
 #      negócio (ex: "rodando" -> "em trânsito").
+#    - Modo (NT_AI_ENHANCER_MODE): "llm" (padrão), "rules" (Enhancer determinístico em
+#      Python, ver `rule_enhancer.py`) ou "hybrid" (regras, com o LLM só para perguntas ambíguas).
 #
 # 2. A Cadeia de Parsing (`json_parser_chain`):
 #    - Atua como um "Especialista em Extração".
@@ -25,32 +27,233 @@
 #      diretamente para o formato JSON.
 #    - (NOTA: A técnica Chain of Thought foi desativada por questões de performance/rate limit).
 #
-# 3. Resiliência (`OutputFixingParser`):
-#    - A cadeia de parsing é equipada com um parser de auto-correção. Se o LLM gerar
-#      um JSON com erro de sintaxe, esta ferramenta automaticamente solicita ao LLM
-#      que corrija seu próprio erro, aumentando a confiabilidade do serviço.
+#    - Modo de Chamada Única (NT_AI_PIPELINE_MODE=single_call): as etapas 1 e 2 são fundidas
+#      em UMA geração (`FUSED_PROMPT`), que devolve a pergunta normalizada e o JSON final.
+#      Mesmo esquema de saída, metade das idas ao LLM. O padrão é "two_stage".
+#
+# 3. Resiliência (`JsonRepairer` + `OutputFixingParser`):
+#    - A saída do Parser passa primeiro por um reparo local e determinístico (ver `json_repair.py`):
+#      cercas de markdown, vírgulas sobrando, aspas simples, marcador "JSON FINAL:" e texto extra.
+#    - Só se o reparo local falhar o parser de auto-correção solicita ao LLM que corrija seu
+#      próprio erro. Cada uma dessas idas extras ao LLM é contada e registrada em log.
+#    - Saída Estruturada (NT_AI_STRUCTURED_OUTPUT=true): o Parser usa o esquema nativo do
+#      provedor (`FilterSchema`, ver `app/prompts/schema.py`) com um prompt mais curto
+#      (`STRUCTURED_PARSER_PROMPT`). O JSON já chega válido e com valores dentro das listas;
+#      o reparo acima fica apenas como rede de segurança.
+#    - Saída Esparsa (NT_AI_SPARSE_OUTPUT=true): o Parser escreve apenas os campos preenchidos
+#      (`SPARSE_PARSER_PROMPT`), e o JSON completo é reconstruído em Python (`expand_filters`).
+#      Menos tokens de saída, mesma resposta para a API.
+#    - Prompt Dinâmico (NT_AI_DYNAMIC_PROMPT=true): em qualquer uma das variantes acima, o
+#      prompt do Parser leva apenas os k exemplos mais relevantes do banco e as seções de
+#      regras acionadas pela pergunta (ver `dynamic_prompt.py`).
+#
+# 4. Cache de Resultados (`ResultCache`):
+#    - A cadeia de produção é envolvida por um cache em memória (ver `result_cache.py`).
+#      Perguntas repetidas são respondidas sem nenhuma chamada ao LLM. Datas relativas
+#      ("hoje", "esta semana") são guardadas como marcadores e recalculadas a cada acerto.
+#    - O Enhancer tem um segundo cache, próprio e de vida mais longa: sua saída depende
+#      apenas da pergunta e do `QUERY_ENHANCER_PROMPT` (não das datas). Assim, mesmo quando
+#      o cache de resultados falha (ex: em um novo dia), a primeira ida ao LLM é evitada.
+#
+# 5. Caminho Rápido (`FastPathParser`):
+#    - Antes de qualquer cache ou LLM, um pré-parser determinístico (ver `fast_path.py`)
+#      tenta interpretar perguntas triviais ("nota 123456", "notas para SP"). Com confiança
+#      total, o JSON é devolvido sem nenhuma chamada ao LLM.
+#    - As cadeias informam na chave 'path' qual caminho atendeu a requisição:
+#      'fast_path', 'cache' ou 'llm'.
+#    - As cadeias de produção e de debug compartilham UM cliente LLM (`get_llm`) e a mesma
+#      linha de montagem (`_get_pipeline`); o debug apenas expõe os resultados intermediários.
+#
+# 6. Resolvedor de Datas (`DateResolver`, NT_AI_DATE_RESOLVER=true):
+#    - Após o Parser, o período da pergunta ("ontem", "em setembro", "últimos 7 dias",
+#      "entre 1 e 15 de setembro"...) é calculado em Python (ver `date_resolver.py`) e
+#      sobrescreve o DE/ATE gerado pelo LLM.
+#    - As datas do dia seguem o fuso horário NT_AI_TIMEZONE (ex: "America/Sao_Paulo");
+#      sem ele, vale o fuso horário do servidor.
+#
+# 7. Validador de Filtros (`FilterValidator`, NT_AI_FILTER_VALIDATOR, ativo por padrão):
+#    - Última etapa antes da resposta (e do cache): aproxima os valores de lista dos aceitos pela
+#      procedure ("EM TRÂNSITO" -> "TRÂNSITO"), aplica as regras de NF e de ordenação e padroniza
+#      as datas (ver `filter_validator.py`). Sem nenhuma nova chamada ao LLM.
+#
+# 8. Provedores e Hedging (NT_AI_LLM_PROVIDER, NT_AI_HEDGING=true):
+#    - O provedor principal ("google" ou "groq") é escolhido por configuração.
+#    - Com hedging, cada etapa (Enhancer, Parser, chamada fundida) que demorar mais que o
+#      percentil configurado das latências recentes é disparada também no provedor secundário
+#      (NT_AI_SECONDARY_PROVIDER); a primeira resposta válida vence (ver `hedging.py`).
+#
+# 9. Circuit Breaker e Modo Degradado (NT_AI_CIRCUIT_BREAKER, NT_AI_DEGRADED_MODE, ativos por padrão):
+#    - Cada provedor tem um circuit breaker (ver `app/core/circuit_breaker.py`): após falhas
+#      seguidas, as chamadas falham na hora, sem esperar o timeout. Com o circuito do principal
+#      aberto, as etapas usam o provedor secundário.
+#    - Se mesmo assim a cadeia com LLM falhar por erro de provedor (circuito aberto, erro da API,
+#      timeout), a resposta vem do `DegradedParser` (palavras-chave, sem LLM), marcada com o
+#      caminho 'degraded'. Os demais erros (bugs) são propagados normalmente.
+#
+# 10. Agendador de Chamadas (NT_AI_RATE_LIMIT=true):
+#    - Toda chamada a um provedor passa por baldes de RPM/TPM (ver `app/core/rate_limiter.py`),
+#      com os tokens estimados antes do envio. Quando é preciso esperar, a produção passa à
+#      frente do debug, que passa à frente dos lotes ("batch"). Respostas 429 pausam o
+#      provedor com recuo exponencial.
+#
+# 11. Coalescência (`SingleFlight`, NT_AI_SINGLE_FLIGHT, ativa por padrão):
+#    - Requisições simultâneas com a mesma pergunta canônica, as mesmas datas, a mesma
+#      prioridade e a mesma faixa de modelo compartilham uma única execução da linha de
+#      montagem (após o cache, antes do LLM). As chamadas ao LLM economizadas são contadas
+#      em `/metrics`.
+#
+# 12. Micro-Lotes (`MicroBatcher`, NT_AI_MICRO_BATCH=true):
+#    - No modo em dois estágios (Parser padrão), as perguntas normalizadas que chegam juntas em
+#      uma janela curta são enviadas ao Parser em UMA chamada (`BATCH_PARSER_PROMPT`), com uma
+#      resposta JSON indexada pelo número de cada texto (ver `micro_batcher.py`). Itens
+#      malformados são refeitos individualmente.
+#
+# 13. Etapas Nomeadas (`STAGE_ENHANCER`, `STAGE_PARSER`, `STAGE_FUSED`):
+#    - As etapas com LLM da linha de montagem têm nomes de execução fixos. O `/parse-query/stream`
+#      acompanha esses nomes em `astream_events` para enviar a pergunta normalizada assim que o
+#      Enhancer termina e medir o tempo de cada etapa.
+#
+# 14. Parada Antecipada (`JsonStreamReader`, NT_AI_JSON_EARLY_STOP=true):
+#    - O Parser (e a chamada fundida) lê a resposta do LLM em streaming e encerra a geração assim
+#      que o objeto JSON fecha e é válido (ver `json_stream.py`), sem esperar texto extra.
+#    - No modo assíncrono, os campos concluídos são publicados como o evento customizado
+#      `PARTIAL_FIELDS_EVENT` (repassado pelo `/parse-query/stream`).
+#
+# 15. Parser Especulativo (`SpeculativeParser`, NT_AI_SPECULATIVE_PARSE=true):
+#    - No modo em dois estágios com o Enhancer LLM, o Parser roda sobre a pergunta original em
+#      paralelo com o Enhancer. Se a pergunta normalizada for equivalente à original, o
+#      resultado especulativo é usado; senão, é descartado e o Parser roda normalmente
+#      (ver `speculative.py`). A taxa de acerto e a latência economizada vão para `/metrics`.
+#
+# 16. Roteador de Modelos (`ComplexityRouter`, NT_AI_MODEL_ROUTER=true):
+#    - Cada pergunta recebe uma nota de complexidade local (entidades, datas, negações,
+#      ambiguidade; ver `model_router.py`). Perguntas simples vão para o modelo rápido
+#      (NT_AI_ROUTER_FAST_PROVIDER, padrão "groq") e as complexas para o mais forte
+#      (NT_AI_ROUTER_STRONG_PROVIDER, padrão "google"), em todas as etapas com LLM.
+#    - Na faixa rápida, a ETAPA que falhar (erro de provedor, saída ilegível ou, no Parser,
+#      valores fora das listas) é refeita na faixa forte; as etapas anteriores não são
+#      repetidas. Com o roteador ativo, o hedging não é usado.
 #
 # =================================================================================================
 # =================================================================================================
 
 import calendar
-import re # [!] ATENÇÃO: Importado para a função _extract_json_from_output (CoT), atualmente desativada.
-from langchain_core.runnables import Runnable, RunnablePassthrough, RunnableLambda # [!] RunnableLambda importado para CoT, atualmente desativado.
+import json
+import logging
+import re # Usado na extração do JSON e da pergunta normalizada (modo de chamada única).
+import time
+from langchain_core.callbacks import adispatch_custom_event
+from langchain_core.runnables import Runnable, RunnableConfig, RunnablePassthrough, RunnableLambda, RunnableParallel
 from langchain_core.output_parsers import StrOutputParser, JsonOutputParser
 from langchain.output_parsers import OutputFixingParser
-from app.core.llm import get_llm_groq, get_llm_google
-from app.prompts.filter_prompts import QUERY_ENHANCER_PROMPT, JSON_PARSER_PROMPT
+from langchain_core.prompt_values import StringPromptValue
+from app.core import metrics
+from app.core.circuit_breaker import OPEN, CircuitBreaker, CircuitOpenError
+from app.core.single_flight import SingleFlight
+from app.core.rate_limiter import DEFAULT_PRIORITY, PRIORITIES, PRIORITY_METADATA_KEY, RateScheduler
+from app.core.cache import LRUCache, MISSING, canonicalize_query, fingerprint
+from app.core.config import env_bool, env_int, env_float, env_str, env_timezone
+from app.core.llm import LLM_PROVIDERS, PROVIDER_ERRORS, PROVIDER_RATE_LIMITS, get_structured_llm
+from app.chains.date_resolver import DateResolver
+from app.chains.degraded_parser import DegradedParser
+from app.chains.dynamic_prompt import DynamicParserPrompt, estimate_tokens
+from app.chains.fast_path import FastPathParser
+from app.chains.filter_validator import FilterValidator, rejected_fields
+from app.chains.hedging import HedgedStage
+from app.chains.json_repair import JsonRepairer, repair_json
+from app.chains.json_stream import JsonStreamReader
+from app.chains.micro_batcher import MicroBatcher
+from app.chains.model_router import TIER_FAST, TIER_FORCED_METADATA_KEY, TIER_METADATA_KEY, TIER_STRONG, TIERS, ComplexityRouter
+from app.chains.prompt_snapshot import PromptSnapshot
+from app.chains.result_cache import ResultCache
+from app.chains.speculative import SpeculativeParser
+from app.chains.rule_enhancer import RuleBasedEnhancer
+from app.prompts.filter_prompts import QUERY_ENHANCER_PROMPT, JSON_PARSER_PROMPT, FUSED_PROMPT, STRUCTURED_PARSER_PROMPT, SPARSE_PARSER_PROMPT, BATCH_PARSER_PROMPT
+from app.prompts.schema import FilterSchema, expand_filters
+from app.prompts.vocabulary import FILTER_FIELDS
 from datetime import datetime, timedelta
 
+logger = logging.getLogger(__name__)
+
+# Instâncias únicas dos caches e do caminho rápido, criadas sob demanda (após o `load_dotenv()`).
+_result_cache = None
+_enhancer_cache = None
+_fast_path = None
+_rule_enhancer = None
+_json_repairer = None
+_dynamic_prompts = {}
+_prompt_snapshots = {}
+_date_resolver = None
+_filter_validator = None
+
+# Cliente LLM único por provedor (um só pool de conexões HTTP) e linha de montagem única por
+# modo, compartilhados pelas cadeias de produção e de debug.
+_llms = {}
+_pipelines = {}
+_hedged_stages = {}
+_circuit_breakers = {}
+_rate_schedulers = {}
+_degraded_parser = None
+_single_flights = {}
+_json_stream_reader = None
+_speculative_parser = None
+_model_router = None
+
+# Contexto de datas do dia atual: (data, dicionário de datas). Recalculado na virada do dia.
+_dates_snapshot = (None, None)
+
+# Modos do Enhancer (NT_AI_ENHANCER_MODE).
+ENHANCER_MODES = ("llm", "rules", "hybrid")
+
+# Modos da linha de montagem (NT_AI_PIPELINE_MODE): duas chamadas ao LLM ou uma fundida.
+PIPELINE_MODES = ("two_stage", "single_call")
+
+# Etapas que chamam o LLM e podem usar hedging (NT_AI_HEDGE_STAGES).
+LLM_STAGES = ("enhancer", "parser", "fused")
+
+# Identificadores do caminho que atendeu a requisição (chave 'path' na saída das cadeias).
+PATH_FAST = "fast_path"
+PATH_CACHE = "cache"
+PATH_LLM = "llm"
+PATH_DEGRADED = "degraded"
+
+# Falhas de provedor que o modo degradado (e o escalonamento do roteador) absorvem. Erros da
+# aplicação (KeyError, TypeError, variáveis de prompt) não estão aqui e são propagados.
+DEGRADABLE_ERRORS = (CircuitOpenError, *PROVIDER_ERRORS)
+
+# Nomes de execução das etapas com LLM da linha de montagem (eventos de `astream_events`).
+STAGE_ENHANCER = "query_enhancer"
+STAGE_PARSER = "json_parser"
+STAGE_FUSED = "fused"
+
+# Evento customizado com os campos do JSON já concluídos durante a geração do Parser.
+PARTIAL_FIELDS_EVENT = "parser_partial_fields"
+
+# Impressão digital do prompt do Enhancer: sua saída depende apenas da pergunta e deste prompt.
+ENHANCER_FINGERPRINT = fingerprint(QUERY_ENHANCER_PROMPT.template)
+
 def _get_current_dates(data_passthrough):
     """
     Calcula todas as datas dinâmicas no momento da execução da cadeia.
     Esta função será chamada para CADA requisição, garantindo que valores
     como 'today', 'week_start', etc., estejam sempre atualizados.
+    O cálculo é feito uma vez por dia; nas demais requisições do dia, uma cópia é devolvida.
     O argumento `data_passthrough` recebe os dados que já estão no fluxo da cadeia,
     mas não é utilizado aqui; está presente para compatibilidade com o `.assign()`.
     """
-    today = datetime.now()
+    global _dates_snapshot
+    today = datetime.now(env_timezone("NT_AI_TIMEZONE"))
+    day, dates = _dates_snapshot
+    if day != today.date():
+        dates = _compute_dates(today)
+        _dates_snapshot = (today.date(), dates)
+    return dict(dates)
+
+
+def _compute_dates(today: datetime) -> dict:
+    """
+    Calcula o contexto de datas (dicionário do `JSON_PARSER_PROMPT`) para o dia informado.
+    """
     start_of_week = today - timedelta(days=today.weekday())
     end_of_week = start_of_week + timedelta(days=6)
     start_of_month = today.replace(day=1)
@@ -86,12 +289,266 @@ def _get_current_dates(data_passthrough):
         "semester_end": end_of_semester.strftime('%Y-%m-%d')
     }
 
-# --- Bloco de Funções Auxiliares para o Parser (CoT) ---
-# [!] ESTA FUNÇÃO E O CHAIN OF THOUGHT ESTÃO ATUALMENTE DESATIVADOS [!]
+def _resolve_dates(data):
+    """
+    Reaproveita as datas já calculadas pelo cache de resultados (chave 'dates' no fluxo),
+    garantindo que a chave do cache e o prompt usem exatamente o mesmo contexto de datas.
+    Se não houver datas no fluxo, calcula-as normalmente.
+    """
+    return data.get("dates") or _get_current_dates(data)
+
+
+def get_result_cache() -> ResultCache:
+    """
+    Retorna a instância única do cache de resultados, registrando suas métricas na primeira chamada.
+    """
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = ResultCache()
+        metrics.register("result_cache", _result_cache.stats)
+    return _result_cache
+
+
+def get_enhancer_cache() -> LRUCache:
+    """
+    Retorna a instância única do cache do Enhancer (compartilhada entre a cadeia principal
+    e a de debug), registrando suas métricas na primeira chamada.
+
+    Configuração (variáveis de ambiente):
+    - NT_AI_ENHANCER_CACHE_ENABLED      (padrão: true)
+    - NT_AI_ENHANCER_CACHE_MAX_SIZE     (padrão: 4096 entradas)
+    - NT_AI_ENHANCER_CACHE_TTL_SECONDS  (padrão: 604800, 7 dias)
+    """
+    global _enhancer_cache
+    if _enhancer_cache is None:
+        _enhancer_cache = LRUCache(
+            name="enhancer_cache",
+            max_size=env_int("NT_AI_ENHANCER_CACHE_MAX_SIZE", 4096),
+            ttl_seconds=env_float("NT_AI_ENHANCER_CACHE_TTL_SECONDS", 604800),
+        )
+        metrics.register("enhancer_cache", _enhancer_cache.stats)
+    return _enhancer_cache
+
+
+def _with_enhancer_cache(chain: Runnable) -> Runnable:
+    """
+    Envolve a cadeia do Enhancer com o seu cache, indexado por (versão do prompt, pergunta canônica).
+    """
+    if not env_bool("NT_AI_ENHANCER_CACHE_ENABLED", True):
+        return chain
+    cache = get_enhancer_cache()
+
+    def _invoke(inputs: dict, config: RunnableConfig) -> str:
+        key = (ENHANCER_FINGERPRINT, canonicalize_query(inputs["query"]))
+        cached = cache.get(key)
+        if cached is not MISSING:
+            return cached
+        enhanced_query = chain.invoke(inputs, config=config)
+        cache.set(key, enhanced_query)
+        return enhanced_query
+
+    async def _ainvoke(inputs: dict, config: RunnableConfig) -> str:
+        key = (ENHANCER_FINGERPRINT, canonicalize_query(inputs["query"]))
+        cached = cache.get(key)
+        if cached is not MISSING:
+            return cached
+        enhanced_query = await chain.ainvoke(inputs, config=config)
+        cache.set(key, enhanced_query)
+        return enhanced_query
+
+    return RunnableLambda(_invoke, afunc=_ainvoke, name="cached_query_enhancer_chain")
+
+
+def get_rule_enhancer() -> RuleBasedEnhancer:
+    """
+    Retorna a instância única do Enhancer determinístico, registrando suas métricas na primeira chamada.
+    """
+    global _rule_enhancer
+    if _rule_enhancer is None:
+        _rule_enhancer = RuleBasedEnhancer()
+        metrics.register("rule_enhancer", _rule_enhancer.stats)
+    return _rule_enhancer
+
+
+def _get_enhancer_mode() -> str:
+    """
+    Lê o modo do Enhancer (NT_AI_ENHANCER_MODE). Valores desconhecidos usam o padrão "llm".
+    """
+    mode = env_str("NT_AI_ENHANCER_MODE", "llm").lower()
+    if mode not in ENHANCER_MODES:
+        logger.warning(f"NT_AI_ENHANCER_MODE inválido: '{mode}'. Usando 'llm'.")
+        return "llm"
+    return mode
+
+
+def _with_rule_enhancer(llm_enhancer_chain: Runnable, mode: str) -> Runnable:
+    """
+    Substitui a ida ao LLM do Enhancer pelo Enhancer determinístico.
+    No modo "hybrid", perguntas ambíguas (válvula de escape do prompt) ainda usam o LLM.
+    """
+    enhancer = get_rule_enhancer()
+
+    def _invoke(inputs: dict, config: RunnableConfig) -> str:
+        enhanced_query, ambiguous = enhancer.enhance(inputs["query"])
+        if ambiguous and mode == "hybrid":
+            enhancer.llm_fallbacks += 1
+            return llm_enhancer_chain.invoke(inputs, config=config)
+        return enhanced_query
+
+    async def _ainvoke(inputs: dict, config: RunnableConfig) -> str:
+        enhanced_query, ambiguous = enhancer.enhance(inputs["query"])
+        if ambiguous and mode == "hybrid":
+            enhancer.llm_fallbacks += 1
+            return await llm_enhancer_chain.ainvoke(inputs, config=config)
+        return enhanced_query
+
+    return RunnableLambda(_invoke, afunc=_ainvoke, name="rule_based_query_enhancer")
+
+
+def _with_result_cache(chain: Runnable) -> Runnable:
+    """
+    Envolve a cadeia com o cache de resultados.
+    Em caso de acerto, o JSON é devolvido imediatamente, sem chamar o LLM.
+    Em caso de falha, a cadeia é executada com as MESMAS datas usadas na chave do cache.
+    Retorna {'parsed_json': ..., 'path': 'cache' | 'llm'}.
+    """
+    cache = get_result_cache()
+
+    def _invoke(inputs: dict, config: RunnableConfig) -> dict:
+        dates = _get_current_dates(inputs)
+        cached = cache.get(inputs["query"], dates)
+        if cached is not None:
+            logger.info(f"Cache de resultados (HIT) para a query: '{inputs['query'][:50]}'")
+            return {"parsed_json": cached, "path": PATH_CACHE}
+        result = chain.invoke({**inputs, "dates": dates}, config=config)
+        cache.set(inputs["query"], dates, result)
+        return {"parsed_json": result, "path": PATH_LLM}
+
+    async def _ainvoke(inputs: dict, config: RunnableConfig) -> dict:
+        dates = _get_current_dates(inputs)
+        cached = cache.get(inputs["query"], dates)
+        if cached is not None:
+            logger.info(f"Cache de resultados (HIT) para a query: '{inputs['query'][:50]}'")
+            return {"parsed_json": cached, "path": PATH_CACHE}
+        result = await chain.ainvoke({**inputs, "dates": dates}, config=config)
+        cache.set(inputs["query"], dates, result)
+        return {"parsed_json": result, "path": PATH_LLM}
+
+    return RunnableLambda(_invoke, afunc=_ainvoke, name="cached_master_chain")
+
+
+def get_date_resolver() -> DateResolver:
+    """
+    Retorna a instância única do resolvedor de datas, registrando suas métricas na primeira chamada.
+    """
+    global _date_resolver
+    if _date_resolver is None:
+        _date_resolver = DateResolver()
+        metrics.register("date_resolver", _date_resolver.stats)
+    return _date_resolver
+
+
+def get_filter_validator() -> FilterValidator:
+    """
+    Retorna a instância única do validador de filtros, registrando suas métricas na primeira chamada.
+    """
+    global _filter_validator
+    if _filter_validator is None:
+        _filter_validator = FilterValidator()
+        metrics.register("filter_validator", _filter_validator.stats)
+    return _filter_validator
+
+
+def _with_post_parse(chain: Runnable, step, name: str) -> Runnable:
+    """
+    Aplica uma etapa determinística `step(inputs, dates, parsed_json) -> parsed_json` à chave
+    'parsed_json' da saída da linha de montagem (ver `_get_pipeline`).
+    """
+    def _apply(inputs: dict, result: dict) -> dict:
+        return {**result, "parsed_json": step(inputs, result["dates"], result["parsed_json"])}
+
+    def _invoke(inputs: dict, config: RunnableConfig):
+        return _apply(inputs, chain.invoke(inputs, config=config))
+
+    async def _ainvoke(inputs: dict, config: RunnableConfig):
+        return _apply(inputs, await chain.ainvoke(inputs, config=config))
+
+    return RunnableLambda(_invoke, afunc=_ainvoke, name=name)
+
+
+def _with_date_resolver(chain: Runnable) -> Runnable:
+    """
+    Aplica o resolvedor de datas ao JSON gerado pela cadeia, sobrescrevendo DE/ATE com o
+    período calculado em Python. Ativado com NT_AI_DATE_RESOLVER=true.
+    """
+    if not env_bool("NT_AI_DATE_RESOLVER", False):
+        return chain
+    resolver = get_date_resolver()
+    return _with_post_parse(
+        chain, lambda inputs, dates, parsed_json: resolver.apply(inputs["query"], dates, parsed_json), "date_resolver"
+    )
+
+
+def _with_filter_validator(chain: Runnable) -> Runnable:
+    """
+    Valida e normaliza o JSON gerado pela cadeia (valores de lista, regras de NF e de ordenação,
+    formato das datas). Pode ser desligado com NT_AI_FILTER_VALIDATOR=false.
+    """
+    if not env_bool("NT_AI_FILTER_VALIDATOR", True):
+        return chain
+    validator = get_filter_validator()
+    return _with_post_parse(
+        chain, lambda inputs, dates, parsed_json: validator.validate(parsed_json), "filter_validator"
+    )
+
+
+def get_fast_path() -> FastPathParser:
+    """
+    Retorna a instância única do caminho rápido, registrando suas métricas na primeira chamada.
+    """
+    global _fast_path
+    if _fast_path is None:
+        _fast_path = FastPathParser()
+        metrics.register("fast_path", _fast_path.stats)
+    return _fast_path
+
+
+def _with_fast_path(chain: Runnable, debug: bool = False) -> Runnable:
+    """
+    Coloca o caminho rápido determinístico à frente da cadeia.
+    Se o pré-parser interpretar a pergunta com confiança total, a cadeia (caches e LLMs)
+    não é executada. No modo debug, a saída mantém o formato da cadeia de debug.
+    Pode ser desligado com NT_AI_FAST_PATH_ENABLED=false.
+    """
+    if not env_bool("NT_AI_FAST_PATH_ENABLED", True):
+        return chain
+    parser = get_fast_path()
+
+    def _try_fast_path(inputs: dict):
+        parsed_json = parser.parse(inputs["query"])
+        if parsed_json is None:
+            return None
+        logger.info(f"Caminho rápido (sem LLM) atendeu a query: '{inputs['query'][:50]}'")
+        if debug:
+            return {**inputs, "dates": _resolve_dates(inputs), "enhanced_query": None, "parsed_json": parsed_json, "path": PATH_FAST}
+        return {"parsed_json": parsed_json, "path": PATH_FAST}
+
+    def _invoke(inputs: dict, config: RunnableConfig) -> dict:
+        return _try_fast_path(inputs) or chain.invoke(inputs, config=config)
+
+    async def _ainvoke(inputs: dict, config: RunnableConfig) -> dict:
+        return _try_fast_path(inputs) or await chain.ainvoke(inputs, config=config)
+
+    return RunnableLambda(_invoke, afunc=_ainvoke, name="fast_path")
+
+
+# --- Bloco de Funções Auxiliares para o Parser (CoT e Chamada Única) ---
+# [!] O CHAIN OF THOUGHT ESTÁ ATUALMENTE DESATIVADO [!]
+# A extração por marcador "JSON FINAL" é usada hoje pelo modo de chamada única (`FUSED_PROMPT`).
 def _extract_json_from_output(llm_output: str) -> str:
     """
-    (Atualmente Inativa) Encontra e extrai o bloco JSON da saída do LLM
-    quando a técnica Chain of Thought está ativa.
+    Encontra e extrai o bloco JSON da saída do LLM quando ele vem precedido de
+    outro texto (Chain of Thought ou a pergunta normalizada do modo de chamada única).
     Procura o marcador "JSON FINAL" e extrai o JSON que vem depois.
     """
     # Divide a saída pelo marcador "JSON FINAL", ignorando maiúsculas/minúsculas e espaços
@@ -113,7 +570,664 @@ def _extract_json_from_output(llm_output: str) -> str:
     # Se nenhum JSON for encontrado (ex: erro do LLM ou formato inesperado),
     # retorna um JSON vazio para o OutputFixingParser tentar corrigir.
     return "{}"
-# --- Fim do Bloco de Funções Auxiliares (Desativado) ---
+
+
+def _extract_normalized_query(llm_output: str):
+    """
+    Extrai a linha "PERGUNTA NORMALIZADA:" da saída do modo de chamada única.
+    Retorna None se o modelo não a emitir.
+    """
+    match = re.search(r'PERGUNTA NORMALIZADA\s*:\s*(.+)', llm_output, flags=re.IGNORECASE)
+    if not match:
+        return None
+    return match.group(1).strip().strip('"').strip()
+# --- Fim do Bloco de Funções Auxiliares ---
+
+
+def get_json_repairer() -> JsonRepairer:
+    """
+    Retorna a instância única do reparo local de JSON, registrando suas métricas na primeira chamada.
+    """
+    global _json_repairer
+    if _json_repairer is None:
+        _json_repairer = JsonRepairer()
+        metrics.register("json_repair", _json_repairer.stats)
+    return _json_repairer
+
+
+def _with_json_repair(output_fixing_parser: Runnable) -> Runnable:
+    """
+    Tenta o reparo local da saída do LLM antes do `OutputFixingParser`.
+    O parser de auto-correção (ida extra ao LLM) só é acionado se o reparo local falhar.
+    """
+    repairer = get_json_repairer()
+
+    def _invoke(llm_output: str, config: RunnableConfig):
+        parsed = repairer.repair(llm_output)
+        if parsed is not None:
+            return parsed
+        repairer.record_fixer_call(llm_output)
+        return output_fixing_parser.invoke(llm_output, config=config)
+
+    async def _ainvoke(llm_output: str, config: RunnableConfig):
+        parsed = repairer.repair(llm_output)
+        if parsed is not None:
+            return parsed
+        repairer.record_fixer_call(llm_output)
+        return await output_fixing_parser.ainvoke(llm_output, config=config)
+
+    return RunnableLambda(_invoke, afunc=_ainvoke, name="json_repair")
+
+
+def get_dynamic_prompt(base_prompt, name: str, sparse: bool = False) -> DynamicParserPrompt:
+    """
+    Retorna a instância única do prompt dinâmico para o template base informado,
+    registrando suas métricas na primeira chamada (uma chave por variante do Parser,
+    ex: "dynamic_prompt_sparse").
+
+    Configuração (variáveis de ambiente):
+    - NT_AI_DYNAMIC_PROMPT           (padrão: false)
+    - NT_AI_DYNAMIC_PROMPT_EXAMPLES  (padrão: 4 exemplos por requisição)
+    """
+    key = base_prompt.template
+    if key not in _dynamic_prompts:
+        _dynamic_prompts[key] = DynamicParserPrompt(
+            base_prompt.template, sparse=sparse, k=env_int("NT_AI_DYNAMIC_PROMPT_EXAMPLES", 4)
+        )
+        metrics.register(f"dynamic_prompt_{name}", _dynamic_prompts[key].stats)
+    return _dynamic_prompts[key]
+
+
+def _snapshot_prompt(prompt, query_variable: str) -> Runnable:
+    """
+    Substitui a renderização do `PromptTemplate` pelo seu snapshot diário (ver `prompt_snapshot.py`):
+    o prefixo com as datas é renderizado uma vez por dia e, por requisição, só a pergunta é anexada.
+    Pode ser desligado com NT_AI_PROMPT_SNAPSHOT=false.
+    """
+    if not env_bool("NT_AI_PROMPT_SNAPSHOT", True):
+        return prompt
+    if not _prompt_snapshots:
+        metrics.register("prompt_snapshots", lambda: {
+            "prompts": len(_prompt_snapshots),
+            "prefix_renders": sum(snapshot.renders for snapshot in _prompt_snapshots.values()),
+        })
+    snapshot = _prompt_snapshots.setdefault(prompt.template, PromptSnapshot(prompt, query_variable))
+    return RunnableLambda(snapshot.invoke_prompt, name="prompt_snapshot")
+
+
+def _parser_prompt(base_prompt, name: str, sparse: bool = False) -> Runnable:
+    """
+    Prompt do Parser: o snapshot diário do template estático ou, com NT_AI_DYNAMIC_PROMPT=true,
+    o prompt montado por requisição a partir dele. `name` identifica a variante nas métricas.
+    """
+    if not env_bool("NT_AI_DYNAMIC_PROMPT", False):
+        return _snapshot_prompt(base_prompt, "enhanced_query")
+    dynamic_prompt = get_dynamic_prompt(base_prompt, name, sparse=sparse)
+    return RunnableLambda(lambda inputs: StringPromptValue(text=dynamic_prompt.format(inputs)), name="dynamic_parser_prompt")
+
+
+def _raw_output_text(message) -> str:
+    """
+    Texto bruto de uma resposta do LLM: os argumentos da chamada de ferramenta (Groq,
+    "function_calling") ou o conteúdo textual (Gemini, "json_schema").
+    """
+    if getattr(message, "tool_calls", None):
+        return json.dumps(message.tool_calls[0]["args"], ensure_ascii=False)
+    return message.content if isinstance(message.content, str) else str(message.content)
+
+
+def _with_structured_output(structured_llm: Runnable, output_fixing_parser: Runnable) -> Runnable:
+    """
+    Parser com a saída estruturada nativa do provedor (`FilterSchema`, ver `_structured_llm`).
+    Devolve o JSON completo (todos os campos, com null nos ausentes). Se o provedor não
+    conseguir produzir um objeto válido, o texto bruto segue para o reparo local de JSON.
+    """
+    fallback = _with_json_repair(output_fixing_parser)
+
+    def _invoke(prompt_value, config: RunnableConfig):
+        result = structured_llm.invoke(prompt_value, config=config)
+        if result["parsed"] is not None:
+            return result["parsed"].model_dump()
+        logger.warning(f"Saída estruturada inválida ({result['parsing_error']}); usando o reparo de JSON.")
+        return fallback.invoke(_raw_output_text(result["raw"]), config=config)
+
+    async def _ainvoke(prompt_value, config: RunnableConfig):
+        result = await structured_llm.ainvoke(prompt_value, config=config)
+        if result["parsed"] is not None:
+            return result["parsed"].model_dump()
+        logger.warning(f"Saída estruturada inválida ({result['parsing_error']}); usando o reparo de JSON.")
+        return await fallback.ainvoke(_raw_output_text(result["raw"]), config=config)
+
+    return RunnableLambda(_invoke, afunc=_ainvoke, name="structured_json_parser")
+
+
+def _get_provider(name: str, default: str) -> str:
+    """
+    Lê o nome de um provedor de LLM (ver `LLM_PROVIDERS`). Valores desconhecidos usam `default`.
+    """
+    provider = env_str(name, default).lower()
+    if provider not in LLM_PROVIDERS:
+        logger.warning(f"{name} inválido: '{provider}'. Usando '{default}'.")
+        return default
+    return provider
+
+
+def get_llm(provider: str = None):
+    """
+    Retorna o cliente LLM compartilhado por todas as cadeias (Enhancer, Parser, OutputFixingParser
+    e modo de chamada única), criando-o na primeira chamada. Sem `provider`, usa o provedor
+    principal (NT_AI_LLM_PROVIDER, padrão "google").
+    """
+    provider = provider or _get_provider("NT_AI_LLM_PROVIDER", "google")
+    if provider not in _llms:
+        _llms[provider] = LLM_PROVIDERS[provider]()
+    return _llms[provider]
+
+
+def _message_text(message) -> str:
+    return message.content if isinstance(message.content, str) else str(message.content)
+
+
+def _structured_llm(llm) -> Runnable:
+    return get_structured_llm(llm, FilterSchema)
+
+
+def get_json_stream_reader() -> JsonStreamReader:
+    """
+    Retorna a instância única do leitor incremental de JSON, registrando suas métricas na
+    primeira chamada.
+    """
+    global _json_stream_reader
+    if _json_stream_reader is None:
+        _json_stream_reader = JsonStreamReader()
+        metrics.register("json_early_stop", _json_stream_reader.stats)
+    return _json_stream_reader
+
+
+def _json_llm(llm) -> Runnable:
+    """
+    Cliente das etapas que respondem JSON em texto (Parser e chamada fundida). Com
+    NT_AI_JSON_EARLY_STOP=true, a resposta é lida em streaming e a geração é encerrada assim
+    que o objeto JSON fecha (ver `json_stream.py`); no modo assíncrono, os campos concluídos
+    são publicados como `PARTIAL_FIELDS_EVENT`.
+    """
+    if not env_bool("NT_AI_JSON_EARLY_STOP", False):
+        return llm
+    reader = get_json_stream_reader()
+
+    def _invoke(prompt_value, config: RunnableConfig):
+        return reader.read(llm.stream(prompt_value, config=config))
+
+    async def _ainvoke(prompt_value, config: RunnableConfig):
+        async def _publish(fields: dict):
+            # Apenas campos de filtro (a resposta de um micro-lote é indexada pelo número do texto).
+            if fields.keys() <= set(FILTER_FIELDS):
+                await adispatch_custom_event(PARTIAL_FIELDS_EVENT, fields, config=config)
+
+        return await reader.aread(llm.astream(prompt_value, config=config), _publish)
+
+    return RunnableLambda(_invoke, afunc=_ainvoke, name="json_early_stop")
+
+
+# Validação da resposta de cada etapa na corrida do hedging: a primeira resposta válida vence.
+def _valid_enhancer_output(message) -> bool:
+    return bool(_message_text(message).strip())
+
+
+def _valid_parser_output(message) -> bool:
+    return repair_json(_message_text(message))[0] is not None
+
+
+def _valid_structured_output(result) -> bool:
+    return result["parsed"] is not None
+
+
+def get_hedged_stage(stage: str) -> HedgedStage:
+    """
+    Retorna o executor de hedging da etapa, registrando suas métricas na primeira chamada.
+
+    Configuração (variáveis de ambiente):
+    - NT_AI_SECONDARY_PROVIDER   (padrão: "groq")
+    - NT_AI_HEDGE_PERCENTILE     (padrão: 0.9; percentil das latências do primário usado como atraso)
+    - NT_AI_HEDGE_DELAY_SECONDS  (padrão: 1.0; atraso enquanto não há amostras suficientes)
+    """
+    if stage not in _hedged_stages:
+        _hedged_stages[stage] = HedgedStage(
+            stage,
+            primary=_get_provider("NT_AI_LLM_PROVIDER", "google"),
+            secondary=_get_provider("NT_AI_SECONDARY_PROVIDER", "groq"),
+            percentile=env_float("NT_AI_HEDGE_PERCENTILE", 0.9),
+            initial_delay=env_float("NT_AI_HEDGE_DELAY_SECONDS", 1.0),
+        )
+        metrics.register(f"hedging_{stage}", _hedged_stages[stage].stats)
+    return _hedged_stages[stage]
+
+
+def get_circuit_breaker(provider: str) -> CircuitBreaker:
+    """
+    Retorna o circuit breaker do provedor, registrando suas métricas na primeira chamada.
+    Apenas `PROVIDER_ERRORS` contam como falha.
+
+    Configuração (variáveis de ambiente):
+    - NT_AI_CIRCUIT_FAILURES           (padrão: 5 falhas seguidas para abrir o circuito)
+    - NT_AI_CIRCUIT_OPEN_SECONDS       (padrão: 30s aberto antes da chamada de teste)
+    - NT_AI_CIRCUIT_SLOW_CALL_SECONDS  (padrão: 20s; chamadas mais lentas contam como falha, 0 = desligado)
+    """
+    if provider not in _circuit_breakers:
+        slow_call_seconds = env_float("NT_AI_CIRCUIT_SLOW_CALL_SECONDS", 20.0)
+        _circuit_breakers[provider] = CircuitBreaker(
+            provider,
+            failure_threshold=env_int("NT_AI_CIRCUIT_FAILURES", 5),
+            open_seconds=env_float("NT_AI_CIRCUIT_OPEN_SECONDS", 30.0),
+            slow_call_seconds=slow_call_seconds if slow_call_seconds > 0 else None,
+            # Só falhas do provedor abrem o circuito; erros de esquema ou bugs locais não.
+            failure_errors=PROVIDER_ERRORS,
+        )
+        metrics.register(f"circuit_{provider}", _circuit_breakers[provider].stats)
+    return _circuit_breakers[provider]
+
+
+def get_rate_scheduler(provider: str) -> RateScheduler:
+    """
+    Retorna o agendador de chamadas do provedor, registrando suas métricas na primeira chamada.
+
+    Configuração (variáveis de ambiente):
+    - NT_AI_RATE_<PROVEDOR>_RPM  (padrão: `PROVIDER_RATE_LIMITS`; 0 = sem limite)
+    - NT_AI_RATE_<PROVEDOR>_TPM  (padrão: `PROVIDER_RATE_LIMITS`; 0 = sem limite)
+    """
+    if provider not in _rate_schedulers:
+        rpm, tpm = PROVIDER_RATE_LIMITS.get(provider, (0, 0))
+        _rate_schedulers[provider] = RateScheduler(
+            provider,
+            rpm=env_float(f"NT_AI_RATE_{provider.upper()}_RPM", rpm),
+            tpm=env_float(f"NT_AI_RATE_{provider.upper()}_TPM", tpm),
+        )
+        metrics.register(f"rate_limit_{provider}", _rate_schedulers[provider].stats)
+    return _rate_schedulers[provider]
+
+
+def _estimated_tokens(inputs) -> int:
+    """
+    Estimativa de tokens de uma chamada: o prompt mais a saída esperada (NT_AI_RATE_OUTPUT_TOKENS).
+    """
+    text = inputs.to_string() if hasattr(inputs, "to_string") else str(inputs)
+    return estimate_tokens(text) + env_int("NT_AI_RATE_OUTPUT_TOKENS", 300)
+
+
+def _usage_tokens(result):
+    """
+    Tokens realmente usados pela chamada (prompt + saída), quando o provedor os informa.
+    """
+    message = result.get("raw") if isinstance(result, dict) else result
+    usage = getattr(message, "usage_metadata", None)
+    return usage.get("total_tokens") if usage else None
+
+
+def _priority(config: RunnableConfig) -> str:
+    return ((config or {}).get("metadata") or {}).get(PRIORITY_METADATA_KEY, DEFAULT_PRIORITY)
+
+
+def _provider_llm(provider: str, build=lambda llm: llm, lazy: bool = False) -> Runnable:
+    """
+    `build(get_llm(provider))` protegido pelo circuit breaker do provedor (NT_AI_CIRCUIT_BREAKER,
+    ativo por padrão) e, com NT_AI_RATE_LIMIT=true, enfileirado no agendador de chamadas do
+    provedor (cotas de RPM/TPM, prioridade da execução, recuo em 429; ver `rate_limiter.py`).
+    Com `lazy=True`, o cliente só é criado na primeira chamada (provedor de reserva, que pode
+    nunca ser usado).
+    """
+    breaker = get_circuit_breaker(provider) if env_bool("NT_AI_CIRCUIT_BREAKER", True) else None
+    scheduler = get_rate_scheduler(provider) if env_bool("NT_AI_RATE_LIMIT", False) else None
+    if breaker is None and scheduler is None:
+        return build(get_llm(provider))
+    runnables = [] if lazy else [build(get_llm(provider))]
+
+    def _runnable() -> Runnable:
+        if not runnables:
+            runnables.append(build(get_llm(provider)))
+        return runnables[0]
+
+    # Com o circuito aberto, a chamada não entra na fila: o circuit breaker a rejeita na hora.
+    def _scheduled() -> bool:
+        return scheduler is not None and (breaker is None or breaker.state != OPEN)
+
+    def _invoke(inputs, config: RunnableConfig):
+        call = lambda: _runnable().invoke(inputs, config=config)
+        if not _scheduled():
+            return breaker.call(call) if breaker else call()
+        tokens = _estimated_tokens(inputs)
+        scheduler.acquire(tokens, _priority(config))
+        try:
+            result = breaker.call(call) if breaker else call()
+        except Exception as e:
+            scheduler.record_failure(e)
+            raise
+        scheduler.record_success(tokens, _usage_tokens(result))
+        return result
+
+    async def _ainvoke(inputs, config: RunnableConfig):
+        call = lambda: _runnable().ainvoke(inputs, config=config)
+        if not _scheduled():
+            return await (breaker.acall(call) if breaker else call())
+        tokens = _estimated_tokens(inputs)
+        await scheduler.aacquire(tokens, _priority(config))
+        try:
+            result = await (breaker.acall(call) if breaker else call())
+        except Exception as e:
+            scheduler.record_failure(e)
+            raise
+        scheduler.record_success(tokens, _usage_tokens(result))
+        return result
+
+    return RunnableLambda(_invoke, afunc=_ainvoke, name=f"llm_{provider}")
+
+
+def _with_provider_fallback(primary: Runnable, secondary: Runnable, provider: str) -> Runnable:
+    """
+    Usa o provedor secundário enquanto o circuito do principal estiver aberto.
+    """
+    def _invoke(inputs, config: RunnableConfig):
+        try:
+            return primary.invoke(inputs, config=config)
+        except CircuitOpenError:
+            logger.warning(f"Circuito aberto; usando o provedor secundário '{provider}'.")
+            return secondary.invoke(inputs, config=config)
+
+    async def _ainvoke(inputs, config: RunnableConfig):
+        try:
+            return await primary.ainvoke(inputs, config=config)
+        except CircuitOpenError:
+            logger.warning(f"Circuito aberto; usando o provedor secundário '{provider}'.")
+            return await secondary.ainvoke(inputs, config=config)
+
+    return RunnableLambda(_invoke, afunc=_ainvoke, name="provider_fallback")
+
+
+def get_model_router() -> ComplexityRouter:
+    """
+    Retorna o roteador de modelos, registrando suas métricas na primeira chamada.
+
+    Configuração (variáveis de ambiente):
+    - NT_AI_ROUTER_FAST_PROVIDER    (padrão: "groq")
+    - NT_AI_ROUTER_STRONG_PROVIDER  (padrão: "google")
+    - NT_AI_ROUTER_THRESHOLD        (padrão: 3; nota a partir da qual a pergunta vai ao modelo forte)
+    """
+    global _model_router
+    if _model_router is None:
+        _model_router = ComplexityRouter(
+            {
+                TIER_FAST: _get_provider("NT_AI_ROUTER_FAST_PROVIDER", "groq"),
+                TIER_STRONG: _get_provider("NT_AI_ROUTER_STRONG_PROVIDER", "google"),
+            },
+            threshold=env_int("NT_AI_ROUTER_THRESHOLD", 3),
+        )
+        metrics.register("model_router", _model_router.stats)
+    return _model_router
+
+
+def _tier(config: RunnableConfig) -> str:
+    """
+    Faixa de modelo da execução (metadados). Sem faixa definida, usa o modelo forte.
+    """
+    tier = ((config or {}).get("metadata") or {}).get(TIER_METADATA_KEY)
+    return tier if tier in TIERS else TIER_STRONG
+
+
+def _escalation_reason(stage: str, validate, result):
+    """
+    Motivo para refazer na faixa forte a resposta da faixa rápida (None = resposta aceita):
+    saída que não passa na validação da etapa ou, no Parser e na chamada fundida, um JSON com
+    valores que o validador de filtros descartaria.
+    """
+    if not validate(result):
+        return "invalid_output"
+    if stage in ("parser", "fused") and not isinstance(result, dict):
+        parsed_json = repair_json(_message_text(result))[0]
+        rejected = rejected_fields(parsed_json) if isinstance(parsed_json, dict) else []
+        if rejected:
+            logger.info(f"Roteador de modelos ({stage}): valores fora das listas em {rejected}; escalando para a faixa forte.")
+            return "rejected_values"
+    return None
+
+
+def _routed_stage_llm(stage: str, validate, build) -> Runnable:
+    """
+    LLM de uma etapa com o roteador de modelos: usa o provedor da faixa da execução. Na faixa
+    rápida, SÓ esta etapa é refeita na faixa forte (as demais não são repetidas) quando o
+    provedor falha (`DEGRADABLE_ERRORS`) ou quando a resposta é rejeitada (ver
+    `_escalation_reason`). Faixas forçadas nos metadados não são escalonadas. Com o circuit
+    breaker ativo, cada faixa usa a outra como reserva enquanto seu circuito estiver aberto.
+    """
+    router = get_model_router()
+    tiers = {}
+    for tier in TIERS:
+        provider, other = router.providers[tier], router.providers[TIER_STRONG if tier == TIER_FAST else TIER_FAST]
+        tiers[tier] = _provider_llm(provider, build)
+        if env_bool("NT_AI_CIRCUIT_BREAKER", True) and other != provider:
+            tiers[tier] = _with_provider_fallback(tiers[tier], _provider_llm(other, build, lazy=True), other)
+
+    def _escalates(config: RunnableConfig) -> bool:
+        return _tier(config) == TIER_FAST and not ((config or {}).get("metadata") or {}).get(TIER_FORCED_METADATA_KEY)
+
+    def _invoke(inputs, config: RunnableConfig):
+        if not _escalates(config):
+            return tiers[_tier(config)].invoke(inputs, config=config)
+        try:
+            result = tiers[TIER_FAST].invoke(inputs, config=config)
+            reason = _escalation_reason(stage, validate, result)
+        except DEGRADABLE_ERRORS:
+            reason = "error"
+        if reason is None:
+            return result
+        router.record_escalation(f"{reason}:{stage}")
+        return tiers[TIER_STRONG].invoke(inputs, config=config)
+
+    async def _ainvoke(inputs, config: RunnableConfig):
+        if not _escalates(config):
+            return await tiers[_tier(config)].ainvoke(inputs, config=config)
+        try:
+            result = await tiers[TIER_FAST].ainvoke(inputs, config=config)
+            reason = _escalation_reason(stage, validate, result)
+        except DEGRADABLE_ERRORS:
+            reason = "error"
+        if reason is None:
+            return result
+        router.record_escalation(f"{reason}:{stage}")
+        return await tiers[TIER_STRONG].ainvoke(inputs, config=config)
+
+    return RunnableLambda(_invoke, afunc=_ainvoke, name=f"routed_{stage}")
+
+
+def _with_model_router(chain: Runnable) -> Runnable:
+    """
+    Escolhe a faixa de modelo da pergunta (ver `model_router.py`) e a grava nos metadados da
+    execução, lidos pelas etapas com LLM (`_routed_stage_llm`), que cuidam do escalonamento.
+    Uma faixa já presente nos metadados é respeitada e marcada como forçada (sem escalonamento).
+    """
+    router = get_model_router()
+
+    def _routed_config(inputs: dict, config: RunnableConfig):
+        metadata = (config or {}).get("metadata") or {}
+        tier = metadata.get(TIER_METADATA_KEY)
+        if tier in TIERS:
+            return tier, {**config, "metadata": {**metadata, TIER_FORCED_METADATA_KEY: True}}
+        tier, score, signals = router.route(inputs["query"])
+        logger.info(f"Roteador de modelos: faixa '{tier}' (nota {score}, sinais {signals}).")
+        return tier, {**config, "metadata": {**metadata, TIER_METADATA_KEY: tier}}
+
+    def _invoke(inputs: dict, config: RunnableConfig):
+        tier, routed_config = _routed_config(inputs, config)
+        start = time.perf_counter()
+        result = chain.invoke(inputs, config=routed_config)
+        router.record(tier, time.perf_counter() - start)
+        return result
+
+    async def _ainvoke(inputs: dict, config: RunnableConfig):
+        tier, routed_config = _routed_config(inputs, config)
+        start = time.perf_counter()
+        result = await chain.ainvoke(inputs, config=routed_config)
+        router.record(tier, time.perf_counter() - start)
+        return result
+
+    return RunnableLambda(_invoke, afunc=_ainvoke, name="model_router")
+
+
+def _stage_llm(stage: str, validate, build=lambda llm: llm) -> Runnable:
+    """
+    LLM de uma etapa (`build(llm)`, ex: o próprio cliente ou a sua versão com saída estruturada),
+    protegido pelo circuit breaker de cada provedor.
+    - Com hedging ativo para a etapa (NT_AI_HEDGING=true e a etapa em NT_AI_HEDGE_STAGES), a etapa
+      corre no provedor principal e, se ele demorar, também no secundário (ver `hedging.py`).
+    - Sem hedging, o secundário (NT_AI_SECONDARY_PROVIDER) só é usado com o circuito do
+      principal aberto.
+    - Com o roteador de modelos (NT_AI_MODEL_ROUTER=true), o provedor vem da faixa da execução
+      (ver `_routed_stage_llm`).
+    """
+    if env_bool("NT_AI_MODEL_ROUTER", False):
+        return _routed_stage_llm(stage, validate, build)
+    primary_provider = _get_provider("NT_AI_LLM_PROVIDER", "google")
+    secondary_provider = _get_provider("NT_AI_SECONDARY_PROVIDER", "groq")
+    primary = _provider_llm(primary_provider, build)
+    if secondary_provider == primary_provider:
+        return primary
+
+    stages = [name.strip() for name in env_str("NT_AI_HEDGE_STAGES", ",".join(LLM_STAGES)).split(",")]
+    if env_bool("NT_AI_HEDGING", False) and stage in stages:
+        hedge = get_hedged_stage(stage)
+        secondary = _provider_llm(secondary_provider, build)
+
+        def _invoke(inputs, config: RunnableConfig):
+            return hedge.invoke(primary, secondary, inputs, config, validate)
+
+        async def _ainvoke(inputs, config: RunnableConfig):
+            return await hedge.ainvoke(primary, secondary, inputs, config, validate)
+
+        return RunnableLambda(_invoke, afunc=_ainvoke, name=f"hedged_{stage}")
+
+    if env_bool("NT_AI_CIRCUIT_BREAKER", True):
+        return _with_provider_fallback(primary, _provider_llm(secondary_provider, build, lazy=True), secondary_provider)
+    return primary
+
+
+def get_degraded_parser() -> DegradedParser:
+    """
+    Retorna a instância única do parser degradado, registrando suas métricas na primeira chamada.
+    """
+    global _degraded_parser
+    if _degraded_parser is None:
+        _degraded_parser = DegradedParser(DateResolver())
+        metrics.register("degraded_mode", _degraded_parser.stats)
+    return _degraded_parser
+
+
+def _with_degraded_fallback(chain: Runnable, debug: bool = False) -> Runnable:
+    """
+    Se a cadeia com LLM falhar por erro de provedor (circuitos abertos, erros da API, timeout;
+    ver `DEGRADABLE_ERRORS`), devolve a interpretação por palavras-chave do `DegradedParser`,
+    marcada com o caminho 'degraded', em vez de um erro. Os demais erros são propagados.
+    O resultado degradado não entra no cache.
+    Pode ser desligado com NT_AI_DEGRADED_MODE=false.
+    """
+    if not env_bool("NT_AI_DEGRADED_MODE", True):
+        return chain
+    parser = get_degraded_parser()
+
+    def _degraded(inputs: dict, error: Exception) -> dict:
+        logger.error(f"Falha na cadeia com LLM ({type(error).__name__}: {error}); respondendo em modo degradado.")
+        dates = _resolve_dates(inputs)
+        parsed_json = parser.parse(inputs["query"], dates)
+        if debug:
+            return {**inputs, "dates": dates, "enhanced_query": None, "parsed_json": parsed_json, "path": PATH_DEGRADED}
+        return {"parsed_json": parsed_json, "path": PATH_DEGRADED}
+
+    def _invoke(inputs: dict, config: RunnableConfig) -> dict:
+        try:
+            return chain.invoke(inputs, config=config)
+        except DEGRADABLE_ERRORS as e:
+            return _degraded(inputs, e)
+
+    async def _ainvoke(inputs: dict, config: RunnableConfig) -> dict:
+        try:
+            return await chain.ainvoke(inputs, config=config)
+        except DEGRADABLE_ERRORS as e:
+            return _degraded(inputs, e)
+
+    return RunnableLambda(_invoke, afunc=_ainvoke, name="degraded_fallback")
+
+
+def _with_micro_batcher(json_parser_chain: Runnable, parser_llm: Runnable) -> Runnable:
+    """
+    Agrupa as chamadas assíncronas ao Parser que chegam juntas em uma única chamada ao LLM com o
+    `BATCH_PARSER_PROMPT` (ver `micro_batcher.py`). Só entram no mesmo lote perguntas com o mesmo
+    contexto de datas (e a mesma faixa de modelo); o lote usa a execução de maior prioridade
+    entre as suas. Itens ausentes ou malformados na resposta, ou todos os itens se a chamada em
+    lote falhar, são refeitos pelo `json_parser_chain` individual. Os dois caminhos devolvem o
+    mesmo formato: o JSON completo de `expand_filters`.
+
+    Configuração (variáveis de ambiente):
+    - NT_AI_MICRO_BATCH                 (padrão: false)
+    - NT_AI_MICRO_BATCH_WINDOW_SECONDS  (padrão: 0.03; janela de coleta do lote)
+    - NT_AI_MICRO_BATCH_MAX_ITEMS       (padrão: 8 perguntas por lote)
+    """
+    batch_chain = _snapshot_prompt(BATCH_PARSER_PROMPT, "enhanced_queries") | parser_llm | StrOutputParser()
+
+    async def _run_batch(items: list, configs: list) -> list:
+        texts = "\n".join(f"{i}. {json.dumps(item['enhanced_query'], ensure_ascii=False)}" for i, item in enumerate(items, 1))
+        config = min(configs, key=lambda c: PRIORITIES.get(_priority(c), PRIORITIES[DEFAULT_PRIORITY]))
+        parsed = repair_json(await batch_chain.ainvoke({**items[0], "enhanced_queries": texts}, config=config))[0] or {}
+        results = [parsed.get(str(i)) for i in range(1, len(items) + 1)]
+        return [expand_filters(result) if isinstance(result, dict) else None for result in results]
+
+    async def _run_single(inputs: dict, config: RunnableConfig):
+        return expand_filters(await json_parser_chain.ainvoke(inputs, config=config))
+
+    batcher = MicroBatcher(
+        "parser",
+        _run_batch,
+        _run_single,
+        window_seconds=env_float("NT_AI_MICRO_BATCH_WINDOW_SECONDS", 0.03),
+        max_items=env_int("NT_AI_MICRO_BATCH_MAX_ITEMS", 8),
+    )
+    metrics.register("micro_batch_parser", batcher.stats)
+
+    def _invoke(inputs: dict, config: RunnableConfig):
+        return expand_filters(json_parser_chain.invoke(inputs, config=config))
+
+    async def _ainvoke(inputs: dict, config: RunnableConfig):
+        # Perguntas de faixas de modelo diferentes (roteador) não entram no mesmo lote.
+        group = (_tier(config), tuple(sorted((key, value) for key, value in inputs.items() if key != "enhanced_query")))
+        return await batcher.asubmit(group, inputs, config)
+
+    return RunnableLambda(_invoke, afunc=_ainvoke, name="micro_batch_parser")
+
+
+def _get_pipeline_mode() -> str:
+    """
+    Lê o modo da linha de montagem (NT_AI_PIPELINE_MODE). Valores desconhecidos usam "two_stage".
+    """
+    mode = env_str("NT_AI_PIPELINE_MODE", "two_stage").lower()
+    if mode not in PIPELINE_MODES:
+        logger.warning(f"NT_AI_PIPELINE_MODE inválido: '{mode}'. Usando 'two_stage'.")
+        return "two_stage"
+    return mode
+
+
+def _create_fused_chain() -> Runnable:
+    """
+    Constrói a cadeia do modo de chamada única.
+    Entrada: {'query', 'dates'}. Saída: {'enhanced_query', 'parsed_json'}, com o mesmo
+    esquema de JSON da linha de montagem em dois estágios.
+    """
+    output_fixing_parser = OutputFixingParser.from_llm(parser=JsonOutputParser(), llm=_provider_llm(_get_provider("NT_AI_LLM_PROVIDER", "google")))
+    return (
+        RunnableLambda(lambda x: {**x["dates"], "query": x["query"]})
+        | _snapshot_prompt(FUSED_PROMPT, "query")
+        | _stage_llm("fused", _valid_parser_output, build=_json_llm)
+        | StrOutputParser()
+        | RunnableParallel(
+            enhanced_query=RunnableLambda(_extract_normalized_query),
+            parsed_json=RunnableLambda(_extract_json_from_output) | _with_json_repair(output_fixing_parser),
+        )
+    )
 
 
 def _create_chains():
@@ -121,11 +1235,15 @@ def _create_chains():
     Função "fábrica" auxiliar para construir e configurar os componentes base das cadeias.
     Esta função é chamada uma vez na inicialização para criar os objetos reutilizáveis.
     """
-    llm = get_llm_google()
-    # llm = get_llm_groq()
+    llm = _provider_llm(_get_provider("NT_AI_LLM_PROVIDER", "google"))
     
     # --- Definição da Cadeia de Normalização (Enhancer) ---
-    query_enhancer_chain = QUERY_ENHANCER_PROMPT | llm | StrOutputParser()
+    # Envolvida pelo cache do Enhancer (ver `_with_enhancer_cache`). Nos modos "rules" e
+    # "hybrid", o Enhancer determinístico assume e o LLM fica apenas como fallback.
+    query_enhancer_chain = _with_enhancer_cache(_snapshot_prompt(QUERY_ENHANCER_PROMPT, "query") | _stage_llm("enhancer", _valid_enhancer_output) | StrOutputParser())
+    enhancer_mode = _get_enhancer_mode()
+    if enhancer_mode != "llm":
+        query_enhancer_chain = _with_rule_enhancer(query_enhancer_chain, enhancer_mode)
     
     # --- Definição da Cadeia de Parsing com Auto-Correção ---
     # O OutputFixingParser é usado para tentar corrigir/validar a saída do LLM como JSON.
@@ -136,22 +1254,46 @@ def _create_chains():
     # ==================================================================
     #
     # Fluxo Atual (CoT Desativado):
-    # 1. `JSON_PARSER_PROMPT | llm`: O prompt é enviado ao LLM.
+    # 1. `JSON_PARSER_PROMPT | parser_llm`: O prompt é enviado ao LLM (com hedging, se ativo).
     # 2. `| StrOutputParser()`: A saída (esperada como string JSON) é capturada.
-    # 3. `| output_fixing_parser`: O parser tenta corrigir e validar o JSON.
+    # 3. `| _with_json_repair(output_fixing_parser)`: Reparo local do JSON; o parser de
+    #    auto-correção (LLM) só é acionado se o reparo local falhar.
     #
     # Fluxo Anterior (CoT Ativado - linha comentada abaixo):
     # O CoT gerava "Pensamento + JSON FINAL:", exigindo um passo extra (`RunnableLambda`)
     # para extrair o JSON antes de passar ao `output_fixing_parser`.
     # Foi desativado devido a performance/rate limits (ver função _extract_json_from_output).
     #
+    if env_bool("NT_AI_STRUCTURED_OUTPUT", False):
+        # Saída estruturada nativa: prompt sem as instruções de formato e sem OutputFixingParser
+        # no caminho normal (ver `_with_structured_output`).
+        json_parser_chain = _parser_prompt(STRUCTURED_PARSER_PROMPT, "structured") | _with_structured_output(
+            _stage_llm("parser", _valid_structured_output, build=_structured_llm), output_fixing_parser
+        )
+        return query_enhancer_chain, json_parser_chain
+
+    parser_llm = _stage_llm("parser", _valid_parser_output, build=_json_llm)
+    if env_bool("NT_AI_SPARSE_OUTPUT", False):
+        # Saída esparsa: o LLM escreve apenas os campos preenchidos e o JSON completo
+        # (todos os campos, null nos ausentes) é reconstruído localmente.
+        json_parser_chain = (
+            _parser_prompt(SPARSE_PARSER_PROMPT, "sparse", sparse=True)
+            | parser_llm
+            | StrOutputParser()
+            | _with_json_repair(output_fixing_parser)
+            | RunnableLambda(expand_filters)
+        )
+        return query_enhancer_chain, json_parser_chain
+
     json_parser_chain = (
-        JSON_PARSER_PROMPT
-        | llm
+        _parser_prompt(JSON_PARSER_PROMPT, "full")
+        | parser_llm
         | StrOutputParser() # Captura a saída do LLM como string
         # | RunnableLambda(_extract_json_from_output)  # [CoT DESATIVADO] Extrairia o JSON do "Pensamento"
-        | output_fixing_parser # Tenta parsear/corrigir o JSON
+        | _with_json_repair(output_fixing_parser) # Tenta parsear/corrigir o JSON (localmente e, se preciso, via LLM)
     )
+    if env_bool("NT_AI_MICRO_BATCH", False):
+        json_parser_chain = _with_micro_batcher(json_parser_chain, parser_llm)
     # ==================================================================
     # --- FIM DA CONFIGURAÇÃO ---
     # ==================================================================
@@ -159,56 +1301,157 @@ def _create_chains():
     return query_enhancer_chain, json_parser_chain
 
 
+def get_single_flight(name: str) -> SingleFlight:
+    """
+    Retorna o grupo de coalescência da cadeia `name` ("master" ou "debug"), registrando
+    suas métricas na primeira chamada.
+    """
+    if name not in _single_flights:
+        _single_flights[name] = SingleFlight(name)
+        metrics.register(f"single_flight_{name}", _single_flights[name].stats)
+    return _single_flights[name]
+
+
+def _llm_calls_per_run() -> int:
+    """
+    Chamadas ao LLM de uma execução da linha de montagem (estimativa, sem contar o
+    OutputFixingParser): uma no modo de chamada única; no modo em dois estágios, o Parser
+    mais o Enhancer quando ele é o LLM (nos modos "rules" e "hybrid", conta-se só o Parser).
+    """
+    if _get_pipeline_mode() == "single_call":
+        return 1
+    return 2 if _get_enhancer_mode() == "llm" else 1
+
+
+def _with_single_flight(chain: Runnable, name: str) -> Runnable:
+    """
+    Requisições concorrentes com a mesma pergunta canônica, o mesmo contexto de datas, a mesma
+    prioridade e a mesma faixa de modelo (metadados da execução) compartilham UMA execução da
+    cadeia (ver `app/core/single_flight.py`). Assim, uma requisição interativa não espera na
+    fila de uma de lote, nem uma faixa forçada recebe a resposta de outra.
+    Pode ser desligado com NT_AI_SINGLE_FLIGHT=false.
+    """
+    if not env_bool("NT_AI_SINGLE_FLIGHT", True):
+        return chain
+    group = get_single_flight(name)
+    calls_per_run = _llm_calls_per_run()
+
+    def _prepare(inputs: dict, config: RunnableConfig):
+        dates = _resolve_dates(inputs)
+        tier = ((config or {}).get("metadata") or {}).get(TIER_METADATA_KEY)
+        key = (canonicalize_query(inputs["query"]), tuple(sorted(dates.items())), _priority(config), tier)
+        return key, {**inputs, "dates": dates}
+
+    def _invoke(inputs: dict, config: RunnableConfig):
+        key, inputs = _prepare(inputs, config)
+        return group.do(key, lambda: chain.invoke(inputs, config=config), calls_per_run)
+
+    async def _ainvoke(inputs: dict, config: RunnableConfig):
+        key, inputs = _prepare(inputs, config)
+        return await group.ado(key, lambda: chain.ainvoke(inputs, config=config), calls_per_run)
+
+    return RunnableLambda(_invoke, afunc=_ainvoke, name=f"single_flight_{name}")
+
+
+def _speculative_parser_inputs(inputs: dict, text: str) -> dict:
+    return {**inputs["dates"], "enhanced_query": text}
+
+
+def get_speculative_parser(query_enhancer_chain: Runnable, json_parser_chain: Runnable) -> SpeculativeParser:
+    """
+    Retorna o executor do Parser especulativo, criando-o (e registrando suas métricas) na
+    primeira chamada.
+    """
+    global _speculative_parser
+    if _speculative_parser is None:
+        _speculative_parser = SpeculativeParser(query_enhancer_chain, json_parser_chain, _speculative_parser_inputs)
+        metrics.register("speculative_parse", _speculative_parser.stats)
+    return _speculative_parser
+
+
+def _get_pipeline() -> Runnable:
+    """
+    Retorna a linha de montagem do modo atual (NT_AI_PIPELINE_MODE), construída uma única vez
+    e compartilhada pelas cadeias de produção e de debug.
+    Entrada: {'query'} (e, opcionalmente, 'dates', vindas do cache de resultados).
+    Saída: {'query', 'dates', 'enhanced_query', 'parsed_json'}, já com as etapas determinísticas
+    pós-Parser (resolvedor de datas e validador de filtros) aplicadas.
+    """
+    mode = _get_pipeline_mode()
+    if mode in _pipelines:
+        return _pipelines[mode]
+
+    if mode == "single_call":
+        # Modo de chamada única: datas -> FUSED_PROMPT -> LLM -> pergunta normalizada + JSON final.
+        # 'enhanced_query' é None se o modelo não emitir a pergunta normalizada.
+        pipeline = (
+            RunnablePassthrough.assign(dates=_resolve_dates)
+            .assign(fused=_create_fused_chain().with_config(run_name=STAGE_FUSED))
+            | RunnableLambda(lambda x: {"query": x["query"], "dates": x["dates"], **x["fused"]})
+        )
+    else:
+        query_enhancer_chain, json_parser_chain = _create_chains()
+        query_enhancer_chain = query_enhancer_chain.with_config(run_name=STAGE_ENHANCER)
+        json_parser_chain = json_parser_chain.with_config(run_name=STAGE_PARSER)
+
+        # A linha de montagem:
+        # 1. RunnablePassthrough.assign(dates=...): Usa as datas da chave do cache (ou as calcula)
+        #    e adiciona ao fluxo.
+        # 2. .assign(enhanced_query=...): Passa o fluxo (query + datas) para o Enhancer
+        #    e adiciona o resultado como 'enhanced_query'.
+        # 3. .assign(parsed_json=...): Reorganiza o dicionário para a entrada do Parser
+        #    ('dates' e 'enhanced_query' no nível raiz) e guarda o JSON final em 'parsed_json'.
+        pipeline = (
+            RunnablePassthrough.assign(dates=_resolve_dates)
+            .assign(
+                enhanced_query=query_enhancer_chain
+            ).assign(
+                parsed_json=(lambda x: {**x["dates"], "enhanced_query": x["enhanced_query"]}) | json_parser_chain
+            )
+        )
+
+        # Parser especulativo: Enhancer e Parser (sobre a pergunta original) em paralelo.
+        # Só vale com o Enhancer LLM; nos modos "rules" e "hybrid" o Enhancer já é rápido.
+        if env_bool("NT_AI_SPECULATIVE_PARSE", False) and _get_enhancer_mode() == "llm":
+            speculative = get_speculative_parser(query_enhancer_chain, json_parser_chain)
+            pipeline = (
+                RunnablePassthrough.assign(dates=_resolve_dates)
+                .assign(speculative=RunnableLambda(speculative.invoke, afunc=speculative.ainvoke, name="speculative_parse"))
+                | RunnableLambda(lambda x: {"query": x["query"], "dates": x["dates"], **x["speculative"]})
+            )
+
+    if env_bool("NT_AI_MODEL_ROUTER", False):
+        pipeline = _with_model_router(pipeline)
+    _pipelines[mode] = _with_filter_validator(_with_date_resolver(pipeline))
+    return _pipelines[mode]
+
+
 def create_master_chain() -> Runnable:
     """
     Cria a cadeia principal de PRODUÇÃO.
     Esta cadeia orquestra o fluxo completo, injetando as datas atuais a cada
     execução, passando pela normalização e pelo parsing, e retornando o JSON final.
+    A cadeia completa é precedida pelo caminho rápido e pelo cache de resultados.
+    Saída: {'parsed_json': <JSON de filtros>, 'path': 'fast_path' | 'cache' | 'llm'}.
     """
-    query_enhancer_chain, json_parser_chain = _create_chains()
-    
-    # A linha de montagem:
-    # 1. RunnablePassthrough.assign(dates=...): Calcula as datas atuais e adiciona ao fluxo.
-    # 2. .assign(enhanced_query=...): Passa o fluxo (query + datas) para o Enhancer
-    #    e adiciona o resultado como 'enhanced_query'.
-    # 3. | (lambda...): Reorganiza o dicionário para preparar a entrada do Parser,
-    #    colocando 'dates' e 'enhanced_query' no nível raiz.
-    # 4. | json_parser_chain: Passa o dicionário preparado para a cadeia de parsing,
-    #    que gera o JSON final.
-    master_chain = (
-        RunnablePassthrough.assign(dates=_get_current_dates)
-        .assign(
-            enhanced_query=query_enhancer_chain
-        )
-        | (lambda x: {**x["dates"], "enhanced_query": x["enhanced_query"]})
-        | json_parser_chain
-    )
-    return master_chain
+    master_chain = _get_pipeline() | RunnableLambda(lambda x: x["parsed_json"])
+    return _with_fast_path(_with_degraded_fallback(_with_result_cache(_with_single_flight(master_chain, "master"))))
+
 
 def create_debug_chain() -> Runnable:
     """
     Cria a cadeia de DEBUG.
-    Funciona de forma idêntica à master_chain, mas retorna os resultados de cada
-    passo intermediário ('dates', 'enhanced_query', 'parsed_json') para facilitar a depuração.
+    Reutiliza a mesma linha de montagem (e o mesmo cliente LLM) da master_chain, apenas
+    devolvendo os resultados de cada passo intermediário ('dates', 'enhanced_query',
+    'parsed_json') e o caminho que atendeu a requisição ('path') para facilitar a depuração.
+    Não passa pelo cache de resultados: cada chamada executa a linha de montagem.
     """
-    query_enhancer_chain, json_parser_chain = _create_chains()
-    
-    # Prepara o passo de transformação de dados para o parser (idêntico ao master_chain)
-    debug_parser_input = (lambda x: {**x["dates"], "enhanced_query": x["enhanced_query"]})
-    
-    # A linha de montagem de debug:
-    # Executa os mesmos passos do master_chain, mas usa .assign() extra
-    # para preservar os resultados intermediários ('dates', 'enhanced_query')
-    # e adicionar o resultado final do parser sob a chave 'parsed_json'.
-    debug_chain = (
-        RunnablePassthrough.assign(dates=_get_current_dates) # Passo 1: Calcula datas
-        .assign(
-            enhanced_query=query_enhancer_chain # Passo 2: Roda o Enhancer
-        ).assign( # Passo 3 & 4 combinados: Prepara input, Roda Parser e guarda resultado
-            parsed_json = debug_parser_input | json_parser_chain
-        )
+    debug_chain = _get_pipeline() | RunnablePassthrough.assign(path=lambda _: PATH_LLM)
+    # As chamadas ao LLM do debug entram na fila de prioridade "debug" (ver `rate_limiter.py`).
+    debug_chain = _with_single_flight(debug_chain, "debug")
+    return _with_fast_path(_with_degraded_fallback(debug_chain, debug=True), debug=True).with_config(
+        metadata={PRIORITY_METADATA_KEY: "debug"}
     )
-    return debug_chain
 
 # =================================================================================================
 # Análise de Fluxo e Dados das Cadeias (Chains)
@@ -236,8 +1479,8 @@ def create_debug_chain() -> Runnable:
 #      variáveis (ex: {today}, {week_start}, {enhanced_query}).
 #   3. Envia para o LLM, que gera uma string (idealmente formatada como JSON).
 #   4. O StrOutputParser captura essa string de saída.
-#   5. O OutputFixingParser tenta parsear a string como JSON. Se falhar, ele pede ao LLM
-#      para corrigir a sintaxe e tenta parsear novamente.
+#   5. O JsonRepairer tenta parsear a string como JSON, corrigindo localmente problemas de
+#      formatação. Só se falhar o OutputFixingParser pede ao LLM para corrigir a sintaxe.
 # Exemplo de Entrada:
 #   {
 #     "today": "2025-10-22", "last_week_start": "2025-10-13", ...
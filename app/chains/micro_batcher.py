@@ -0,0 +1,139 @@
+# =================================================================================================
+#
+#                       MICRO-LOTES DE PERGUNTAS SIMULTÂNEAS (UMA CHAMADA AO LLM)
+#
+# Visão Geral do Módulo:
+#
+# Sob rajadas de tráfego, com uma cota de RPM apertada, cada pergunta gasta uma requisição inteira
+# e reenvia o mesmo prefixo enorme do prompt do Parser. O micro-batcher junta as perguntas que
+# chegam em uma janela curta e as envia em UMA chamada:
+#
+# 1. Coleta:
+#    - A primeira pergunta de um grupo abre uma janela (`window_seconds`, ex: 30 ms). As que
+#      chegam dentro dela entram no mesmo lote, até `max_items`; o lote cheio é enviado na hora.
+#    - Só entram no mesmo lote perguntas com o mesmo grupo (ex: o mesmo contexto de datas, que
+#      faz parte do prefixo do prompt).
+#
+# 2. Execução e Despacho:
+#    - Um lote de uma pergunta só segue o caminho individual normal (`run_single`).
+#    - Os demais vão para `run_batch`, que devolve um resultado por pergunta, na ordem. Cada
+#      requisição recebe o seu; um item ausente ou malformado (None) é refeito individualmente,
+#      sem afetar os demais. Se a chamada em lote falhar, todas as perguntas do lote são
+#      refeitas individualmente (cada uma recebe o seu próprio resultado ou erro).
+#    - A requisição cancelada enquanto espera apenas deixa de receber o resultado.
+#
+# 3. Métricas:
+#    - Lotes, perguntas em lote, tamanho médio do lote, itens refeitos individualmente e
+#      chamadas ao LLM economizadas.
+#
+# - Apenas o modo assíncrono (`asubmit`) agrupa perguntas; chamadas síncronas (threads) seguem
+#   sempre o caminho individual.
+#
+# =================================================================================================
+
+import asyncio
+import logging
+import threading
+from typing import Awaitable, Callable, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Agrupa as chamadas assíncronas que chegam em uma janela curta em uma única execução em lote.
+    """
+
+    def __init__(self, name: str, run_batch: Callable[[List[dict], list], Awaitable[List[Optional[object]]]],
+                 run_single: Callable[[dict, object], Awaitable], window_seconds: float = 0.03, max_items: int = 8):
+        self.name = name
+        self.run_batch = run_batch
+        self.run_single = run_single
+        self.window_seconds = window_seconds
+        self.max_items = max(1, max_items)
+        self._lock = threading.Lock()
+        self._pending = {}
+        self.batches = 0
+        self.batched_items = 0
+        self.single_items = 0
+        self.fallback_items = 0
+
+    async def asubmit(self, group: Hashable, inputs: dict, config):
+        """
+        Entra no lote aberto do grupo (ou abre um) e aguarda o resultado desta pergunta.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            batch = self._pending.setdefault(group, [])
+            batch.append((inputs, config, future))
+            if len(batch) >= self.max_items:
+                del self._pending[group]
+                loop.create_task(self._execute(batch))
+            elif len(batch) == 1:
+                loop.call_later(self.window_seconds, self._flush, group, batch, loop)
+        return await future
+
+    def _flush(self, group: Hashable, batch: list, loop) -> None:
+        """
+        Fim da janela: envia o lote, se ele ainda não tiver sido enviado por estar cheio.
+        """
+        with self._lock:
+            if self._pending.get(group) is not batch:
+                return
+            del self._pending[group]
+        loop.create_task(self._execute(batch))
+
+    async def _execute(self, batch: list) -> None:
+        batch = [item for item in batch if not item[2].done()]
+        if not batch:
+            return
+        if len(batch) == 1:
+            with self._lock:
+                self.single_items += 1
+            await self._execute_single(*batch[0])
+            return
+
+        try:
+            results = await self.run_batch([inputs for inputs, _, _ in batch], [config for _, config, _ in batch])
+        except Exception as e:
+            logger.warning(f"Micro-lote ({self.name}): falha na chamada em lote ({type(e).__name__}: {e}); refazendo {len(batch)} itens individualmente.")
+            results = None
+
+        retries = []
+        for (inputs, config, future), result in zip(batch, results or [None] * len(batch)):
+            if result is None:
+                retries.append((inputs, config, future))
+            elif not future.done():
+                future.set_result(result)
+        with self._lock:
+            self.batches += 1
+            self.batched_items += len(batch)
+            self.fallback_items += len(retries)
+        if results is not None and retries:
+            logger.warning(f"Micro-lote ({self.name}): {len(retries)} de {len(batch)} itens malformados; refazendo individualmente.")
+        if retries:
+            await asyncio.gather(*(self._execute_single(*item) for item in retries))
+
+    async def _execute_single(self, inputs: dict, config, future: asyncio.Future) -> None:
+        try:
+            result = await self.run_single(inputs, config)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "window_seconds": self.window_seconds,
+                "max_items": self.max_items,
+                "batches": self.batches,
+                "batched_items": self.batched_items,
+                "avg_batch_size": round(self.batched_items / self.batches, 2) if self.batches else 0.0,
+                "single_items": self.single_items,
+                "fallback_items": self.fallback_items,
+                "llm_calls_saved": self.batched_items - self.batches - self.fallback_items,
+            }
@@ -0,0 +1,168 @@
+# =================================================================================================
+#
+#                       ROTEADOR DE MODELOS POR COMPLEXIDADE DA PERGUNTA
+#
+# Visão Geral do Módulo:
+#
+# Os dois provedores têm perfis diferentes: o Llama 3.1 8B da Groq é muito rápido, o Gemini 2.5
+# Flash é mais preciso. Em vez de um modelo fixo para todas as perguntas, cada pergunta recebe
+# uma nota de complexidade calculada localmente (sem LLM) e vai para uma das faixas:
+#
+# 1. Nota de Complexidade (`score_complexity`):
+#    - Entidades: conceitos de negócio reconhecidos (`CONCEPT_PATTERN`), campos do caminho
+#      rápido (NF, UF, operação, CNPJ) e UFs citadas após preposição ("notas de SP"), que o
+#      caminho rápido não extrai por não dizerem se a UF é de destino.
+#    - Expressões de data: "hoje", "este mês", meses usados como data ("em setembro", não
+#      "cliente Marco"), datas numéricas.
+#    - Negações ("não", "exceto"): peso 2.
+#    - Ambiguidade (válvula de escape do Enhancer, ver `rule_enhancer.py`): peso 3.
+#    - Perguntas longas (mais de `LONG_QUERY_WORDS` palavras): +1.
+#
+# 2. Faixas:
+#    - "fast": nota abaixo do limite -> modelo rápido.
+#    - "strong": nota no limite ou acima -> modelo mais forte.
+#    - A faixa viaja nos metadados da execução (chave `TIER_METADATA_KEY`), como a prioridade
+#      do agendador. Uma faixa já presente nos metadados é respeitada (ex: benchmarks) e marcada
+#      como forçada (`TIER_FORCED_METADATA_KEY`).
+#
+# 3. Escalonamento:
+#    - Feito etapa a etapa (`_routed_stage_llm` em `master_chain.py`): só a etapa da faixa
+#      rápida que falhar é refeita na faixa forte, quando o provedor falha, a saída é ilegível
+#      (mesma validação do hedging) ou, no Parser, traz valores que o validador de filtros
+#      descartaria. Erros de programação não são escalonados. Faixas forçadas não escalonam.
+#
+# 4. Métricas:
+#    - Proporção de perguntas por faixa, escalonamentos (por motivo) e latência média e p95
+#      por faixa. A acurácia sobre o roteiro de testes é medida por
+#      `scripts/benchmark_model_router.py`.
+#
+# =================================================================================================
+
+import re
+import threading
+from collections import Counter, deque
+from typing import Tuple
+
+from app.chains.date_resolver import MONTH_DATE_PATTERN
+from app.chains.fast_path import FastPathParser
+from app.chains.rule_enhancer import RuleBasedEnhancer
+from app.prompts.vocabulary import CONCEPT_PATTERN, UF_SIGLAS, normalize_text
+
+# Faixas de modelo, da mais rápida para a mais forte.
+TIER_FAST = "fast"
+TIER_STRONG = "strong"
+TIERS = (TIER_FAST, TIER_STRONG)
+
+# Chave dos metadados do RunnableConfig que informa a faixa da execução.
+TIER_METADATA_KEY = "nt_ai_tier"
+
+# Marca, nos metadados, uma faixa imposta por quem chamou (sem escalonamento).
+TIER_FORCED_METADATA_KEY = "nt_ai_tier_forced"
+
+# Perguntas com mais palavras que isso somam um ponto de complexidade.
+LONG_QUERY_WORDS = 15
+
+# Latências guardadas por faixa para o p95.
+LATENCY_WINDOW = 200
+
+# Conceitos que não contam como entidade (a própria "nota" e os tratados à parte).
+_NON_ENTITY_CONCEPTS = {"nota", "negacao", "hoje", "ontem", "ultima_semana", "semana", "mes", "semestre"}
+_DATE_CONCEPTS = {"hoje", "ontem", "ultima_semana", "semana", "mes", "semestre"}
+# UF após preposição. Siglas que também são palavras comuns só contam em maiúsculas.
+_UF_WORD_SIGLAS = {"SE", "PE", "MA"}
+_UF_MENTION_PATTERN = re.compile(
+    r"\b(?:de|do|da|em|no|na|para|pra|pro)\s+(" + "|".join(UF_SIGLAS) + r")\b", re.IGNORECASE
+)
+_NUMERIC_DATE_PATTERN = re.compile(r"\b\d{1,2}/\d{1,2}(?:/\d{2,4})?\b")
+
+# Enhancer determinístico usado apenas para detectar ambiguidade (contadores próprios).
+_ambiguity_detector = RuleBasedEnhancer()
+
+
+def _mentions_uf(query: str) -> bool:
+    for match in _UF_MENTION_PATTERN.finditer(query):
+        sigla = match.group(1)
+        if sigla.upper() not in _UF_WORD_SIGLAS or sigla.isupper():
+            return True
+    return False
+
+
+def score_complexity(query: str) -> Tuple[int, dict]:
+    """
+    Retorna (nota, sinais) de uma pergunta. Os sinais explicam a nota nos logs.
+    """
+    text = normalize_text(query)
+    concepts = {match.lastgroup for match in CONCEPT_PATTERN.finditer(text)}
+    fields = {field for field in FastPathParser.extract(query) if field != "SituacaoNF"}
+    if "UFDestino" not in fields and _mentions_uf(query):
+        fields.add("UFDestino")
+    signals = {
+        "entities": len(concepts - _NON_ENTITY_CONCEPTS) + len(fields),
+        "dates": len(concepts & _DATE_CONCEPTS) + len(_NUMERIC_DATE_PATTERN.findall(text)) + len(MONTH_DATE_PATTERN.findall(text)),
+        "negation": "negacao" in concepts,
+        "ambiguous": _ambiguity_detector.enhance(query)[1],
+        "long": len(text.split()) > LONG_QUERY_WORDS,
+    }
+    score = signals["entities"] + signals["dates"] + 2 * signals["negation"] + 3 * signals["ambiguous"] + signals["long"]
+    return score, signals
+
+
+class ComplexityRouter:
+    """
+    Escolhe a faixa de modelo de cada pergunta e acompanha as métricas por faixa.
+    """
+
+    def __init__(self, providers: dict, threshold: int = 3):
+        self.providers = providers
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self.routed = Counter()
+        self.served = Counter()
+        self.escalations = Counter()
+        self._total_latency = Counter()
+        self._latencies = {tier: deque(maxlen=LATENCY_WINDOW) for tier in TIERS}
+
+    def route(self, query: str) -> Tuple[str, int, dict]:
+        """
+        Retorna (faixa, nota, sinais) da pergunta.
+        """
+        score, signals = score_complexity(query)
+        tier = TIER_STRONG if score >= self.threshold else TIER_FAST
+        with self._lock:
+            self.routed[tier] += 1
+        return tier, score, signals
+
+    def record_escalation(self, reason: str) -> None:
+        with self._lock:
+            self.escalations[reason] += 1
+
+    def record(self, tier: str, latency: float) -> None:
+        """
+        Registra a faixa roteada e a latência total da pergunta (escalonamentos incluídos).
+        """
+        with self._lock:
+            self.served[tier] += 1
+            self._total_latency[tier] += latency
+            self._latencies[tier].append(latency)
+
+    def stats(self) -> dict:
+        with self._lock:
+            routed = sum(self.routed.values())
+            tiers = {}
+            for tier in TIERS:
+                served, latencies = self.served[tier], sorted(self._latencies[tier])
+                tiers[tier] = {
+                    "provider": self.providers[tier],
+                    "routed": self.routed[tier],
+                    "routing_ratio": round(self.routed[tier] / routed, 4) if routed else 0.0,
+                    "served": served,
+                    "avg_latency_seconds": round(self._total_latency[tier] / served, 3) if served else 0.0,
+                    "p95_latency_seconds": round(latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))], 3) if latencies else 0.0,
+                }
+            return {
+                "threshold": self.threshold,
+                "tiers": tiers,
+                "escalations": sum(self.escalations.values()),
+                "escalation_rate": round(sum(self.escalations.values()) / self.routed[TIER_FAST], 4) if self.routed[TIER_FAST] else 0.0,
+                "escalations_by_reason": dict(self.escalations),
+            }
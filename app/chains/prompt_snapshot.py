@@ -0,0 +1,67 @@
+# =================================================================================================
+#
+#                       SNAPSHOTS PRÉ-RENDERIZADOS DOS PROMPTS (UM POR DIA)
+#
+# Visão Geral do Módulo:
+#
+# Os prompts têm duas partes: um prefixo enorme (regras, exemplos e o DICIONÁRIO DE VARIÁVEIS DE
+# TEMPO, que depende apenas das datas do dia) e a pergunta do usuário, no final. Renderizar o
+# `PromptTemplate` inteiro a cada requisição refaz todo o trabalho de formatação do prefixo.
+#
+# 1. Snapshot:
+#    - O template é dividido na variável da pergunta (`{query}` ou `{enhanced_query}`).
+#    - O prefixo é renderizado com as datas UMA vez por dia (chave: a data 'today' do contexto)
+#      e guardado como string pronta. O sufixo (texto fixo após a pergunta) é renderizado uma
+#      única vez.
+#    - Por requisição, resta apenas concatenar: prefixo + pergunta + sufixo.
+#
+# 2. Efeitos:
+#    - Menos CPU por requisição.
+#    - O prefixo é idêntico, byte a byte, em todas as chamadas do dia, o que permite ao
+#      provedor reaproveitar o cache de prompt (prompt caching) do lado dele.
+#    - O snapshot pertence a um template: uma nova versão do prompt gera um novo snapshot.
+#
+# =================================================================================================
+
+import threading
+
+from langchain_core.prompt_values import StringPromptValue
+from langchain_core.prompts import PromptTemplate
+
+
+class PromptSnapshot:
+    """
+    Renderização de um `PromptTemplate` com o prefixo dependente de data guardado por dia.
+    """
+
+    def __init__(self, prompt: PromptTemplate, query_variable: str):
+        self.query_variable = query_variable
+        prefix, suffix = prompt.template.split("{" + query_variable + "}", 1)
+        self._prefix_template = prefix
+        self._date_variables = [name for name in prompt.input_variables if name != query_variable]
+        self._suffix = suffix.format()
+        self._day = None
+        self._prefix = None
+        self._lock = threading.Lock()
+        self.renders = 0
+
+    def _prefix_for(self, inputs: dict) -> str:
+        """
+        Retorna o prefixo renderizado para o dia do contexto, renderizando-o se o dia mudou.
+        """
+        day = inputs.get("today")
+        with self._lock:
+            if self._prefix is None or day != self._day:
+                self._prefix = self._prefix_template.format(**{name: inputs[name] for name in self._date_variables})
+                self._day = day
+                self.renders += 1
+            return self._prefix
+
+    def render(self, inputs: dict) -> str:
+        return self._prefix_for(inputs) + str(inputs[self.query_variable]) + self._suffix
+
+    def invoke_prompt(self, inputs: dict) -> StringPromptValue:
+        """
+        Equivalente a `PromptTemplate.invoke(inputs)`, usando o snapshot.
+        """
+        return StringPromptValue(text=self.render(inputs))
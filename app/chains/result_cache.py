@@ -0,0 +1,243 @@
+# =================================================================================================
+#
+#                               CACHE DE RESULTADOS DA CADEIA PRINCIPAL
+#
+# Visão Geral do Módulo:
+#
+# Cada chamada ao `/parse-query` custa duas idas ao LLM (Enhancer + Parser), mas os usuários
+# repetem as mesmas perguntas centenas de vezes por dia. Este módulo guarda o JSON final
+# já interpretado, em dois "armazéns":
+#
+# 1. Armazém Simbólico (independente de data):
+#    - As datas concretas de DE/ATE são trocadas por marcadores simbólicos (ex: "{today}",
+#      "{week_start}"), a partir de um mapeamento reverso contra o contexto de datas
+#      (`_get_current_dates`) usado na requisição.
+#    - Ex: "entregues hoje" -> {"DE": "{today}", "ATE": "{today}", "TipoData": "2", ...}
+#    - Em um acerto, os marcadores são preenchidos com as datas do contexto ATUAL. Assim a
+#      entrada continua válida depois da virada do dia, da semana ou do mês.
+#    - Chave: (versão da linha de montagem, pergunta canônica).
+#
+# 2. Armazém Datado (dependente de data):
+#    - Usado quando o resultado não pode ser simbolizado com segurança: datas que não
+#      correspondem a nenhum período do dicionário (ex: "últimos 7 dias"), correspondências
+#      ambíguas, ou perguntas com datas explícitas (ex: "em setembro", "22/10").
+#    - Chave: (versão da linha de montagem, pergunta canônica, contexto de datas). Expira na próxima
+#      meia-noite, quando o contexto de datas muda.
+#
+# 3. Índice Semântico (opcional, ver `semantic_cache.py`):
+#    - Consultado quando os dois armazéns acima falham. Reaproveita o resultado simbólico
+#      de uma pergunta já respondida que seja quase idêntica (ex: "notas a caminho" ->
+#      "nf rodando"), com as datas materializadas para o contexto atual.
+#
+# A versão da linha de montagem (ver `pipeline_fingerprint`) faz parte das duas chaves: é a
+# impressão digital de TODOS os prompts (inclusive esparso, em lote e a configuração do prompt
+# dinâmico) e das variáveis de ambiente que mudam o resultado (modo da linha de montagem,
+# saída estruturada/esparsa, roteador, resolvedor de datas, validador etc.). Qualquer
+# alteração invalida as entradas antigas.
+#
+# Configuração (variáveis de ambiente):
+# - NT_AI_RESULT_CACHE_ENABLED               (padrão: true)
+# - NT_AI_RESULT_CACHE_MAX_SIZE              (padrão: 2048 entradas por armazém)
+# - NT_AI_RESULT_CACHE_TTL_SECONDS           (padrão: 86400, armazém datado)
+# - NT_AI_RESULT_CACHE_SYMBOLIC_TTL_SECONDS  (padrão: 604800, armazém simbólico)
+#
+# =================================================================================================
+
+import re
+from datetime import datetime, timedelta
+from typing import Optional
+
+from app.core.cache import LRUCache, MISSING, canonicalize_query, fingerprint
+from app.core.config import env_bool, env_int, env_float, env_str, env_timezone
+from app.chains.date_resolver import MONTH_DATE_PATTERN
+from app.chains.semantic_cache import SemanticCache
+from app.prompts.filter_prompts import (
+    QUERY_ENHANCER_PROMPT, JSON_PARSER_PROMPT, FUSED_PROMPT, STRUCTURED_PARSER_PROMPT, SPARSE_PARSER_PROMPT,
+    BATCH_PARSER_PROMPT, PARSER_EXAMPLES, PARSER_OPTIONAL_SECTIONS,
+)
+from app.prompts.vocabulary import normalize_text
+
+# Impressão digital dos prompts atuais. Muda sempre que o texto de um dos prompts (ou os
+# exemplos e seções usados pelo prompt dinâmico) muda.
+PROMPTS_FINGERPRINT = fingerprint(
+    QUERY_ENHANCER_PROMPT.template, JSON_PARSER_PROMPT.template, FUSED_PROMPT.template, STRUCTURED_PARSER_PROMPT.template,
+    SPARSE_PARSER_PROMPT.template, BATCH_PARSER_PROMPT.template, repr(PARSER_EXAMPLES), repr(PARSER_OPTIONAL_SECTIONS),
+)
+
+# Variáveis de ambiente que mudam o JSON produzido pela linha de montagem (e não só o custo).
+BEHAVIOR_FLAGS = (
+    "NT_AI_PIPELINE_MODE", "NT_AI_ENHANCER_MODE", "NT_AI_LLM_PROVIDER", "NT_AI_STRUCTURED_OUTPUT",
+    "NT_AI_SPARSE_OUTPUT", "NT_AI_DYNAMIC_PROMPT", "NT_AI_DYNAMIC_PROMPT_EXAMPLES", "NT_AI_MICRO_BATCH",
+    "NT_AI_SPECULATIVE_PARSE", "NT_AI_MODEL_ROUTER", "NT_AI_ROUTER_THRESHOLD", "NT_AI_ROUTER_FAST_PROVIDER",
+    "NT_AI_ROUTER_STRONG_PROVIDER", "NT_AI_DATE_RESOLVER", "NT_AI_FILTER_VALIDATOR",
+)
+
+
+def pipeline_fingerprint() -> str:
+    """
+    Versão da linha de montagem: os prompts e os valores atuais de `BEHAVIOR_FLAGS`. Calculada
+    na criação do cache (depois do carregamento do .env), e não na importação do módulo.
+    """
+    return fingerprint(PROMPTS_FINGERPRINT, *(f"{name}={env_str(name, '')}" for name in BEHAVIOR_FLAGS))
+
+# Períodos do DICIONÁRIO DE VARIÁVEIS DE TEMPO do `JSON_PARSER_PROMPT`, como pares (DE, ATE)
+# de chaves do contexto de datas. Usados no mapeamento reverso das datas concretas.
+DATE_RANGES = (
+    ("today", "today"),
+    ("yesterday", "yesterday"),
+    ("last_week_start", "last_week_end"),
+    ("week_start", "week_end"),
+    ("month_start", "month_end"),
+    ("semester_start", "semester_end"),
+)
+
+# Detecta datas explícitas na pergunta ("22/10", "2025-10-22", "dia 15"; meses como data, ver
+# `_has_explicit_date`). Para essas perguntas a data é fixa e NUNCA deve ser simbolizada (ex:
+# "notas de 18/10" feita no dia 18/10 não pode virar "{today}").
+_EXPLICIT_DATE_PATTERN = re.compile(r"\d{1,4}[/-]\d{1,2}|\bdia\s+\d|\b\d{4}\b", re.IGNORECASE)
+
+
+def _has_explicit_date(query: str) -> bool:
+    """
+    Datas numéricas ou nomes de mês usados como data ("em setembro"); nomes próprios como
+    "cliente Marco Aurelio" não contam.
+    """
+    return bool(_EXPLICIT_DATE_PATTERN.search(query) or MONTH_DATE_PATTERN.search(normalize_text(query)))
+
+
+def _placeholder(name: str) -> str:
+    return "{" + name + "}"
+
+
+def symbolize_dates(result: dict, dates: dict) -> Optional[dict]:
+    """
+    Troca DE/ATE concretos pelos marcadores do período correspondente no contexto de datas.
+    Retorna o resultado simbolizado, ou None se o mapeamento não for possível ou for ambíguo.
+    Resultados sem DE/ATE são independentes de data e retornam inalterados.
+    """
+    de, ate = result.get("DE"), result.get("ATE")
+    if de is None and ate is None:
+        return dict(result)
+    matches = [(start, end) for start, end in DATE_RANGES if dates.get(start) == de and dates.get(end) == ate]
+    if len(matches) != 1:
+        return None
+    start, end = matches[0]
+    return {**result, "DE": _placeholder(start), "ATE": _placeholder(end)}
+
+
+def materialize_dates(result: dict, dates: dict) -> dict:
+    """
+    Preenche os marcadores simbólicos de DE/ATE com as datas do contexto atual.
+    """
+    materialized = dict(result)
+    for field in ("DE", "ATE"):
+        value = materialized.get(field)
+        if isinstance(value, str) and value.startswith("{") and value.endswith("}"):
+            materialized[field] = dates[value[1:-1]]
+    return materialized
+
+
+class ResultCache:
+    """
+    Cache do JSON final de filtros, com armazém simbólico (independente de data)
+    e armazém datado, ambos sensíveis à versão da linha de montagem.
+    """
+
+    def __init__(self):
+        self.enabled = env_bool("NT_AI_RESULT_CACHE_ENABLED", True)
+        self.fingerprint = pipeline_fingerprint()
+        max_size = env_int("NT_AI_RESULT_CACHE_MAX_SIZE", 2048)
+        self._symbolic = LRUCache(
+            name="result_cache_symbolic",
+            max_size=max_size,
+            ttl_seconds=env_float("NT_AI_RESULT_CACHE_SYMBOLIC_TTL_SECONDS", 604800),
+        )
+        self._dated = LRUCache(
+            name="result_cache_dated",
+            max_size=max_size,
+            ttl_seconds=env_float("NT_AI_RESULT_CACHE_TTL_SECONDS", 86400),
+        )
+        self._semantic = SemanticCache()
+        self.hits = 0
+        self.misses = 0
+
+    def _symbolic_key(self, query: str) -> tuple:
+        """
+        Chave do armazém simbólico: (versão da linha de montagem, pergunta canônica).
+        """
+        return (self.fingerprint, canonicalize_query(query))
+
+    def _dated_key(self, query: str, dates: dict) -> tuple:
+        """
+        Chave do armazém datado: (versão da linha de montagem, pergunta canônica, contexto de datas).
+        """
+        return (self.fingerprint, canonicalize_query(query), tuple(sorted(dates.items())))
+
+    @staticmethod
+    def _next_midnight(dates: dict) -> float:
+        """
+        Retorna o epoch da meia-noite seguinte ao 'today' do contexto de datas,
+        instante em que o contexto (e portanto a chave datada) deixa de ser válido.
+        """
+        today = datetime.strptime(dates["today"], "%Y-%m-%d").replace(tzinfo=env_timezone("NT_AI_TIMEZONE"))
+        return (today + timedelta(days=1)).timestamp()
+
+    def get(self, query: str, dates: dict) -> Optional[dict]:
+        """
+        Retorna o resultado em cache já materializado para o contexto de datas atual,
+        ou None em caso de falha (miss). Consulta primeiro o armazém simbólico, depois o
+        datado e, por último, o índice semântico.
+        """
+        if not self.enabled:
+            return None
+        value = self._symbolic.get(self._symbolic_key(query))
+        if value is not MISSING:
+            self.hits += 1
+            return materialize_dates(value, dates)
+        value = self._dated.get(self._dated_key(query, dates))
+        if value is not MISSING:
+            self.hits += 1
+            return dict(value)
+        value = self._semantic.lookup(query)
+        if value is not None:
+            self.hits += 1
+            return materialize_dates(value, dates)
+        self.misses += 1
+        return None
+
+    def set(self, query: str, dates: dict, result: dict) -> None:
+        """
+        Armazena uma cópia do resultado. Usa o armazém simbólico sempre que as datas puderem
+        ser mapeadas sem ambiguidade; caso contrário, usa o armazém datado.
+        Resultados que não são dicionários (saídas inesperadas do parser) não são guardados.
+        """
+        if not self.enabled or not isinstance(result, dict):
+            return
+        has_dates = result.get("DE") is not None or result.get("ATE") is not None
+        if has_dates and _has_explicit_date(query):
+            symbolic = None
+        else:
+            symbolic = symbolize_dates(result, dates)
+        if symbolic is not None:
+            self._symbolic.set(self._symbolic_key(query), symbolic)
+            self._semantic.add(query, symbolic)
+        else:
+            self._dated.set(self._dated_key(query, dates), dict(result), expires_at=self._next_midnight(dates))
+
+    def stats(self) -> dict:
+        """
+        Retorna as estatísticas do cache (totais e por armazém) com a versão atual dos prompts
+        e da linha de montagem.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "prompts_fingerprint": PROMPTS_FINGERPRINT,
+            "pipeline_fingerprint": self.fingerprint,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "symbolic": self._symbolic.stats(),
+            "dated": self._dated.stats(),
+            "semantic": self._semantic.stats(),
+        }
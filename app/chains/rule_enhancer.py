@@ -0,0 +1,99 @@
+# =================================================================================================
+#
+#                               ENHANCER DETERMINÍSTICO (BASEADO EM REGRAS)
+#
+# Visão Geral do Módulo:
+#
+# O `QUERY_ENHANCER_PROMPT` é, na prática, um dicionário fixo: expansão de abreviações
+# ("nf", "sp", "cli", "transp", "ult sem") e mapeamento de sinônimos ("rodando" -> "em trânsito",
+# "com atraso" -> "com status de análise ATRASO"). Este módulo aplica as MESMAS tabelas
+# (`ENHANCER_REWRITES` em `app/prompts/vocabulary.py`) em Python puro, sem ida ao LLM:
+#
+# 1. Casamento em Passo Único:
+#    - Todas as regras são compiladas em UMA expressão regular com grupos nomeados
+#      (equivalente a um casador de múltiplos padrões). Um único `finditer` encontra
+#      todas as ocorrências, sem sobreposição, da esquerda para a direita.
+#
+# 2. Regras do Prompt Respeitadas:
+#    - TERMOS DE EVENTO DE DATA PROTEGIDOS ("agenda", "entregue", "emitido", "baixada",
+#      "previsão real") nunca são reescritos.
+#    - VÁLVULA DE ESCAPE (AMBIGUIDADE): se dois termos da MESMA categoria apontarem para
+#      valores diferentes (ex: "rodando e retidas"), nenhum deles é traduzido e a
+#      pergunta é marcada como ambígua. O mesmo vale para "previsto para hoje/amanhã" junto de
+#      um termo de evento protegido (ex: "agendadas previstas para amanhã"): pode ser evento
+#      de data OU performance, e nada da categoria é traduzido.
+#
+# 3. Modos de Operação (NT_AI_ENHANCER_MODE, ver `master_chain.py`):
+#    - "llm"    : (padrão) somente o Enhancer via LLM.
+#    - "rules"  : somente este Enhancer determinístico.
+#    - "hybrid" : este Enhancer, com o LLM apenas para as perguntas ambíguas.
+#
+# =================================================================================================
+
+import re
+from typing import Tuple
+
+from app.prompts.vocabulary import ENHANCER_REWRITES, PROTECTED_EVENT_TERMS
+
+# Expressão única com um grupo nomeado por regra (r0, r1, ...), na ordem da tabela. As bordas
+# tratam o hífen como parte da palavra, para que "nf" não case dentro de "nf-e".
+_REWRITE_PATTERN = re.compile(
+    "|".join(rf"(?P<r{i}>(?<![\w-])(?:{pattern})(?![\w-]))" for i, (_, _, pattern, _) in enumerate(ENHANCER_REWRITES)),
+    re.IGNORECASE,
+)
+
+
+class RuleBasedEnhancer:
+    """
+    Normalizador determinístico da pergunta do usuário.
+    """
+
+    def __init__(self):
+        self.rewritten = 0
+        self.ambiguous = 0
+        self.llm_fallbacks = 0
+
+    def enhance(self, query: str) -> Tuple[str, bool]:
+        """
+        Reescreve a pergunta com as regras do Enhancer.
+        Retorna (pergunta reescrita, ambígua?). Em caso de ambiguidade, os termos da
+        categoria ambígua são preservados como o usuário os escreveu.
+        """
+        text = re.sub(r"\s+", " ", query).strip()
+        matches = list(_REWRITE_PATTERN.finditer(text))
+
+        # Valores distintos encontrados por categoria (para a válvula de escape).
+        values_by_category = {}
+        event_sensitive_categories = set()
+        for match in matches:
+            category, value, pattern, _ = ENHANCER_REWRITES[int(match.lastgroup[1:])]
+            if category is not None:
+                values_by_category.setdefault(category, set()).add(value)
+            if "previst" in pattern:
+                event_sensitive_categories.add(category)
+        ambiguous_categories = {c for c, values in values_by_category.items() if len(values) > 1}
+
+        # "previsto para hoje/amanhã" junto de um termo de evento protegido (ex: "agendadas
+        # previstas para amanhã") pode ser evento de data OU performance: ambíguo, e a expressão
+        # é preservada como o usuário a escreveu.
+        if event_sensitive_categories and PROTECTED_EVENT_TERMS.search(text):
+            ambiguous_categories |= event_sensitive_categories
+        ambiguous = bool(ambiguous_categories)
+
+        def _replace(match):
+            category, _, _, replacement = ENHANCER_REWRITES[int(match.lastgroup[1:])]
+            if replacement is None or category in ambiguous_categories:
+                return match.group(0)
+            return replacement
+
+        rewritten = _REWRITE_PATTERN.sub(_replace, text)
+        rewritten = rewritten[:1].upper() + rewritten[1:]
+
+        if ambiguous:
+            self.ambiguous += 1
+        else:
+            self.rewritten += 1
+        return rewritten, ambiguous
+
+    def stats(self) -> dict:
+        return {"rewritten": self.rewritten, "ambiguous": self.ambiguous, "llm_fallbacks": self.llm_fallbacks}
@@ -0,0 +1,205 @@
+# =================================================================================================
+#
+#                               CACHE SEMÂNTICO (PERGUNTAS QUASE IDÊNTICAS)
+#
+# Visão Geral do Módulo:
+#
+# Os usuários expressam a mesma intenção de muitas formas ("nf rodando", "notas rodando",
+# "notas a caminho"), e o cache exato só acerta repetições literais. Este módulo mantém um
+# índice local de similaridade sobre as perguntas já respondidas, sem nenhuma chamada de rede:
+#
+# 1. Normalização:
+#    - A pergunta é simplificada (sem acentos, minúsculas) e cada sinônimo de negócio é
+#      trocado pelo seu conceito (ver `app/prompts/vocabulary.py`).
+#      Ex: "nf rodando" e "notas a caminho" -> "nota transito".
+#
+# 2. Assinatura (campos protegidos):
+#    - Valores que mudam o resultado — números de NF, raízes de CNPJ, UFs, códigos de
+#      operação, nomes de cliente/transportadora/cidade, meses — e o conjunto de conceitos
+#      encontrados formam uma "assinatura". Só perguntas com assinatura IDÊNTICA são
+#      comparadas entre si, então "nota 123" e "nota 456" nunca colidem, assim como
+#      "mais caro" e "mais barato".
+#    - Os campos protegidos são configuráveis (NT_AI_SEMANTIC_CACHE_PROTECTED_FIELDS).
+#
+# 3. Similaridade:
+#    - Vetores TF-IDF de n-gramas de caracteres (trigramas) sobre o texto restante,
+#      comparados por similaridade de cosseno. Acima do limiar configurado, o resultado
+#      da pergunta parecida é reutilizado.
+#
+# 4. Eviction e Métricas:
+#    - O índice é limitado (LRU) e expõe um histograma das melhores similaridades
+#      encontradas em cada consulta, útil para calibrar o limiar.
+#
+# Configuração (variáveis de ambiente):
+# - NT_AI_SEMANTIC_CACHE_ENABLED           (padrão: false)
+# - NT_AI_SEMANTIC_CACHE_THRESHOLD         (padrão: 0.85)
+# - NT_AI_SEMANTIC_CACHE_MAX_SIZE          (padrão: 1024 perguntas)
+# - NT_AI_SEMANTIC_CACHE_PROTECTED_FIELDS  (padrão: todos os campos abaixo, separados por vírgula)
+#
+# =================================================================================================
+
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Optional, Tuple
+
+from app.core.config import env_bool, env_float, env_int, env_str
+from app.prompts.vocabulary import CONCEPT_PATTERN, OPERACOES, UF_SIGLAS, normalize_text
+
+# Extratores dos campos protegidos, aplicados sobre o texto normalizado.
+# O valor extraído entra na assinatura e é removido do texto comparado.
+PROTECTED_FIELD_PATTERNS = {
+    "CNPJRaizTransp": re.compile(r"\b\d{2}\.?\d{3}\.?\d{3}\b"),
+    "NF": re.compile(r"\b\d+\b"),
+    "Operacao": re.compile(
+        r"\b(?:" + "|".join(re.escape(op.lower()) for op in OPERACOES) + r")(?![\w.-])"
+    ),
+    "UFDestino": re.compile(r"\b(?:" + "|".join(uf.lower() for uf in UF_SIGLAS) + r")\b"),
+    "Cliente": re.compile(r"\b(?:cliente|cli)\s+(\w+)"),
+    "Transportadora": re.compile(r"\b(?:transportadora|transp)\s+(\w+)"),
+    "CidadeDestino": re.compile(r"\bcidade\s+(?:de\s+)?(\w+(?:\s+\w+)?)"),
+    "DE": re.compile(
+        r"\b(?:janeiro|fevereiro|marco|abril|maio|junho|julho|agosto|setembro|outubro|novembro|dezembro)\b"
+    ),
+}
+
+# Limites superiores das faixas do histograma de similaridade (a última faixa inclui o 1.0).
+HISTOGRAM_BUCKETS = (0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 1.0)
+
+
+def _ngrams(text: str, n: int = 3) -> Counter:
+    """
+    Conta os n-gramas de caracteres do texto (com espaço nas bordas).
+    """
+    padded = f" {text} "
+    return Counter(padded[i:i + n] for i in range(max(1, len(padded) - n + 1)))
+
+
+class SemanticCache:
+    """
+    Índice local de similaridade sobre perguntas já respondidas.
+    Armazena o resultado (independente de data) de cada pergunta indexada.
+    """
+
+    def __init__(self):
+        self.enabled = env_bool("NT_AI_SEMANTIC_CACHE_ENABLED", False)
+        self.threshold = env_float("NT_AI_SEMANTIC_CACHE_THRESHOLD", 0.85)
+        self.max_size = max(1, env_int("NT_AI_SEMANTIC_CACHE_MAX_SIZE", 1024))
+        fields = env_str("NT_AI_SEMANTIC_CACHE_PROTECTED_FIELDS", ",".join(PROTECTED_FIELD_PATTERNS))
+        self.protected_fields = [f.strip() for f in fields.split(",") if f.strip() in PROTECTED_FIELD_PATTERNS]
+
+        # Entradas: texto normalizado -> (assinatura, n-gramas, resultado). Ordem = LRU.
+        self._entries: "OrderedDict[str, Tuple[tuple, Counter, dict]]" = OrderedDict()
+        # Frequência de documentos de cada n-grama (para o IDF).
+        self._document_frequency: Counter = Counter()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.histogram = Counter()
+
+    def _analyze(self, query: str) -> Tuple[str, tuple]:
+        """
+        Normaliza a pergunta e separa os valores protegidos.
+        Retorna (texto comparável, assinatura).
+        """
+        text = normalize_text(query)
+        protected = []
+        for field in self.protected_fields:
+            pattern = PROTECTED_FIELD_PATTERNS[field]
+            for match in pattern.finditer(text):
+                protected.append((field, match.group(match.lastindex or 0)))
+            text = pattern.sub(f" _{field.lower()}_ ", text)
+        concepts = set()
+
+        def _to_concept(match):
+            concepts.add(match.lastgroup)
+            return f" {match.lastgroup} "
+
+        text = re.sub(r"\s+", " ", CONCEPT_PATTERN.sub(_to_concept, text)).strip()
+        return text, (tuple(sorted(protected)), tuple(sorted(concepts)))
+
+    def _idf(self, gram: str) -> float:
+        return math.log((len(self._entries) + 1) / (self._document_frequency[gram] + 1)) + 1.0
+
+    def _cosine(self, a: Counter, b: Counter) -> float:
+        weights_a = {g: c * self._idf(g) for g, c in a.items()}
+        weights_b = {g: c * self._idf(g) for g, c in b.items()}
+        dot = sum(w * weights_b.get(g, 0.0) for g, w in weights_a.items())
+        norm = math.sqrt(sum(w * w for w in weights_a.values())) * math.sqrt(sum(w * w for w in weights_b.values()))
+        return dot / norm if norm else 0.0
+
+    def _record(self, similarity: Optional[float]) -> None:
+        if similarity is None:
+            self.histogram["sem_candidatos"] += 1
+            return
+        for upper in HISTOGRAM_BUCKETS[:-1]:
+            if similarity < upper:
+                self.histogram[f"<{upper}"] += 1
+                return
+        self.histogram["<=1.0"] += 1
+
+    def lookup(self, query: str) -> Optional[dict]:
+        """
+        Procura a pergunta indexada mais parecida, com a mesma assinatura.
+        Retorna uma cópia do seu resultado se a similaridade atingir o limiar, ou None.
+        """
+        if not self.enabled:
+            return None
+        text, signature = self._analyze(query)
+        grams = _ngrams(text)
+        with self._lock:
+            best_key, best_similarity = None, None
+            for key, (entry_signature, entry_grams, _) in self._entries.items():
+                if entry_signature != signature:
+                    continue
+                similarity = self._cosine(grams, entry_grams)
+                if best_similarity is None or similarity > best_similarity:
+                    best_key, best_similarity = key, similarity
+            self._record(best_similarity)
+            if best_key is None or best_similarity < self.threshold:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            return dict(self._entries[best_key][2])
+
+    def add(self, query: str, result: dict) -> None:
+        """
+        Indexa a pergunta com o seu resultado (já independente de data),
+        descartando as entradas menos usadas ao atingir o limite.
+        """
+        if not self.enabled:
+            return
+        text, signature = self._analyze(query)
+        grams = _ngrams(text)
+        with self._lock:
+            previous = self._entries.pop(text, None)
+            if previous is not None:
+                self._document_frequency.subtract(previous[1].keys())
+            self._entries[text] = (signature, grams, dict(result))
+            self._document_frequency.update(grams.keys())
+            while len(self._entries) > self.max_size:
+                _, (_, evicted_grams, _) = self._entries.popitem(last=False)
+                self._document_frequency.subtract(evicted_grams.keys())
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        """
+        Retorna as estatísticas do índice, incluindo o histograma de similaridade.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "protected_fields": self.protected_fields,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "similarity_histogram": dict(self.histogram),
+        }
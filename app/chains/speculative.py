@@ -0,0 +1,157 @@
+# =================================================================================================
+#
+#                       PARSER ESPECULATIVO (EM PARALELO COM O ENHANCER)
+#
+# Visão Geral do Módulo:
+#
+# Na linha de montagem em dois estágios, o Parser só começa depois que o Enhancer termina. Para
+# muitas perguntas, porém, o Enhancer devolve praticamente o mesmo texto que recebeu. Aqui, o
+# Parser é disparado JUNTO com o Enhancer, sobre a pergunta original (levemente normalizada):
+#
+# 1. Acerto:
+#    - Se a saída do Enhancer for equivalente à entrada especulativa (mesma chave de comparação,
+#      ver `speculation_key`), o resultado especulativo é usado. A latência total passa de
+#      Enhancer + Parser para a maior das duas.
+#
+# 2. Descarte:
+#    - Caso contrário, a execução especulativa é descartada (cancelada no modo assíncrono) e o
+#      Parser roda normalmente sobre a pergunta normalizada. O custo é uma chamada extra ao
+#      Parser, sem impacto na resposta.
+#    - Se a execução especulativa falhar, o Parser também roda normalmente.
+#
+# 3. Métricas:
+#    - Taxa de acerto, chamadas descartadas e latência economizada (total e média por acerto).
+#
+# =================================================================================================
+
+import asyncio
+import re
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+# Threads usadas pela execução especulativa nas chamadas síncronas (`invoke`).
+_thread_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="nt-ai-speculative")
+
+_PUNCTUATION_PATTERN = re.compile(r"[\"'“”‘’`?!.,;:]+")
+
+
+def light_normalize(query: str) -> str:
+    """
+    Normalização leve da pergunta original para o Parser especulativo: espaços colapsados.
+    """
+    return re.sub(r"\s+", " ", query or "").strip()
+
+
+def speculation_key(text: str) -> str:
+    """
+    Chave de comparação entre a entrada especulativa e a saída do Enhancer: sem acentos,
+    minúsculas, sem pontuação e com espaços colapsados.
+    Ex: "Notas em trânsito?" e "notas em transito" têm a mesma chave.
+    """
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return re.sub(r"\s+", " ", _PUNCTUATION_PATTERN.sub(" ", text)).strip().casefold()
+
+
+class SpeculativeParser:
+    """
+    Executa o Enhancer e, em paralelo, o Parser sobre a pergunta original.
+    """
+
+    def __init__(self, enhancer: Runnable, parser: Runnable, parser_inputs: Callable[[dict, str], dict]):
+        self.enhancer = enhancer
+        self.parser = parser
+        self.parser_inputs = parser_inputs
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hits = 0
+        self.discarded = 0
+        self.saved_seconds = 0.0
+
+    async def _atimed_parse(self, inputs: dict, config: RunnableConfig):
+        start = time.perf_counter()
+        return await self.parser.ainvoke(inputs, config=config), time.perf_counter() - start
+
+    def _timed_parse(self, inputs: dict, config: RunnableConfig):
+        start = time.perf_counter()
+        return self.parser.invoke(inputs, config=config), time.perf_counter() - start
+
+    def _record(self, hit: bool, saved: float = 0.0) -> None:
+        with self._lock:
+            self.requests += 1
+            self.hits += hit
+            self.discarded += not hit
+            self.saved_seconds += saved
+
+    async def ainvoke(self, inputs: dict, config: RunnableConfig) -> dict:
+        """
+        Entrada: {'query', 'dates', ...}. Saída: {'enhanced_query', 'parsed_json'}.
+        """
+        speculative_query = light_normalize(inputs["query"])
+        start = time.perf_counter()
+        task = asyncio.ensure_future(self._atimed_parse(self.parser_inputs(inputs, speculative_query), config))
+        # Um erro da execução descartada não deve gerar o aviso "Task exception was never retrieved".
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        try:
+            enhanced_query = await self.enhancer.ainvoke(inputs, config=config)
+        except BaseException:
+            task.cancel()
+            raise
+        enhancer_seconds = time.perf_counter() - start
+
+        if speculation_key(enhanced_query) == speculation_key(speculative_query):
+            try:
+                parsed_json, parser_seconds = await task
+            except Exception:
+                parsed_json = None
+            if parsed_json is not None:
+                # Sequencial: Enhancer + Parser. Especulativo: o tempo total medido.
+                self._record(True, max(0.0, enhancer_seconds + parser_seconds - (time.perf_counter() - start)))
+                return {"enhanced_query": enhanced_query, "parsed_json": parsed_json}
+        else:
+            task.cancel()
+        self._record(False)
+        parsed_json = await self.parser.ainvoke(self.parser_inputs(inputs, enhanced_query), config=config)
+        return {"enhanced_query": enhanced_query, "parsed_json": parsed_json}
+
+    def invoke(self, inputs: dict, config: RunnableConfig) -> dict:
+        speculative_query = light_normalize(inputs["query"])
+        start = time.perf_counter()
+        future = _thread_pool.submit(self._timed_parse, self.parser_inputs(inputs, speculative_query), config)
+        try:
+            enhanced_query = self.enhancer.invoke(inputs, config=config)
+        except BaseException:
+            future.cancel()
+            raise
+        enhancer_seconds = time.perf_counter() - start
+
+        if speculation_key(enhanced_query) == speculation_key(speculative_query):
+            try:
+                parsed_json, parser_seconds = future.result()
+            except Exception:
+                parsed_json = None
+            if parsed_json is not None:
+                self._record(True, max(0.0, enhancer_seconds + parser_seconds - (time.perf_counter() - start)))
+                return {"enhanced_query": enhanced_query, "parsed_json": parsed_json}
+        else:
+            # Chamadas síncronas em andamento não podem ser interrompidas: o resultado é descartado.
+            future.cancel()
+        self._record(False)
+        parsed_json = self.parser.invoke(self.parser_inputs(inputs, enhanced_query), config=config)
+        return {"enhanced_query": enhanced_query, "parsed_json": parsed_json}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "hits": self.hits,
+                "hit_rate": round(self.hits / self.requests, 4) if self.requests else 0.0,
+                "discarded": self.discarded,
+                "latency_saved_seconds": round(self.saved_seconds, 3),
+                "avg_latency_saved_seconds": round(self.saved_seconds / self.hits, 3) if self.hits else 0.0,
+            }
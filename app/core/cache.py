@@ -0,0 +1,128 @@
+# =================================================================================================
+#
+#                               CACHE EM MEMÓRIA (LRU + EXPIRAÇÃO)
+#
+# Visão Geral do Módulo:
+#
+# Implementa um cache LRU limitado, com expiração por entrada, usado para evitar chamadas
+# repetidas ao LLM para perguntas que os usuários fazem o tempo todo ("notas em trânsito",
+# "entregues hoje"...).
+#
+# - Limite de tamanho: ao atingir `max_size`, a entrada usada há mais tempo é descartada.
+# - Expiração: cada entrada tem um instante de expiração (TTL padrão ou um horário explícito,
+#   como a próxima meia-noite).
+# - Estatísticas: contadores de acertos (hits), falhas (misses), descartes e expirações,
+#   expostos via `stats()` para o endpoint de métricas.
+# - Thread-safe: as cadeias podem ser executadas tanto no event loop quanto em threads.
+#
+# =================================================================================================
+
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+# Sentinela usada para diferenciar "não encontrado" de um valor `None` armazenado.
+MISSING = object()
+
+
+class LRUCache:
+    """
+    Cache LRU com limite de tamanho e expiração por entrada.
+    """
+
+    def __init__(self, name: str, max_size: int = 1024, ttl_seconds: Optional[float] = None):
+        self.name = name
+        self.max_size = max(1, max_size)
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """
+        Retorna o valor associado a `key` ou `default` se a chave não existir ou tiver expirado.
+        Um acerto move a entrada para o fim da fila (mais recentemente usada).
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, expires_at: Optional[float] = None) -> None:
+        """
+        Armazena `value` sob `key`. O instante de expiração (epoch em segundos) é o menor entre
+        `expires_at` e o TTL padrão do cache, quando ambos existirem.
+        """
+        if self.ttl_seconds is not None:
+            ttl_expiry = time.time() + self.ttl_seconds
+            expires_at = ttl_expiry if expires_at is None else min(expires_at, ttl_expiry)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """
+        Remove todas as entradas (os contadores são preservados).
+        """
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        """
+        Retorna os contadores do cache para exposição no endpoint de métricas.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+def canonicalize_query(query: str) -> str:
+    """
+    Gera a forma canônica de uma pergunta para uso como chave de cache:
+    normalização Unicode (NFC), minúsculas e espaços colapsados.
+    Ex: "  Notas   em Trânsito " -> "notas em trânsito"
+    """
+    text = unicodedata.normalize("NFC", query or "")
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+
+def fingerprint(*texts: str) -> str:
+    """
+    Retorna uma impressão digital curta (SHA-256 truncado) dos textos informados.
+    Usada para invalidar o cache automaticamente quando um prompt é alterado.
+    """
+    digest = hashlib.sha256()
+    for text in texts:
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()[:16]
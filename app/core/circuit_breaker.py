@@ -0,0 +1,158 @@
+# =================================================================================================
+#
+#                               CIRCUIT BREAKER (POR PROVEDOR DE LLM)
+#
+# Visão Geral do Módulo:
+#
+# Quando um provedor de LLM está fora do ar ou limitando requisições, cada chamada espera o
+# timeout inteiro antes de falhar, prendendo threads e sockets. O circuit breaker observa as
+# chamadas a um provedor e, depois de falhas seguidas, passa a falhar imediatamente:
+#
+# 1. Estados:
+#    - "closed" (fechado): chamadas normais. Erros do provedor (`failure_errors`) e chamadas
+#      lentas (acima de `slow_call_seconds`) contam como falhas; um sucesso zera a contagem.
+#      Outros erros (validação de esquema, bugs locais) são propagados sem serem registrados.
+#    - "open" (aberto): após `failure_threshold` falhas seguidas. Toda chamada falha na hora com
+#      `CircuitOpenError`, sem tocar a rede, durante `open_seconds`.
+#    - "half_open" (semiaberto): passado esse tempo, UMA chamada de teste é liberada. Sucesso
+#      fecha o circuito; falha o reabre por mais `open_seconds`.
+#
+# 2. Métricas:
+#    - Estado atual, chamadas, falhas, rejeições (chamadas barradas com o circuito aberto),
+#      aberturas, taxa de erro e latência média das chamadas que chegaram ao provedor.
+#
+# - Thread-safe: as cadeias podem ser executadas tanto no event loop quanto em threads.
+#
+# =================================================================================================
+
+import threading
+import time
+from typing import Awaitable, Callable, Optional, Tuple, Type
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    Chamada barrada porque o circuito do provedor está aberto.
+    """
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker de um provedor: fecha, abre após falhas seguidas e testa em semiaberto.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, open_seconds: float = 30.0,
+                 slow_call_seconds: Optional[float] = None,
+                 failure_errors: Tuple[Type[BaseException], ...] = (Exception,)):
+        self.name = name
+        self.failure_errors = failure_errors
+        self.failure_threshold = max(1, failure_threshold)
+        self.open_seconds = open_seconds
+        self.slow_call_seconds = slow_call_seconds
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+        self.opened = 0
+        self._total_latency = 0.0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                return HALF_OPEN
+            return self._state
+
+    def _before_call(self) -> None:
+        """
+        Libera a chamada ou levanta `CircuitOpenError`. Em semiaberto, só uma chamada de teste passa.
+        """
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self._state = HALF_OPEN
+            if self._state == OPEN or (self._state == HALF_OPEN and self._probing):
+                self.rejected += 1
+                raise CircuitOpenError(f"Circuito do provedor '{self.name}' aberto; chamada não realizada.")
+            if self._state == HALF_OPEN:
+                self._probing = True
+
+    def _release_probe(self) -> None:
+        """
+        Chamada que terminou sem dizer nada sobre o provedor (cancelada ou com erro local).
+        """
+        with self._lock:
+            self._probing = False
+
+    def _after_call(self, latency: float, error: Optional[BaseException]) -> None:
+        failed = error is not None or (self.slow_call_seconds is not None and latency > self.slow_call_seconds)
+        with self._lock:
+            self.calls += 1
+            self._total_latency += latency
+            self._probing = False
+            if not failed:
+                self._consecutive_failures = 0
+                self._state = CLOSED
+                return
+            self.failures += 1
+            self._consecutive_failures += 1
+            if self._state == HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self.opened += 1
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def call(self, func: Callable):
+        """
+        Executa `func()` protegida pelo circuito.
+        """
+        self._before_call()
+        start = time.perf_counter()
+        try:
+            result = func()
+        except self.failure_errors as e:
+            self._after_call(time.perf_counter() - start, e)
+            raise
+        except BaseException:
+            self._release_probe()
+            raise
+        self._after_call(time.perf_counter() - start, None)
+        return result
+
+    async def acall(self, func: Callable[[], Awaitable]):
+        """
+        Versão assíncrona de `call`: `func()` devolve o awaitable da chamada.
+        """
+        self._before_call()
+        start = time.perf_counter()
+        try:
+            result = await func()
+        except self.failure_errors as e:
+            self._after_call(time.perf_counter() - start, e)
+            raise
+        except BaseException:
+            # Chamada cancelada (ex: perdedora do hedging) ou erro local: não é falha do provedor.
+            self._release_probe()
+            raise
+        self._after_call(time.perf_counter() - start, None)
+        return result
+
+    def stats(self) -> dict:
+        state = self.state
+        with self._lock:
+            return {
+                "state": state,
+                "calls": self.calls,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "opened": self.opened,
+                "error_rate": round(self.failures / self.calls, 4) if self.calls else 0.0,
+                "avg_latency_seconds": round(self._total_latency / self.calls, 3) if self.calls else 0.0,
+            }
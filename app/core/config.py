@@ -0,0 +1,70 @@
+# =================================================================================================
+#
+#                               LEITURA DE CONFIGURAÇÕES (VARIÁVEIS DE AMBIENTE)
+#
+# Funções auxiliares para ler as configurações do serviço a partir das variáveis de ambiente,
+# com conversão de tipo e valor padrão. As leituras são feitas sob demanda (e não na importação
+# do módulo) porque o `load_dotenv()` do `app/main.py` roda DEPOIS dos imports das cadeias.
+#
+# =================================================================================================
+
+import os
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+
+def env_str(name: str, default: str) -> str:
+    """
+    Retorna o valor da variável de ambiente `name` como string, ou `default` se ausente/vazia.
+    """
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip()
+
+
+def env_int(name: str, default: int) -> int:
+    """
+    Retorna o valor da variável de ambiente `name` como inteiro.
+    Valores inválidos são ignorados e o `default` é usado.
+    """
+    try:
+        return int(env_str(name, str(default)))
+    except ValueError:
+        return default
+
+
+def env_float(name: str, default: float) -> float:
+    """
+    Retorna o valor da variável de ambiente `name` como float.
+    Valores inválidos são ignorados e o `default` é usado.
+    """
+    try:
+        return float(env_str(name, str(default)))
+    except ValueError:
+        return default
+
+
+def env_bool(name: str, default: bool) -> bool:
+    """
+    Retorna o valor da variável de ambiente `name` como booleano.
+    Aceita "1", "true", "yes", "on" (e equivalentes em português "sim") como verdadeiro.
+    """
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on", "sim")
+
+
+def env_timezone(name: str) -> Optional[ZoneInfo]:
+    """
+    Retorna o fuso horário (nome IANA, ex: "America/Sao_Paulo") da variável de ambiente `name`.
+    Se ausente ou inválido, retorna None (o fuso horário local do servidor é usado).
+    """
+    value = env_str(name, "")
+    if not value:
+        return None
+    try:
+        return ZoneInfo(value)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
@@ -1,5 +1,9 @@
 from langchain_groq import ChatGroq
 from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_google_genai.chat_models import ChatGoogleGenerativeAIError
+from google.api_core.exceptions import GoogleAPIError
+from groq import APIError as GroqAPIError
+import httpx
 import os
 
 def get_llm_groq():
@@ -32,4 +36,55 @@ def get_llm_google():
     print(f"INFO: Usando LLM: Google Gemini ({llm.model})")
 
     # Retorna a instância configurada do LLM
-    return llm
\ No newline at end of file
+    return llm
+
+# Provedores disponíveis, por nome (NT_AI_LLM_PROVIDER, NT_AI_SECONDARY_PROVIDER e as faixas
+# do roteador de modelos, NT_AI_ROUTER_FAST_PROVIDER e NT_AI_ROUTER_STRONG_PROVIDER).
+LLM_PROVIDERS = {
+    "google": get_llm_google,
+    "groq": get_llm_groq,
+}
+
+# Erros que indicam falha do PROVEDOR (fora do ar, timeout, 429, erro da API), e não da
+# aplicação. Só eles acionam o modo degradado e o escalonamento do roteador de modelos.
+PROVIDER_ERRORS = (
+    GroqAPIError,
+    GoogleAPIError,
+    ChatGoogleGenerativeAIError,
+    httpx.HTTPError,
+    TimeoutError,
+    ConnectionError,
+)
+
+# Cotas padrão de cada provedor (requisições por minuto, tokens por minuto), usadas pelo
+# agendador de chamadas (NT_AI_RATE_LIMIT=true) quando NT_AI_RATE_<PROVEDOR>_RPM/_TPM não são
+# definidas. Valores do plano gratuito de cada modelo; ajuste-os ao plano contratado.
+# ⚠️ Groq: 6.000 TPM (plano gratuito do llama-3.1-8b-instant) comportam cerca de UMA chamada do
+# Parser por minuto (o prompt do Parser passa de 4 mil tokens). Com o agendador ativo e a Groq
+# como principal, secundária ou faixa rápida do roteador, quase toda requisição espera na fila.
+# Use um plano com TPM maior (NT_AI_RATE_GROQ_TPM) ou deixe o agendador desligado para a Groq
+# (NT_AI_RATE_GROQ_TPM=0). Chamadas estimadas acima do limite são registradas em log e em
+# `/metrics` ("oversized_requests").
+PROVIDER_RATE_LIMITS = {
+    "google": (10, 250_000),
+    "groq": (30, 6_000),
+}
+
+# Método nativo de saída estruturada de cada provedor:
+# - Gemini: "json_schema" (esquema de resposta nativo, `response_schema`).
+# - Groq: "function_calling" (tool calling), suportado por todos os modelos da Groq,
+#   inclusive o llama-3.1-8b-instant (o "json_schema" da Groq só existe em alguns modelos).
+STRUCTURED_OUTPUT_METHODS = {
+    ChatGoogleGenerativeAI: "json_schema",
+    ChatGroq: "function_calling",
+}
+
+
+def get_structured_llm(llm, schema):
+    """
+    Envolve o LLM com a saída estruturada nativa do seu provedor, usando o modelo Pydantic
+    `schema`. A saída é um dicionário {'raw', 'parsed', 'parsing_error'} (include_raw=True),
+    para que o chamador ainda possa recuperar o texto bruto em caso de falha.
+    """
+    method = STRUCTURED_OUTPUT_METHODS.get(type(llm), "function_calling")
+    return llm.with_structured_output(schema, method=method, include_raw=True)
@@ -0,0 +1,27 @@
+# =================================================================================================
+#
+#                               REGISTRO CENTRAL DE MÉTRICAS EM MEMÓRIA
+#
+# Cada componente do serviço (caches, etc.) registra aqui uma função que devolve um dicionário
+# com suas estatísticas. O endpoint `GET /metrics` do `app/main.py` chama `snapshot()` para
+# expor tudo de uma vez, sem que o `main.py` precise conhecer cada componente.
+#
+# =================================================================================================
+
+from typing import Callable, Dict
+
+_PROVIDERS: Dict[str, Callable[[], dict]] = {}
+
+
+def register(name: str, provider: Callable[[], dict]) -> None:
+    """
+    Registra (ou substitui) o provedor de estatísticas identificado por `name`.
+    """
+    _PROVIDERS[name] = provider
+
+
+def snapshot() -> dict:
+    """
+    Retorna as estatísticas atuais de todos os componentes registrados.
+    """
+    return {name: provider() for name, provider in _PROVIDERS.items()}
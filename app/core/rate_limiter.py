@@ -0,0 +1,235 @@
+# =================================================================================================
+#
+#                       AGENDADOR DE CHAMADAS AO LLM (RATE LIMIT POR PROVEDOR)
+#
+# Visão Geral do Módulo:
+#
+# Os provedores limitam requisições por minuto (RPM) e tokens por minuto (TPM). Sem controle,
+# rajadas de tráfego estouram essas cotas e as chamadas voltam com erro 429. Este módulo é o
+# agendador por onde passam TODAS as chamadas das cadeias a um provedor:
+#
+# 1. Baldes de Fichas (Token Buckets):
+#    - Um balde de requisições (capacidade = RPM) e um de tokens (capacidade = TPM), reabastecidos
+#      continuamente. Cada chamada consome 1 requisição e a sua estimativa de tokens (prompt +
+#      saída esperada). Depois da resposta, a diferença para o uso real é acertada no balde.
+#
+# 2. Filas de Prioridade:
+#    - Chamadas que precisam esperar entram numa fila única ordenada por prioridade e por ordem
+#      de chegada: "production" (/parse-query) passa sempre à frente de "debug" (/debug-query),
+#      que passa à frente de "batch" (scripts e lotes).
+#    - A prioridade vem dos metadados da execução (chave `PRIORITY_METADATA_KEY` do RunnableConfig).
+#
+# 3. Recuo Adaptativo (429):
+#    - Uma resposta de rate limit pausa o provedor por um intervalo que dobra a cada novo 429
+#      (até `max_backoff_seconds`) e volta a zero no primeiro sucesso.
+#
+# 4. Métricas:
+#    - Profundidade da fila (total e por prioridade), tempo de espera (médio e máximo, por
+#      prioridade), respostas 429, o recuo atual e as chamadas maiores que o balde de tokens
+#      (registradas em log: com um TPM menor que um prompt, cada chamada esvazia o balde).
+#
+# - Thread-safe: as chamadas podem vir tanto do event loop quanto de threads.
+#
+# =================================================================================================
+
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Prioridades (menor = mais urgente).
+PRIORITIES = {"production": 0, "debug": 1, "batch": 2}
+DEFAULT_PRIORITY = "production"
+
+# Chave dos metadados do RunnableConfig que informa a prioridade da execução.
+PRIORITY_METADATA_KEY = "nt_ai_priority"
+
+# Intervalo máximo entre duas verificações de quem está na vez.
+POLL_SECONDS = 0.05
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """
+    Reconhece respostas de rate limit dos provedores (HTTP 429 / RESOURCE_EXHAUSTED).
+    """
+    code = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if code == 429:
+        return True
+    text = f"{type(error).__name__} {error}".lower()
+    return "429" in text or "rate limit" in text or "ratelimit" in text or "resource_exhausted" in text or "resourceexhausted" in text
+
+
+class TokenBucket:
+    """
+    Balde com capacidade `per_minute`, reabastecido continuamente. `per_minute <= 0` = sem limite.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.capacity / 60)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """
+        Segundos até haver `amount` fichas no balde (0 = disponível agora).
+        """
+        if self.capacity <= 0:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) * 60 / self.capacity
+
+    def take(self, amount: float) -> None:
+        if self.capacity > 0:
+            self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, amount: float) -> None:
+        """
+        Acerta o balde com a diferença entre o uso real e o estimado (pode ficar negativo).
+        """
+        if self.capacity > 0:
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class RateScheduler:
+    """
+    Agendador de chamadas a um provedor: baldes de RPM/TPM, fila por prioridade e recuo em 429.
+    """
+
+    def __init__(self, name: str, rpm: float = 0, tpm: float = 0, max_backoff_seconds: float = 60.0):
+        self.name = name
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_backoff_seconds = max_backoff_seconds
+        self._lock = threading.Lock()
+        self._queue = []
+        self._sequence = itertools.count()
+        self._paused_until = 0.0
+        self._backoff = 0.0
+        self.granted = Counter()
+        self.total_wait = Counter()
+        self.max_wait = 0.0
+        self.rate_limited = 0
+        self.oversized = 0
+
+    def _enqueue(self, priority: str, tokens: int) -> tuple:
+        if 0 < self.tokens.capacity < tokens:
+            with self._lock:
+                self.oversized += 1
+            logger.warning(
+                f"Agendador ({self.name}): chamada estimada em {tokens} tokens excede o limite de "
+                f"{self.tokens.capacity:.0f} TPM; ela esvazia o balde e as seguintes esperam até um minuto."
+            )
+        ticket = (PRIORITIES.get(priority, PRIORITIES[DEFAULT_PRIORITY]), next(self._sequence), priority)
+        with self._lock:
+            heapq.heappush(self._queue, ticket)
+        return ticket
+
+    def _dequeue(self, ticket: tuple) -> None:
+        with self._lock:
+            if ticket in self._queue:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+
+    def _try_acquire(self, ticket: tuple, tokens: int, waited: float) -> float:
+        """
+        Libera a chamada (retorna 0) se ela for a primeira da fila e houver fichas; senão,
+        retorna quantos segundos esperar antes de tentar de novo.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return min(self._paused_until - now, POLL_SECONDS)
+            if self._queue[0] != ticket:
+                return POLL_SECONDS
+            wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+            if wait > 0:
+                return min(wait, POLL_SECONDS)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            heapq.heappop(self._queue)
+            self.granted[ticket[2]] += 1
+            self.total_wait[ticket[2]] += waited
+            self.max_wait = max(self.max_wait, waited)
+            return 0.0
+
+    def acquire(self, tokens: int, priority: str = DEFAULT_PRIORITY) -> None:
+        """
+        Bloqueia a thread até a chamada poder ser enviada ao provedor.
+        """
+        ticket, start = self._enqueue(priority, tokens), time.monotonic()
+        try:
+            while True:
+                wait = self._try_acquire(ticket, tokens, time.monotonic() - start)
+                if wait <= 0:
+                    return
+                time.sleep(wait)
+        except BaseException:
+            self._dequeue(ticket)
+            raise
+
+    async def aacquire(self, tokens: int, priority: str = DEFAULT_PRIORITY) -> None:
+        """
+        Versão assíncrona de `acquire`: espera sem bloquear o event loop.
+        """
+        ticket, start = self._enqueue(priority, tokens), time.monotonic()
+        try:
+            while True:
+                wait = self._try_acquire(ticket, tokens, time.monotonic() - start)
+                if wait <= 0:
+                    return
+                await asyncio.sleep(wait)
+        except BaseException:
+            # Requisição cancelada enquanto esperava: sai da fila.
+            self._dequeue(ticket)
+            raise
+
+    def record_success(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        """
+        Encerra o recuo e acerta o balde de tokens com o uso real, quando o provedor o informa.
+        """
+        with self._lock:
+            self._backoff = 0.0
+            if actual_tokens is not None:
+                self.tokens.adjust(actual_tokens - estimated_tokens)
+
+    def record_failure(self, error: BaseException) -> None:
+        """
+        Em um 429, pausa o provedor por um intervalo que dobra a cada novo 429.
+        """
+        if not is_rate_limit_error(error):
+            return
+        with self._lock:
+            self.rate_limited += 1
+            self._backoff = min(self.max_backoff_seconds, self._backoff * 2 or 1.0)
+            self._paused_until = time.monotonic() + self._backoff
+
+    def stats(self) -> dict:
+        with self._lock:
+            lanes = Counter(ticket[2] for ticket in self._queue)
+            granted = sum(self.granted.values())
+            return {
+                "rpm_limit": self.requests.capacity,
+                "tpm_limit": self.tokens.capacity,
+                "queue_depth": len(self._queue),
+                "queue_depth_by_priority": {name: lanes.get(name, 0) for name in PRIORITIES},
+                "granted": dict(self.granted),
+                "avg_wait_seconds": round(sum(self.total_wait.values()) / granted, 3) if granted else 0.0,
+                "avg_wait_seconds_by_priority": {
+                    name: round(self.total_wait[name] / count, 3) for name, count in self.granted.items()
+                },
+                "max_wait_seconds": round(self.max_wait, 3),
+                "rate_limited": self.rate_limited,
+                "backoff_seconds": self._backoff,
+                "oversized_requests": self.oversized,
+            }
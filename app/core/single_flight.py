@@ -0,0 +1,132 @@
+# =================================================================================================
+#
+#                       COALESCÊNCIA DE REQUISIÇÕES IDÊNTICAS EM ANDAMENTO (SINGLE-FLIGHT)
+#
+# Visão Geral do Módulo:
+#
+# Painéis abertos ao mesmo tempo (ex: início de turno) disparam a MESMA pergunta de vários
+# usuários no mesmo instante. O cache de resultados só ajuda DEPOIS que a primeira execução
+# termina; até lá, cada requisição chamaria o LLM por conta própria. Aqui, requisições
+# concorrentes com a mesma chave compartilham UMA execução:
+#
+# 1. Líder e Seguidores:
+#    - A primeira requisição de uma chave (líder) inicia a execução. As que chegam enquanto
+#      ela está em andamento (seguidoras) apenas aguardam e recebem o mesmo resultado (ou o
+#      mesmo erro). Cada seguidora recebe uma cópia, para que ninguém altere o resultado alheio.
+#
+# 2. Cancelamento (modo assíncrono):
+#    - A execução roda numa tarefa própria, não na requisição do líder. Se o cliente do líder
+#      desconectar, as seguidoras continuam aguardando normalmente.
+#    - A execução só é cancelada quando TODAS as requisições que a aguardam forem canceladas.
+#
+# 3. Métricas:
+#    - Execuções, requisições coalescidas e chamadas ao LLM economizadas (coalescidas x chamadas
+#      por execução, informadas pelo chamador).
+#
+# =================================================================================================
+
+import asyncio
+import copy
+import threading
+from typing import Awaitable, Callable, Hashable
+
+
+class _Call:
+    """
+    Execução em andamento de uma chave.
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.task = None
+        self.waiters = 0
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Agrupa chamadas concorrentes de mesma chave em uma única execução.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._sync_calls = {}
+        self._async_calls = {}
+        self.executions = 0
+        self.coalesced = 0
+        self.calls_saved = 0
+
+    def do(self, key: Hashable, func: Callable, calls_per_execution: int = 1):
+        """
+        Executa `func()` uma única vez por chave entre as chamadas concorrentes (threads).
+        """
+        with self._lock:
+            call = self._sync_calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._sync_calls[key] = _Call()
+                self.executions += 1
+            else:
+                self.coalesced += 1
+                self.calls_saved += calls_per_execution
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._sync_calls[key]
+            call.event.set()
+
+    async def ado(self, key: Hashable, func: Callable[[], Awaitable], calls_per_execution: int = 1):
+        """
+        Versão assíncrona de `do`: `func()` devolve o awaitable da execução.
+        """
+        with self._lock:
+            call = self._async_calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._async_calls[key] = _Call()
+                call.task = asyncio.ensure_future(func())
+                call.task.add_done_callback(lambda _: self._forget(key, call))
+                self.executions += 1
+            else:
+                self.coalesced += 1
+                self.calls_saved += calls_per_execution
+            call.waiters += 1
+        try:
+            # `shield`: o cancelamento de uma requisição não cancela a execução compartilhada.
+            result = await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            with self._lock:
+                call.waiters -= 1
+                abandoned = call.waiters == 0
+            if abandoned:
+                call.task.cancel()
+            raise
+        with self._lock:
+            call.waiters -= 1
+        return result if leader else copy.deepcopy(result)
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        with self._lock:
+            if self._async_calls.get(key) is call:
+                del self._async_calls[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "executions": self.executions,
+                "coalesced_requests": self.coalesced,
+                "llm_calls_saved": self.calls_saved,
+                "in_flight": len(self._sync_calls) + len(self._async_calls),
+            }
@@ -19,29 +19,57 @@
 #      título e descrição, que são usados para a documentação automática (Swagger/OpenAPI).
 #
 # 3. Carregamento das Cadeias de IA na Inicialização:
-#    - Invoca as funções `create_master_chain()` and `create_debug_chain()` uma única vez
-#      quando o servidor é iniciado, através do evento "startup". Esta é uma otimização de
-#      performance crucial para evitar o custo de recarregar os modelos de IA a cada nova requisição.
+#    - Invoca a função `create_master_chain()` uma única vez quando o servidor é iniciado,
+#      através do evento "startup". Esta é uma otimização de performance crucial para evitar
+#      o custo de recarregar os modelos de IA a cada nova requisição.
+#    - A cadeia de debug (`create_debug_chain()`) reutiliza o mesmo cliente LLM e a mesma linha
+#      de montagem, e só é criada na primeira chamada ao `/debug-query`. O endpoint pode ser
+#      desligado em produção com NT_AI_DEBUG_ENDPOINT=false (passa a responder 404).
 #
 # 4. Definição de Endpoints (Rotas) Assíncronos:
 #    - `/parse-query` (POST): O endpoint de produção, otimizado para retornar apenas o
 #      resultado final (o JSON de filtros). Retorna erro 400 se o JSON for nulo.
 #    - `/debug-query` (POST): O endpoint de desenvolvimento e diagnóstico, que retorna
 #      os resultados de cada etapa intermediária. Retorna erro 400 se o JSON for nulo.
+#    - `/parse-query/stream` (POST): Versão em streaming do `/parse-query` (NDJSON, um evento
+#      JSON por linha). Envia a pergunta normalizada assim que o Enhancer termina, os campos
+#      parciais do Parser (se ativos) e, em seguida, o JSON de filtros, com o tempo de cada etapa.
+#    - `/parse-queries` (POST): Versão em lote do `/parse-query`. Interpreta uma lista de
+#      perguntas concorrentemente (com limite de concorrência), sem repetir perguntas
+#      idênticas, e devolve o status de cada item (200, 400 ou 500) sem falhar o lote inteiro.
+#    - `/metrics` (GET): Expõe as estatísticas em memória do serviço (ex: acertos e
+#      falhas do cache de resultados).
 #
-# 5. Validação de Entrada (Pydantic):
+# 5. Rastreabilidade do Caminho de Execução:
+#    - Cada requisição pode ser atendida pelo caminho rápido determinístico ('fast_path'),
+#      pelo cache ('cache') ou pelas cadeias de LLM ('llm'). Se os provedores de LLM estiverem
+#      fora do ar, a resposta vem do modo degradado por palavras-chave ('degraded'), que sinaliza
+#      um resultado aproximado. O caminho é registrado nos logs
+#      e devolvido no header `X-NT-AI-Path` (e na chave 'path' do `/debug-query`, do stream e
+#      dos itens do lote). Respostas degradadas também trazem `"degraded": true` no corpo; se o
+#      modo degradado não reconhecer nenhum filtro, a resposta é 503 (e não 400 de consulta vaga).
+#
+# 6. Validação de Entrada (Pydantic):
 #    - Utiliza o modelo `QueryRequest` para garantir que todas as requisições recebidas
 #      tenham um corpo (body) JSON válido e com os campos esperados.
 #
 # =================================================================================================
 # =================================================================================================
 
+import json
 import logging
+import time
 from logging.handlers import RotatingFileHandler
-from fastapi import FastAPI, HTTPException, status # <-- Adicione 'status'
+from fastapi import FastAPI, HTTPException, Response, status # <-- Adicione 'status'
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from typing import List
 from dotenv import load_dotenv
-from app.chains.master_chain import create_master_chain, create_debug_chain
+from app.chains.master_chain import create_master_chain, create_debug_chain, STAGE_ENHANCER, STAGE_PARSER, STAGE_FUSED, PARTIAL_FIELDS_EVENT, PATH_DEGRADED
+from app.core import metrics
+from app.core.cache import canonicalize_query
+from app.core.config import env_bool, env_int
+from app.core.rate_limiter import PRIORITY_METADATA_KEY
 from pathlib import Path
 
 # --- Configuração Avançada do Logging ---
@@ -66,6 +94,11 @@ LOG_BACKUP_COUNT = 5 # Número de arquivos de backup a serem mantidos (ex: .log,
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO) # Define o nível mínimo de severidade para as mensagens a serem processadas.
 
+# Os handlers são anexados ao logger do pacote 'app' (pai de 'app.main'), para que os logs
+# dos demais módulos (ex: 'app.chains.master_chain') também sejam gravados no arquivo e no console.
+package_logger = logging.getLogger("app")
+package_logger.setLevel(logging.INFO)
+
 # Cria um formatador para padronizar a aparência de todas as linhas de log.
 formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
@@ -83,10 +116,10 @@ file_handler.setFormatter(formatter) # Aplica o formatador a este handler.
 console_handler = logging.StreamHandler()
 console_handler.setFormatter(formatter)
 
-# Adiciona ambos os handlers ao logger. A partir daqui, qualquer chamada a `logger.info`, `logger.error`,
-# etc., será enviada tanto para o arquivo quanto para o console.
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
+# Adiciona ambos os handlers ao logger do pacote. A partir daqui, qualquer chamada a `logger.info`,
+# `logger.error`, etc., será enviada tanto para o arquivo quanto para o console.
+package_logger.addHandler(file_handler)
+package_logger.addHandler(console_handler)
 
 # --- Fim da Configuração do Logging ---
 
@@ -103,16 +136,27 @@ app = FastAPI(
 
 
 # Define os objetos das cadeias como globais (iniciados como None).
-# Eles serão populados pela função de startup para garantir que sejam carregados apenas uma vez.
+# A master_chain é populada pela função de startup; a debug_chain, sob demanda (`get_debug_chain`).
 master_chain = None
 debug_chain = None
 
+
+def get_debug_chain():
+    """
+    Retorna a cadeia de debug, criando-a na primeira chamada.
+    """
+    global debug_chain
+    if debug_chain is None:
+        logger.info("Criando a cadeia de debug (primeira chamada ao /debug-query)...")
+        debug_chain = create_debug_chain()
+    return debug_chain
+
 @app.on_event("startup")
 async def startup_event():
     """
     Função executada uma vez quando a aplicação inicia.
     """
-    global master_chain, debug_chain
+    global master_chain
     logger.info("=============================================")
     logger.info("===     INICIANDO APLICAÇÃO NT-AI         ===")
     logger.info("=============================================")
@@ -121,7 +165,6 @@ async def startup_event():
     # Carrega as cadeias de IA aqui, dentro do evento de startup.
     # Esta é a prática recomendada pelo FastAPI.
     master_chain = create_master_chain()
-    debug_chain = create_debug_chain()
     
     logger.info("Cadeias de LangChain carregadas com sucesso.")
 
@@ -141,6 +184,11 @@ class QueryRequest(BaseModel):
     query: str
 
 
+# Corpo do `/parse-queries`: uma lista de perguntas.
+class BatchQueryRequest(BaseModel):
+    queries: List[str]
+
+
 def is_all_null(data):
     """
     Função auxiliar para verificar se todos os valores em um dicionário são None (null).
@@ -153,11 +201,33 @@ def is_all_null(data):
     return all(value is None for value in data.values())
 
 
+# Mensagem de erro para perguntas que resultam em um JSON todo nulo (usada também no lote).
+VAGUE_QUERY_DETAIL = "A consulta fornecida é muito vaga, irrelevante ou não pôde ser interpretada. Por favor, seja mais específico."
+
+# Mensagem de erro do modo degradado sem nenhum filtro reconhecido: a culpa é da indisponibilidade
+# dos provedores, não da pergunta.
+DEGRADED_EMPTY_DETAIL = "Os provedores de IA estão indisponíveis e a consulta não pôde ser interpretada sem eles. Tente novamente em instantes."
+
+
+def empty_result_error(path: str):
+    """
+    (status, detalhe) de um JSON todo nulo: 503 no modo degradado, 400 (consulta vaga) nos demais.
+    """
+    if path == PATH_DEGRADED:
+        return status.HTTP_503_SERVICE_UNAVAILABLE, DEGRADED_EMPTY_DETAIL
+    return status.HTTP_400_BAD_REQUEST, VAGUE_QUERY_DETAIL
+
+
+# Header de resposta que informa qual caminho atendeu a requisição ('fast_path', 'cache', 'llm' ou 'degraded').
+PATH_HEADER = "X-NT-AI-Path"
+
+
 @app.post("/parse-query")
-async def parse_query(request: QueryRequest):
+async def parse_query(request: QueryRequest, response: Response):
     """
     Endpoint de produção. Recebe uma query, processa na cadeia principal
     e retorna o JSON de filtros final, OU um erro 400 se o JSON for todo nulo.
+    O caminho que atendeu a requisição é informado no header `X-NT-AI-Path`.
     """
     try:
         # Validação de entrada básica
@@ -166,15 +236,19 @@ async def parse_query(request: QueryRequest):
 
         logger.info(f"Recebida nova requisição em /parse-query para a query: '{request.query[:50]}...'")
         result = await master_chain.ainvoke({"query": request.query})
-
-        if is_all_null(result):
-            logger.warning(f"Consulta vaga/irrelevante detectada para query: '{request.query}'. Retornando erro 400.")
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST, # Usa status.HTTP_400_BAD_REQUEST
-                detail="A consulta fornecida é muito vaga, irrelevante ou não pôde ser interpretada. Por favor, seja mais específico."
-            )
-
-        return result
+        parsed_json, path = result["parsed_json"], result["path"]
+        logger.info(f"Query atendida pelo caminho '{path}'.")
+
+        if is_all_null(parsed_json):
+            status_code, detail = empty_result_error(path)
+            logger.warning(f"JSON todo nulo (caminho '{path}') para query: '{request.query}'. Retornando erro {status_code}.")
+            raise HTTPException(status_code=status_code, detail=detail, headers={PATH_HEADER: path})
+
+        response.headers[PATH_HEADER] = path
+        if path == PATH_DEGRADED:
+            # Clientes que ignoram headers também precisam saber que o resultado é aproximado.
+            return {**parsed_json, "degraded": True}
+        return parsed_json
     except HTTPException as http_exc:
         # Re-levanta exceções HTTP (como a nossa 400) para o FastAPI tratar
         raise http_exc
@@ -183,18 +257,87 @@ async def parse_query(request: QueryRequest):
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Erro interno: {str(e)}")
 
 
+def _stream_line(event: str, **data) -> str:
+    """
+    Uma linha do stream NDJSON: {"event": <nome>, ...dados}.
+    """
+    return json.dumps({"event": event, **data}, ensure_ascii=False) + "\n"
+
+
+async def _stream_query(query: str):
+    """
+    Executa a master_chain com `astream_events` e gera os eventos do `/parse-query/stream`:
+    - "enhanced_query": a pergunta normalizada, assim que o Enhancer (ou a chamada fundida) termina.
+    - "partial": os campos já gerados pelo Parser (com NT_AI_JSON_EARLY_STOP=true), antes da
+      validação final; cada evento traz todos os campos concluídos até ali.
+    - "result": o JSON de filtros final, o caminho que atendeu a requisição e o tempo de cada etapa.
+    - "error": status 400 (JSON todo nulo), 503 (JSON todo nulo no modo degradado) ou 500
+      (erro interno), no lugar do "result".
+    Nos caminhos sem LLM ('fast_path', 'cache', 'degraded'), apenas o "result" é enviado.
+    """
+    start = time.perf_counter()
+    stage_starts, timings, result = {}, {}, None
+    try:
+        async for event in master_chain.astream_events({"query": query}, version="v2"):
+            name, kind = event["name"], event["event"]
+            if kind == "on_chain_start" and name in (STAGE_ENHANCER, STAGE_PARSER, STAGE_FUSED):
+                stage_starts[event["run_id"]] = time.perf_counter()
+            elif kind == "on_chain_end" and event["run_id"] in stage_starts:
+                timings[f"{name}_seconds"] = round(time.perf_counter() - stage_starts.pop(event["run_id"]), 3)
+                output = event["data"].get("output")
+                enhanced_query = output.get("enhanced_query") if name == STAGE_FUSED else output
+                if name in (STAGE_ENHANCER, STAGE_FUSED) and enhanced_query:
+                    yield _stream_line("enhanced_query", enhanced_query=enhanced_query, elapsed_seconds=round(time.perf_counter() - start, 3))
+            elif kind == "on_custom_event" and name == PARTIAL_FIELDS_EVENT:
+                yield _stream_line("partial", fields=event["data"], elapsed_seconds=round(time.perf_counter() - start, 3))
+            elif kind == "on_chain_end" and not event["parent_ids"]:
+                result = event["data"]["output"]
+        if result is None:
+            raise RuntimeError("o stream terminou sem o resultado final da cadeia.")
+
+        timings["total_seconds"] = round(time.perf_counter() - start, 3)
+        logger.info(f"Query (stream) atendida pelo caminho '{result['path']}'.")
+        degraded = result["path"] == PATH_DEGRADED
+        if is_all_null(result["parsed_json"]):
+            status_code, detail = empty_result_error(result["path"])
+            logger.warning(f"JSON todo nulo (stream, caminho '{result['path']}') para query: '{query}'. Retornando erro {status_code}.")
+            yield _stream_line("error", status=status_code, detail=detail, path=result["path"], degraded=degraded, timings=timings)
+            return
+        yield _stream_line("result", parsed_json=result["parsed_json"], path=result["path"], degraded=degraded, timings=timings)
+    except Exception as e:
+        logger.error(f"Erro no endpoint /parse-query/stream para a query: '{query}'", exc_info=True)
+        yield _stream_line("error", status=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Erro interno: {str(e)}")
+
+
+@app.post("/parse-query/stream")
+async def parse_query_stream(request: QueryRequest):
+    """
+    Endpoint de produção em streaming (NDJSON: um objeto JSON por linha, enviado assim que fica
+    pronto). A interface pode mostrar a pergunta normalizada enquanto os filtros são calculados.
+    Erros de validação da entrada respondem 400 antes do stream; os demais chegam como evento "error".
+    """
+    if not request.query or not request.query.strip():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="A 'query' não pode ser vazia.")
+    logger.info(f"Recebida nova requisição em /parse-query/stream para a query: '{request.query[:50]}...'")
+    return StreamingResponse(_stream_query(request.query), media_type="application/x-ndjson")
+
+
 @app.post("/debug-query")
-async def debug_query(request: QueryRequest):
+async def debug_query(request: QueryRequest, response: Response):
     """
     Endpoint de desenvolvimento. Retorna resultados intermediários,
     OU um erro 400 se o JSON final for todo nulo.
+    Responde 404 se o endpoint estiver desligado (NT_AI_DEBUG_ENDPOINT=false).
     """
+    if not env_bool("NT_AI_DEBUG_ENDPOINT", True):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="O endpoint de debug está desativado.")
     try:
         if not request.query or not request.query.strip():
              raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="A 'query' não pode ser vazia.") # Usa status
         
         logger.info(f"Recebida nova requisição em /debug-query para a query: '{request.query[:50]}...'")
-        result = await debug_chain.ainvoke({"query": request.query})
+        result = await get_debug_chain().ainvoke({"query": request.query})
+        logger.info(f"Query (debug) atendida pelo caminho '{result.get('path')}'.")
 
         # No debug_chain, o JSON está dentro da chave 'parsed_json'
         parsed_json_result = result.get("parsed_json")
@@ -208,6 +351,7 @@ async def debug_query(request: QueryRequest):
                 detail="A consulta fornecida é muito vaga, irrelevante ou não pôde ser interpretada (JSON final seria nulo)."
             )
         
+        response.headers[PATH_HEADER] = result.get("path", "")
         return result
     except HTTPException as http_exc:
         # Re-levanta exceções HTTP (como a nossa 400)
@@ -216,4 +360,69 @@ async def debug_query(request: QueryRequest):
         logger.error(f"Erro na execução da cadeia de debug para a query: '{request.query}'", exc_info=True)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Erro interno ao processar a query com a IA: {str(e)}")
 
+@app.post("/parse-queries")
+async def parse_queries(request: BatchQueryRequest):
+    """
+    Endpoint de produção em lote. Interpreta todas as perguntas com `master_chain.abatch`,
+    no máximo NT_AI_BATCH_CONCURRENCY ao mesmo tempo e na fila de prioridade "batch".
+    Perguntas idênticas (mesma forma canônica) são executadas uma única vez.
+    Cada item do resultado traz seu próprio status: 200 (com o JSON), 400 (pergunta vazia ou
+    JSON todo nulo), 503 (JSON todo nulo no modo degradado) ou 500 (erro interno); um item com
+    erro não falha o lote. Itens do modo degradado trazem `"degraded": true`.
+    """
+    max_queries = env_int("NT_AI_BATCH_MAX_QUERIES", 100)
+    if not request.queries:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="A lista 'queries' não pode ser vazia.")
+    if len(request.queries) > max_queries:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A lista 'queries' pode ter no máximo {max_queries} perguntas.",
+        )
+
+    # Remove repetições: cada pergunta canônica é executada uma vez e seu resultado é
+    # copiado para todas as posições em que aparece.
+    unique = {}
+    for query in request.queries:
+        if query and query.strip():
+            unique.setdefault(canonicalize_query(query), query)
+    keys = list(unique)
+    logger.info(f"Recebida nova requisição em /parse-queries com {len(request.queries)} perguntas ({len(keys)} distintas).")
+
+    outputs = await master_chain.abatch(
+        [{"query": unique[key]} for key in keys],
+        config={
+            "max_concurrency": env_int("NT_AI_BATCH_CONCURRENCY", 5),
+            "metadata": {PRIORITY_METADATA_KEY: "batch"},
+        },
+        return_exceptions=True,
+    )
+
+    items = {}
+    for key, output in zip(keys, outputs):
+        if isinstance(output, Exception):
+            logger.error(f"Erro no lote para a query: '{unique[key]}'", exc_info=output)
+            items[key] = {"status": status.HTTP_500_INTERNAL_SERVER_ERROR, "error": f"Erro interno: {str(output)}"}
+        elif is_all_null(output["parsed_json"]):
+            status_code, detail = empty_result_error(output["path"])
+            items[key] = {"status": status_code, "path": output["path"], "degraded": output["path"] == PATH_DEGRADED, "error": detail}
+        else:
+            items[key] = {"status": status.HTTP_200_OK, "path": output["path"], "degraded": output["path"] == PATH_DEGRADED, "result": output["parsed_json"]}
+
+    results = []
+    for query in request.queries:
+        if not query or not query.strip():
+            results.append({"query": query, "status": status.HTTP_400_BAD_REQUEST, "error": "A 'query' não pode ser vazia."})
+        else:
+            results.append({"query": query, **items[canonicalize_query(query)]})
+    return {"results": results, "distinct_queries": len(keys)}
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Endpoint de observabilidade. Retorna as estatísticas em memória de todos os
+    componentes registrados (ex: hits/misses do cache de resultados).
+    """
+    return metrics.snapshot()
+
 # Comando para rodar a aplicação: uvicorn app.main:app --reload --port 5001
\ No newline at end of file
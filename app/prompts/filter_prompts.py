@@ -36,7 +36,10 @@
 # =================================================================================================
 # =================================================================================================
 
+import json
+import re
 from langchain_core.prompts import PromptTemplate
+from app.prompts.vocabulary import FILTER_FIELDS, UF_NOMES, UF_SIGLAS
 from datetime import datetime, timedelta
 
 # --- Bloco 1: O Tradutor de Termos de Negócio (QUERY_ENHANCER_PROMPT) ---
@@ -128,7 +131,7 @@ QUERY_ENHANCER_PROMPT = PromptTemplate.from_template(enhancer_template)
 # Ele recebe a pergunta já normalizada e tem a responsabilidade de extrair todas as
 # entidades relevantes e formatá-las em um JSON estrito, que será usado como
 # entrada para a procedure do banco de dados.
-parser_template = """
+parser_rules_template = """
 Você é um assistente especialista que analisa um texto claro e o converte para um objeto JSON de filtros. Sua resposta deve ser APENAS o objeto JSON, sem nenhum texto adicional.
 Sua tarefa principal é extrair TODOS os filtros mencionados. A ordenação é uma tarefa secundária. Não ignore um filtro para aplicar uma ordenação.
 
@@ -292,52 +295,211 @@ Este sistema NÃO suporta filtros de exclusão (ex: "não", "exceto", "menos", "
 
 Exemplos:
 ---
-Texto: "Quais notas de operação OutBound-SPO estão com análise de performance 'ATRASO'?"
-JSON: {{"NF": null, "DE": null, "ATE": null, "TipoData": null, "Cliente": null, "Transportadora": null, "UFDestino": null, "CidadeDestino": null, "Operacao": "OutBound-SPO", "SituacaoNF": null, "StatusAnaliseData": "ATRASO", "CNPJRaizTransp": null, "SortColumn": null, "SortDirection": null}}
----
-Texto: "notas previstas entre 1 e 15 de setembro de 2025"
-JSON: {{"NF": null, "DE": "2025-09-01", "ATE": "2025-09-15", "TipoData": "4", "Cliente": null, "Transportadora": null, "UFDestino": null, "CidadeDestino": null, "Operacao": null, "SituacaoNF": null, "StatusAnaliseData": null, "CNPJRaizTransp": null, "SortColumn": null, "SortDirection": null}}
----
-Texto: "notas entregues ontem ordenadas pela data de entrega mais recente"
-JSON: {{"NF": null, "DE": "{yesterday}", "ATE": "{yesterday}", "TipoData": "2", "Cliente": null, "Transportadora": null, "UFDestino": null, "CidadeDestino": null, "Operacao": null, "SituacaoNF": null, "StatusAnaliseData": null, "CNPJRaizTransp": null, "SortColumn": "data_entrega", "SortDirection": "DESC"}}
----
-Texto: "Me mostre as notas fiscais em trânsito ordenadas pelo maior valor"
-JSON: {{"NF": null, "DE": null, "ATE": null, "TipoData": null, "Cliente": null, "Transportadora": null, "UFDestino": null, "CidadeDestino": null, "Operacao": null, "SituacaoNF": "TRÂNSITO", "StatusAnaliseData": null, "CNPJRaizTransp": null, "SortColumn": "valor_nf", "SortDirection": "DESC"}}
----
-Texto: "Me mostre as notas com status de análise de performance ENTREGUE"
-JSON: {{"NF": null, "DE": null, "ATE": null, "TipoData": null, "Cliente": null, "Transportadora": null, "UFDestino": null, "CidadeDestino": null, "Operacao": null, "SituacaoNF": null, "StatusAnaliseData": "ENTREGUE", "CNPJRaizTransp": null, "SortColumn": null, "SortDirection": null}}
----
-Texto: "liste as notas emitidas hoje para SP que estão em trânsito"
-JSON: {{"NF": null, "DE": "{today}", "ATE": "{today}", "TipoData": "3", "Cliente": null, "Transportadora": null, "UFDestino": "SP", "CidadeDestino": null, "Operacao": null, "SituacaoNF": "TRÂNSITO", "StatusAnaliseData": null, "CNPJRaizTransp": null, "SortColumn": null, "SortDirection": null}}
----
-Texto: "Quais notas foram emitidas este mês?"
-JSON: {{"NF": null, "DE": "{month_start}", "ATE": "{month_end}", "TipoData": "3", "Cliente": null, "Transportadora": null, "UFDestino": null, "CidadeDestino": null, "Operacao": null, "SituacaoNF": null, "StatusAnaliseData": null, "CNPJRaizTransp": null, "SortColumn": null, "SortDirection": null}}
----
-Texto: "Quais notas fiscais têm status de entregue?"
-JSON: {{"NF": null, "DE": null, "ATE": null, "TipoData": null, "Cliente": null, "Transportadora": null, "UFDestino": null, "CidadeDestino": null, "Operacao": null, "SituacaoNF": "ENTREGUE", "StatusAnaliseData": null, "CNPJRaizTransp": null, "SortColumn": null, "SortDirection": null}}
----
-Texto: "Me mostre as notas fiscais em trânsito E com atraso"
-JSON: {{"NF": null, "DE": null, "ATE": null, "TipoData": null, "Cliente": null, "Transportadora": null, "UFDestino": null, "CidadeDestino": null, "Operacao": null, "SituacaoNF": "TRÂNSITO", "StatusAnaliseData": "ATRASO", "CNPJRaizTransp": null, "SortColumn": null, "SortDirection": null}}
----
-Texto: "qual o status da entrega?"
-JSON: {{"NF": null, "DE": null, "ATE": null, "TipoData": null, "Cliente": null, "Transportadora": null, "UFDestino": null, "CidadeDestino": null, "Operacao": null, "SituacaoNF": null, "StatusAnaliseData": null, "CNPJRaizTransp": null, "SortColumn": null, "SortDirection": null}}
----
-Texto: "Quais notas estão previstas para daqui a 2 dias?" 
-JSON: {{"NF": null, "DE": null, "ATE": null, "TipoData": null, "Cliente": null, "Transportadora": null, "UFDestino": null, "CidadeDestino": null, "Operacao": null, "SituacaoNF": null, "StatusAnaliseData": "PREVISTO PARA 2 DIAS", "CNPJRaizTransp": null, "SortColumn": null, "SortDirection": null}}
----
-Texto: "Quais notas foram emitidas esta semana?"
-JSON: {{"NF": null, "DE": "{week_start}", "ATE": "{week_end}", "TipoData": "3", "Cliente": null, "Transportadora": null, "UFDestino": null, "CidadeDestino": null, "Operacao": null, "SituacaoNF": null, "StatusAnaliseData": null, "CNPJRaizTransp": null, "SortColumn": null, "SortDirection": null}}
----
+"""
+
 
+# Banco de exemplos do Parser: (texto, filtros preenchidos). Os campos ausentes são null.
+# Os marcadores de data (ex: "{today}") são variáveis do template, preenchidas na formatação.
+# O mesmo banco alimenta o prompt estático (todos os exemplos, abaixo), a saída esparsa e a
+# seleção dinâmica de exemplos (ver `app/chains/dynamic_prompt.py`).
+PARSER_EXAMPLES = (
+    ("Quais notas de operação OutBound-SPO estão com análise de performance 'ATRASO'?", {"Operacao": "OutBound-SPO", "StatusAnaliseData": "ATRASO"}),
+    ("notas previstas entre 1 e 15 de setembro de 2025", {"DE": "2025-09-01", "ATE": "2025-09-15", "TipoData": "4"}),
+    ("notas entregues ontem ordenadas pela data de entrega mais recente", {"DE": "{yesterday}", "ATE": "{yesterday}", "TipoData": "2", "SortColumn": "data_entrega", "SortDirection": "DESC"}),
+    ("Me mostre as notas fiscais em trânsito ordenadas pelo maior valor", {"SituacaoNF": "TRÂNSITO", "SortColumn": "valor_nf", "SortDirection": "DESC"}),
+    ("Me mostre as notas com status de análise de performance ENTREGUE", {"StatusAnaliseData": "ENTREGUE"}),
+    ("liste as notas emitidas hoje para SP que estão em trânsito", {"DE": "{today}", "ATE": "{today}", "TipoData": "3", "UFDestino": "SP", "SituacaoNF": "TRÂNSITO"}),
+    ("Quais notas foram emitidas este mês?", {"DE": "{month_start}", "ATE": "{month_end}", "TipoData": "3"}),
+    ("Quais notas fiscais têm status de entregue?", {"SituacaoNF": "ENTREGUE"}),
+    ("Me mostre as notas fiscais em trânsito E com atraso", {"SituacaoNF": "TRÂNSITO", "StatusAnaliseData": "ATRASO"}),
+    ("qual o status da entrega?", {}),
+    ("Quais notas estão previstas para daqui a 2 dias?", {"StatusAnaliseData": "PREVISTO PARA 2 DIAS"}),
+    ("Quais notas foram emitidas esta semana?", {"DE": "{week_start}", "ATE": "{week_end}", "TipoData": "3"}),
+)
+
+
+def render_parser_examples(examples, sparse: bool = False) -> str:
+    """
+    Formata exemplos do banco no layout do `parser_template` ("Texto: ..." / "JSON: ..." / "---").
+    Com `sparse=True`, o JSON traz apenas os campos preenchidos (ver Bloco 5).
+    As chaves externas do JSON são duplicadas (escape do PromptTemplate).
+    """
+    blocks = []
+    for text, filters in examples:
+        values = filters if sparse else {field: filters.get(field) for field in FILTER_FIELDS}
+        blocks.append(f'Texto: "{text}"\nJSON: {{' + json.dumps(values, ensure_ascii=False) + '}\n---\n')
+    return "".join(blocks)
+
+
+# Fechamento do Parser: a pergunta a ser analisada.
+parser_closing_template = """
 Agora, analise o seguinte texto.
 Texto: {enhanced_query}
 
 
 JSON FINAL:
 """
+parser_template = parser_rules_template + render_parser_examples(PARSER_EXAMPLES) + parser_closing_template
 JSON_PARSER_PROMPT = PromptTemplate.from_template(parser_template)
 
 
+# --- Bloco 3: Modo de Chamada Única (FUSED_PROMPT) ---
+
+# Usado quando NT_AI_PIPELINE_MODE=single_call (ver `master_chain.py`).
+# Combina as regras do Tradutor e do Especialista em Extração em UMA geração: o LLM
+# escreve primeiro a pergunta normalizada e, em seguida, o JSON final. Os dois blocos de
+# regras são reaproveitados dos templates acima (sem os exemplos do Tradutor e sem o
+# fechamento do Parser), para que uma mudança de regra valha para os dois modos. As instruções
+# de formato de cada etapa ("APENAS a frase reescrita", "APENAS o objeto JSON") são removidas:
+# o formato da resposta é o de duas linhas definido no final.
+_FUSED_REPLACED_FORMAT_RULES = (
+    r" Responda APENAS com a frase reescrita\.",
+    r" Sua resposta deve ser APENAS o objeto JSON, sem nenhum texto adicional\.",
+)
+
+
+def _without_format_rules(template: str) -> str:
+    for rule in _FUSED_REPLACED_FORMAT_RULES:
+        template = re.sub(rule, "", template, count=1)
+    return template
+
+
+fused_template = (
+    """
+Você executa DUAS etapas em sequência, em uma única resposta.
+
+ETAPA 1 - NORMALIZAÇÃO: siga as instruções do Tradutor abaixo para reescrever a pergunta do usuário.
+ETAPA 2 - EXTRAÇÃO: siga as instruções do Especialista em Extração abaixo, aplicadas à pergunta reescrita na ETAPA 1.
+
+=== INSTRUÇÕES DO TRADUTOR (ETAPA 1) ===
+"""
+    + _without_format_rules(enhancer_template.split("--- EXEMPLOS QUE ILUSTRAM AS REGRAS ---")[0])
+    + """
+=== INSTRUÇÕES DO ESPECIALISTA EM EXTRAÇÃO (ETAPA 2) ===
+"""
+    + _without_format_rules(parser_template.split("Agora, analise o seguinte texto.")[0])
+    + """
+=== FORMATO DA RESPOSTA (OBRIGATÓRIO) ===
+Responda EXATAMENTE com as duas linhas abaixo, sem nenhum texto adicional:
+PERGUNTA NORMALIZADA: <a pergunta reescrita na ETAPA 1>
+JSON FINAL: <o objeto JSON da ETAPA 2>
+
+Pergunta Original: {query}
+"""
+)
+FUSED_PROMPT = PromptTemplate.from_template(fused_template)
+
+
+# --- Bloco 4: Parser com Saída Estruturada (STRUCTURED_PARSER_PROMPT) ---
+
+# Usado quando NT_AI_STRUCTURED_OUTPUT=true (ver `master_chain.py`). O formato da resposta e os
+# valores aceitos de cada campo são impostos pelo esquema nativo do provedor (`schema.py`),
+# então as partes do `parser_template` que só descrevem o formato são removidas:
+# a instrução "APENAS o objeto JSON", a lista de campos, as listas de valores de
+# "Operacao"/"UFDestino" e o marcador final "JSON FINAL:". As regras de interpretação
+# e os exemplos são mantidos.
+_SCHEMA_ENFORCED_SECTIONS = (
+    r" Sua resposta deve ser APENAS o objeto JSON, sem nenhum texto adicional\.",
+    r"Analise o texto do usuário e extraia as seguintes entidades:\n.*?\n\n",
+    r'Mapeamento para "Operacao".*?\n\n',
+    r'Mapeamento para "UFDestino".*?\n\n',
+    r"\n+JSON FINAL:\n$",
+)
+structured_parser_template = parser_template
+for _section in _SCHEMA_ENFORCED_SECTIONS:
+    structured_parser_template = re.sub(_section, "", structured_parser_template, count=1, flags=re.DOTALL)
+STRUCTURED_PARSER_PROMPT = PromptTemplate.from_template(structured_parser_template)
+
+
+# --- Bloco 5: Parser com Saída Esparsa (SPARSE_PARSER_PROMPT) ---
+
+# Usado quando NT_AI_SPARSE_OUTPUT=true (ver `master_chain.py`). Os tokens de saída dominam a
+# latência da geração, e quase todos os 14 campos costumam ser null. Neste formato o LLM
+# escreve APENAS os campos preenchidos; o JSON completo é reconstruído em Python
+# (`expand_filters`, em `schema.py`). As regras são as mesmas do `parser_template`; mudam
+# apenas as instruções sobre campos ausentes (ex: pergunta vaga -> `{}`) e os exemplos,
+# renderizados sem os campos null.
+_SPARSE_FIELDS_RULE = (
+    "- Inclua no JSON APENAS os campos preenchidos; NÃO escreva campos com valor null. "
+    "Se nenhum filtro for encontrado, responda {{}}. Nas demais regras, um campo \"null\" é um campo omitido."
+)
+_SPARSE_REPLACEMENTS = (
+    ("- Se uma entidade não for encontrada, seu valor no JSON deve ser null.", _SPARSE_FIELDS_RULE),
+    ("Se a pergunta for vaga, todos os filtros devem ser null.", "Se a pergunta for vaga, responda {{}}."),
+    ("Se a busca for por um número de NF, todos os outros campos devem ser null.",
+     'Se a busca for por um número de NF, inclua APENAS o campo "NF".'),
+    ("(notas fiscais e logística), todos os campos devem ser null.", "(notas fiscais e logística), responda {{}}."),
+)
+
+sparse_parser_rules_template = parser_rules_template
+for _old, _new in _SPARSE_REPLACEMENTS:
+    sparse_parser_rules_template = sparse_parser_rules_template.replace(_old, _new)
+sparse_parser_template = (
+    sparse_parser_rules_template
+    + render_parser_examples(PARSER_EXAMPLES, sparse=True)
+    + parser_closing_template
+)
+SPARSE_PARSER_PROMPT = PromptTemplate.from_template(sparse_parser_template)
+
+
+# --- Bloco 6: Seções Opcionais do Parser (seleção dinâmica do prompt) ---
+
+# Usado quando NT_AI_DYNAMIC_PROMPT=true (ver `app/chains/dynamic_prompt.py`). Seções de regras
+# que só importam quando a pergunta menciona a entidade correspondente. Cada item é
+# (nome, padrão da seção no template, gatilho). O gatilho é aplicado à pergunta normalizada
+# (sem acentos, minúsculas); sem gatilho, a seção é removida do prompt daquela requisição.
+# As demais seções (datas, status, prioridades, negação) são sempre enviadas.
+# Gatilho das regras de localização: palavras de destino, siglas de UF ou uma preposição seguida
+# de sigla ou nome de estado ("entregues em Minas Gerais"). "para"/"pra" sozinhos aparecem em
+# quase toda pergunta ("previstas para amanhã") e não contam. Siglas que também são palavras
+# comuns ("se", "pe", "ma") e o nome "Pará" só contam depois da preposição.
+_UF_WORD_SIGLAS = {"SE", "PE", "MA"}
+_LOCATION_TRIGGER = (
+    r"\b(?:destino|estado|cidade|uf|" + "|".join(uf.lower() for uf in UF_SIGLAS if uf not in _UF_WORD_SIGLAS) + r")\b"
+    r"|\b(?:para|pra|pro|de|do|da|em|no|na)\s+(?:"
+    + "|".join([uf.lower() for uf in UF_SIGLAS] + sorted(UF_NOMES, key=len, reverse=True)) + r")\b"
+)
+
+PARSER_OPTIONAL_SECTIONS = (
+    (
+        "ordenacao",
+        r'Regras de Ordenação \("SortColumn"\):\n.*?\n\n(?=Regras Gerais:)',
+        r"\b(?:orden\w*|classific\w*|mais caro|mais barato|maior|menor|mais recentes?|mais antig\w*|mais nov\w*|crescente|decrescente)\b",
+    ),
+    (
+        "operacao",
+        r'Mapeamento para "Operacao" \(propósito do transporte\):\n.*?\n\n',
+        r"\b(?:operac\w*|inbound|outbound)",
+    ),
+    (
+        "localizacao",
+        r'(?:Mapeamento para "UFDestino" \(estado\):\n.*?\n\n|--- Regras de Localização ---\n.*?\n\n)',
+        _LOCATION_TRIGGER,
+    ),
+)
+
+
+
+# --- Bloco 7: Parser em Lote (BATCH_PARSER_PROMPT) ---
+
+# Usado quando NT_AI_MICRO_BATCH=true (ver `app/chains/micro_batcher.py`). As mesmas regras e
+# exemplos do `parser_template`, com um fechamento que traz VÁRIOS textos numerados. A resposta é
+# um único objeto JSON cujas chaves são os números dos textos, o que permite reaproveitar o reparo
+# local de JSON e recuperar cada item separadamente.
+batch_parser_closing_template = """
+Agora, analise CADA um dos textos numerados abaixo, de forma independente, aplicando todas as regras acima.
+Responda APENAS com um objeto JSON cujas chaves são os números dos textos (como strings) e cujos
+valores são o objeto JSON de filtros de cada texto, no mesmo formato dos exemplos.
+Exemplo de formato: {{"1": {{...}}, "2": {{...}}}}
+
+Textos:
+{enhanced_queries}
+
+JSON FINAL:
+"""
+batch_parser_template = parser_template.split("Agora, analise o seguinte texto.")[0] + batch_parser_closing_template
+BATCH_PARSER_PROMPT = PromptTemplate.from_template(batch_parser_template)
+
 """
 =================================================================================
 NOTA SOBRE CHAIN OF THOUGHT (CoT) - ATUALMENTE DESATIVADO
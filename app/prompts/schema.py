@@ -0,0 +1,64 @@
+# =================================================================================================
+# =================================================================================================
+#
+#                       ESQUEMA DO JSON DE FILTROS (MODELO PYDANTIC)
+#
+# -------------------------------------------------------------------------------------------------
+# Propósito do Arquivo:
+# -------------------------------------------------------------------------------------------------
+# Define UMA única vez o formato do JSON de filtros entregue à procedure: os 14 campos, na ordem
+# de `FILTER_FIELDS`, com os valores aceitos (enums) espelhados de `vocabulary.py`.
+#
+# O modelo é usado no modo de saída estruturada (NT_AI_STRUCTURED_OUTPUT=true, ver
+# `master_chain.py`): ele é enviado ao provedor (Gemini ou Groq) como esquema nativo de saída,
+# de modo que o LLM não consegue devolver um JSON malformado ou um valor fora da lista, e as
+# listas de valores não precisam mais ser repetidas no texto do prompt.
+#
+# `expand_filters` reconstrói o JSON completo a partir da saída esparsa (NT_AI_SPARSE_OUTPUT=true),
+# em que o LLM escreve apenas os campos preenchidos.
+#
+# =================================================================================================
+# =================================================================================================
+
+from typing import Literal, Optional
+
+from pydantic import BaseModel, Field
+
+from app.prompts.vocabulary import (
+    FILTER_FIELDS, OPERACOES, SITUACOES_NF, SORT_COLUMNS, SORT_DIRECTIONS, STATUS_ANALISE, TIPO_DATA, UF_SIGLAS,
+)
+
+
+class FilterSchema(BaseModel):
+    """
+    Filtros extraídos da pergunta do usuário. Campos não mencionados devem ser null.
+    """
+
+    NF: Optional[int] = Field(None, description="Número da nota fiscal. Se preenchido, todos os outros campos devem ser null.")
+    DE: Optional[str] = Field(None, description="Data de início do período, no formato AAAA-MM-DD.")
+    ATE: Optional[str] = Field(None, description="Data de fim do período, no formato AAAA-MM-DD.")
+    TipoData: Optional[Literal[tuple(TIPO_DATA.values())]] = Field(
+        None,
+        description="Código do evento de data: " + ", ".join(f"{code}={event}" for event, code in TIPO_DATA.items()) + ".",
+    )
+    Cliente: Optional[str] = Field(None, description="Nome do cliente/tomador.")
+    Transportadora: Optional[str] = Field(None, description="Nome da transportadora/parceiro.")
+    UFDestino: Optional[Literal[UF_SIGLAS]] = Field(None, description="Sigla do estado de destino.")
+    CidadeDestino: Optional[str] = Field(None, description="Nome da cidade de destino.")
+    Operacao: Optional[Literal[OPERACOES]] = Field(None, description="Código exato da operação (nunca dividido ou interpretado).")
+    SituacaoNF: Optional[Literal[SITUACOES_NF]] = Field(None, description="Estado logístico ATUAL da nota.")
+    StatusAnaliseData: Optional[Literal[STATUS_ANALISE]] = Field(None, description="Performance da entrega em relação ao prazo.")
+    CNPJRaizTransp: Optional[str] = Field(None, description="Raiz de 8 dígitos do CNPJ da transportadora.")
+    SortColumn: Optional[Literal[SORT_COLUMNS]] = Field(None, description="Coluna de ordenação.")
+    SortDirection: Optional[Literal[SORT_DIRECTIONS]] = Field(None, description="Direção da ordenação. Null se SortColumn for null.")
+
+
+def expand_filters(parsed) -> dict:
+    """
+    Reconstrói o JSON completo e estável (todos os campos de `FILTER_FIELDS`, na ordem, com
+    null nos ausentes) a partir da saída esparsa do Parser (apenas campos preenchidos).
+    Saídas que não são dicionários são devolvidas inalteradas.
+    """
+    if not isinstance(parsed, dict):
+        return parsed
+    return {field: parsed.get(field) for field in FILTER_FIELDS}
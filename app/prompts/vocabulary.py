@@ -0,0 +1,189 @@
+# =================================================================================================
+# =================================================================================================
+#
+#                       VOCABULÁRIO DE NEGÓCIO (TABELAS ESPELHADAS DOS PROMPTS)
+#
+# -------------------------------------------------------------------------------------------------
+# Propósito do Arquivo:
+# -------------------------------------------------------------------------------------------------
+# Os prompts em `filter_prompts.py` descrevem, em texto, os valores aceitos pela procedure e os
+# sinônimos que os usuários costumam usar. Este arquivo espelha essas mesmas listas como
+# estruturas Python, para que as etapas determinísticas do serviço (caches, validações, etc.)
+# usem exatamente o mesmo vocabulário que o LLM recebe.
+#
+# ⚠️ IMPORTANTE: Ao alterar uma lista de valores em `filter_prompts.py`, atualize-a aqui também.
+#
+# =================================================================================================
+# =================================================================================================
+
+import re
+import unicodedata
+
+# --- Bloco 1: Valores aceitos pela procedure (espelhados do JSON_PARSER_PROMPT) ---
+
+# Campos do JSON de filtros, na ordem em que aparecem nos exemplos do JSON_PARSER_PROMPT.
+FILTER_FIELDS = (
+    "NF", "DE", "ATE", "TipoData", "Cliente", "Transportadora", "UFDestino", "CidadeDestino",
+    "Operacao", "SituacaoNF", "StatusAnaliseData", "CNPJRaizTransp", "SortColumn", "SortDirection",
+)
+
+# Mapeamento de eventos de data para "TipoData".
+TIPO_DATA = {
+    "agenda": "1", "entregue": "2", "emitido": "3",
+    "previsto": "4", "previsão real": "5", "baixada": "6",
+}
+
+# Valores possíveis para "SituacaoNF" (estado logístico).
+SITUACOES_NF = ("ENTREGUE", "RETIDA", "TRÂNSITO")
+
+# Valores possíveis para "StatusAnaliseData" (performance em relação ao prazo).
+STATUS_ANALISE = ("ATRASO", "DIA SEGUINTE", "DO DIA", "ENTREGUE", "FUTURO", "PREVISTO PARA 2 DIAS")
+
+# Valores possíveis para "SortColumn" e "SortDirection".
+SORT_COLUMNS = ("data_entrega", "valor_nf", "data_emissao")
+SORT_DIRECTIONS = ("ASC", "DESC")
+
+# Valores possíveis para "UFDestino".
+UF_SIGLAS = (
+    "AC", "AL", "AM", "AP", "BA", "CE", "DF", "ES", "GO", "MA", "MG", "MS", "MT", "PA",
+    "PB", "PE", "PI", "PR", "RJ", "RN", "RO", "RR", "RS", "SC", "SE", "SP", "TO",
+)
+
+# Nomes dos estados (normalizados), para aceitar "São Paulo" no lugar de "SP".
+UF_NOMES = {
+    "acre": "AC", "alagoas": "AL", "amazonas": "AM", "amapa": "AP", "bahia": "BA", "ceara": "CE",
+    "distrito federal": "DF", "espirito santo": "ES", "goias": "GO", "maranhao": "MA", "minas gerais": "MG",
+    "mato grosso do sul": "MS", "mato grosso": "MT", "para": "PA", "paraiba": "PB", "pernambuco": "PE",
+    "piaui": "PI", "parana": "PR", "rio de janeiro": "RJ", "rio grande do norte": "RN", "rondonia": "RO",
+    "roraima": "RR", "rio grande do sul": "RS", "santa catarina": "SC", "sergipe": "SE", "sao paulo": "SP",
+    "tocantins": "TO",
+}
+
+# Valores possíveis para "Operacao" (códigos únicos, nunca divididos ou interpretados).
+OPERACOES = (
+    "InBound-IPO", "InBound-MAO", "InBound-UDI", "OutBound-BAR", "OutBound-BAR-MAT.PRIMA",
+    "OutBound-IPO", "OutBound-MAO", "OutBound-RIO", "OutBound-SPO", "OutBound-UDI",
+)
+
+
+# --- Bloco 2: Conceitos de negócio e seus sinônimos ---
+
+# Cada conceito agrupa as formas (sem acento e em minúsculas) com que o usuário pode
+# expressá-lo, incluindo os sinônimos mapeados pelo QUERY_ENHANCER_PROMPT.
+# Ex: "rodando", "viajando" e "a caminho" representam o mesmo conceito "transito".
+# Expressões mais longas vêm primeiro para terem prioridade na substituição.
+CONCEPTS = {
+    "nota": (r"nf-?e", r"notas? fisca(?:l|is)", r"notas?", r"nfs?"),
+    "transito": (r"em transito", r"transito", r"rodando", r"viajando", r"a caminho"),
+    "retida": (r"paradas? na fiscalizacao", r"retidas?", r"bloqueadas?"),
+    "atraso": (r"com atraso", r"atrasad[ao]s?", r"atraso"),
+    "dia_seguinte": (r"dia seguinte", r"amanha"),
+    "dois_dias": (r"(?:daqui a )?(?:2|dois) dias",),
+    "futuro": (r"data futura", r"futur[ao]s?"),
+    "hoje": (r"hoje",),
+    "ontem": (r"ontem",),
+    "ultima_semana": (r"ult(?:ima)? sem(?:ana)?", r"semana passada"),
+    "semana": (r"(?:esta|essa|nesta|nessa|dessa|desta) semana", r"semana"),
+    "mes": (r"(?:este|esse|neste|nesse|deste|desse) mes", r"mes"),
+    "semestre": (r"(?:este|esse|neste|nesse|deste|desse) semestre", r"semestre"),
+    "agenda": (r"agendad[ao]s?", r"agenda"),
+    "entregue": (r"entregues?", r"entregad[ao]s?"),
+    "emitido": (r"emitid[ao]s?", r"emissao"),
+    "previsao_real": (r"previsao real",),
+    "previsto": (r"previst[ao]s?", r"previsao"),
+    "baixada": (r"baixad[ao]s?",),
+    "valor": (r"valor(?:es)?", r"preco"),
+    "desc": (r"mais caro", r"maior", r"mais recentes?", r"decrescente", r"mais novas?"),
+    "asc": (r"mais barato", r"menor", r"mais antig[ao]s?", r"crescente"),
+    "negacao": (r"nao", r"exceto", r"menos", r"sem", r"fora"),
+    "cliente": (r"do cliente", r"cliente", r"cli"),
+    "transportadora": (r"da transportadora", r"transportadoras?", r"transp"),
+    "cidade": (r"cidade",),
+    "operacao": (r"operac(?:ao|oes)",),
+    "cnpj": (r"cnpj",),
+}
+
+
+def strip_accents(text: str) -> str:
+    """
+    Remove acentos e cedilhas. Ex: "Trânsito" -> "Transito", "Operação" -> "Operacao".
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def normalize_text(text: str) -> str:
+    """
+    Forma simplificada para comparação: sem acentos, minúsculas, sem pontuação solta
+    e com espaços colapsados. Hífens e pontos internos são mantidos (ex: "OutBound-BAR-MAT.PRIMA").
+    """
+    text = strip_accents(text or "").casefold()
+    text = re.sub(r"[^\w\s./-]|(?<!\w)[./-]|[./-](?!\w)", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+# Padrão único (compilado uma vez) que reconhece qualquer forma de qualquer conceito.
+# O grupo nomeado indica qual conceito foi encontrado.
+CONCEPT_PATTERN = re.compile(
+    "|".join(
+        rf"(?P<{name}>\b(?:{'|'.join(forms)})\b)"
+        for name, forms in CONCEPTS.items()
+    )
+)
+
+
+# --- Bloco 3: Regras de reescrita do Enhancer (espelhadas do QUERY_ENHANCER_PROMPT) ---
+
+# Cada regra é (categoria, valor canônico, padrão, substituição):
+# - categoria: conceito de negócio afetado. Regras da MESMA categoria com valores DIFERENTES
+#   na mesma pergunta caracterizam a "REGRA DE VÁLVULA DE ESCAPE (AMBIGUIDADE)" do prompt.
+#   `None` indica uma simples expansão de abreviação.
+# - substituição: texto final; `None` mantém o texto original (termos já canônicos, que
+#   existem aqui apenas para a detecção de ambiguidade).
+# Os padrões são aplicados sem diferenciar maiúsculas/minúsculas e aceitam variações de acento.
+# Cada padrão só casa com palavras inteiras: hífens contam como parte da palavra ("nf-e").
+
+# Preposições que, antes de "SP", mudam o sentido ("com SP", "de SP", "exceto SP"): nesses casos
+# a sigla não é reescrita para "para o estado de São Paulo".
+_SP_OTHER_PREPOSITIONS = ("com", "de", "do", "da", "em", "no", "na", "sem", "exceto", "fora")
+_SP_PATTERN = (
+    r"(?:para (?:o estado de )?|pra |"
+    + "".join(rf"(?<!\b{preposition} )" for preposition in _SP_OTHER_PREPOSITIONS)
+    + r")sp"
+)
+
+ENHANCER_REWRITES = (
+    # 1. Expansão de abreviações. "nf-e" vem antes de "nf" e é mantida como está.
+    (None, None, r"nf-?e", None),
+    (None, None, r"nfs", "notas fiscais"),
+    (None, None, r"nf", "nota fiscal"),
+    (None, None, _SP_PATTERN, "para o estado de São Paulo"),
+    (None, None, r"(?:do )?cli", "do cliente"),
+    (None, None, r"(?:da )?transp", "da transportadora"),
+    (None, None, r"[uú]lt(?:ima)?\.? sem(?:ana)?\.?", "última semana"),
+    # 2. Performance de prazo (StatusAnaliseData).
+    ("analise", "ATRASO", r"com atraso", "com status de análise ATRASO"),
+    ("analise", "DIA SEGUINTE", r"(?:com )?(?:entrega )?previst[ao]s? para (?:o )?dia seguinte", "com status de análise DIA SEGUINTE"),
+    ("analise", "DIA SEGUINTE", r"(?:com )?(?:entrega )?previst[ao]s? para amanh[aã]", "com status de análise DIA SEGUINTE"),
+    ("analise", "DO DIA", r"(?:com )?(?:entrega )?previst[ao]s? para hoje", "com status de análise DO DIA"),
+    ("analise", "PREVISTO PARA 2 DIAS", r"(?:com )?(?:previst[ao]s? )?para daqui a (?:2|dois) dias", "com status de análise PREVISTO PARA 2 DIAS"),
+    ("analise", "ENTREGUE", r"(?:com )?an[aá]lise (?:de performance )?entregues?", "com status de análise de performance ENTREGUE"),
+    # 3. Estado logístico (SituacaoNF).
+    ("situacao", "ENTREGUE", r"(?:com )?status (?:de )?entregues?", "com situação logística ENTREGUE"),
+    ("situacao", "TRÂNSITO", r"rodando|viajando|a caminho", "em trânsito"),
+    ("situacao", "TRÂNSITO", r"em tr[aâ]nsito", None),
+    ("situacao", "RETIDA", r"paradas? na fiscaliza[cç][aã]o|bloqueadas?", "retidas"),
+    ("situacao", "RETIDA", r"retidas?", None),
+    ("situacao", "ENTREGUE", r"com situa[cç][aã]o log[ií]stica entregue", None),
+    # 4. Ordenação.
+    ("ordenacao", "DESC", r"ordena(?:r|d[ao]s?)? (?:pel[oa]|por) (?:mais caro|maior valor|valor mais caro)", "ordenadas pelo maior valor"),
+    ("ordenacao", "ASC", r"ordena(?:r|d[ao]s?)? (?:pel[oa]|por) (?:mais barato|menor valor|valor mais barato)", "ordenadas pelo menor valor"),
+)
+
+# TERMOS DE EVENTO DE DATA PROTEGIDOS ("REGRA MESTRE DE PRESERVAÇÃO DE EVENTOS").
+# Nunca são reescritos; se aparecerem junto de uma reescrita de "previsto para ...", a
+# interpretação é considerada ambígua e a expressão "previsto para ..." também é preservada.
+PROTECTED_EVENT_TERMS = re.compile(
+    r"\b(?:agenda\w*|entreg(?:ue|ues|ad[ao]s?)|emitid[ao]s?|previs[aã]o real|baixad[ao]s?)\b",
+    re.IGNORECASE,
+)
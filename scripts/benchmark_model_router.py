@@ -0,0 +1,168 @@
+# =================================================================================================
+# =================================================================================================
+#
+#                       BENCHMARK DO ROTEADOR DE MODELOS (RÁPIDO x FORTE x ROTEADO)
+#
+# Visão Geral do Módulo:
+#
+# Mede, sobre o mesmo roteiro de testes, o que o roteador de modelos por complexidade ganha em
+# latência e o que perde em acurácia (ver `app/chains/model_router.py`).
+#
+# Arquitetura e Fluxo de Trabalho:
+#
+# 1. Execução Local (sem HTTP):
+#    - A cadeia é construída no próprio processo com o roteador ATIVO e com o cache de
+#      resultados, o cache do Enhancer e o caminho rápido DESATIVADOS, para que toda pergunta
+#      realmente passe pelo LLM.
+#
+# 2. Medição:
+#    - Para cada pergunta, executa três vezes: forçando a faixa forte (referência), forçando a
+#      faixa rápida e deixando o roteador decidir. A faixa forçada viaja nos metadados da
+#      execução e não é escalonada.
+#    - Latência: p50 e p95 por modo.
+#    - Acurácia (aproximada): taxa de concordância do JSON da faixa rápida e do roteado com o
+#      JSON da faixa forte.
+#    - Roteamento: proporção por faixa, escalonamentos e latência por faixa (`/metrics`).
+#
+# 3. Controle de Taxa:
+#    - Pausa de `DELAY_BETWEEN_QUERIES` segundos entre as perguntas para evitar o rate limit.
+#
+# Como Usar:
+# > python scripts/benchmark_model_router.py testes.txt [limite_de_perguntas]
+#
+# =================================================================================================
+# =================================================================================================
+
+import os
+import sys
+import time
+import json
+import statistics
+
+from colorama import Fore, Style, init
+from dotenv import load_dotenv
+
+# Inicializa o colorama. `autoreset=True` garante que cada print volte ao estilo padrão.
+init(autoreset=True)
+
+# Permite importar o pacote `app` executando o script a partir da raiz do projeto.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# --- Bloco de Configurações ---
+
+# Pausa entre perguntas (cada pergunta passa três vezes pela linha de montagem).
+DELAY_BETWEEN_QUERIES = 5  # segundos
+
+# Ativa o roteador e desativa tudo o que evitaria a chamada ao LLM. Deve ocorrer ANTES da
+# criação da cadeia.
+BENCHMARK_ENV = {
+    "NT_AI_MODEL_ROUTER": "true",
+    "NT_AI_RESULT_CACHE_ENABLED": "false",
+    "NT_AI_ENHANCER_CACHE_ENABLED": "false",
+    "NT_AI_FAST_PATH_ENABLED": "false",
+}
+
+# Modos medidos: o nome exibido e a faixa forçada (None = decisão do roteador).
+MODES = {"strong": "strong", "fast": "fast", "routed": None}
+
+
+def load_queries(test_file_path):
+    """
+    Lê o roteiro de testes, ignorando comentários, linhas vazias e comentários no fim da linha.
+    """
+    with open(test_file_path, 'r', encoding='utf-8') as f:
+        lines = [line.split('#')[0].strip() for line in f.readlines()]
+    return [line for line in lines if line and not line.startswith('=')]
+
+
+def run_once(chain, query, tier):
+    """
+    Executa a cadeia (na faixa forçada, se houver) e retorna (latência em segundos, JSON final
+    ou a mensagem de erro).
+    """
+    from app.chains.model_router import TIER_METADATA_KEY
+
+    config = {"metadata": {TIER_METADATA_KEY: tier}} if tier else None
+    start = time.perf_counter()
+    try:
+        result = chain.invoke({"query": query}, config=config)["parsed_json"]
+    except Exception as e:
+        result = f"ERRO: {e}"
+    return time.perf_counter() - start, result
+
+
+def percentile(values, fraction):
+    """
+    Percentil simples (vizinho mais próximo) de uma lista de latências.
+    """
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_benchmark(queries):
+    from app.chains.master_chain import create_master_chain
+    from app.core import metrics
+
+    chain = create_master_chain()
+    latencies = {mode: [] for mode in MODES}
+    agreements = {"fast": 0, "routed": 0}
+
+    print(f"{Style.BRIGHT}{Fore.MAGENTA}=============================================")
+    print(f"{Style.BRIGHT}{Fore.MAGENTA} BENCHMARK DO ROTEADOR DE MODELOS ({len(queries)} perguntas)")
+    print(f"{Style.BRIGHT}{Fore.MAGENTA}=============================================\n")
+
+    for i, query in enumerate(queries):
+        print(f"{Style.BRIGHT}{Fore.CYAN}--- PERGUNTA #{i+1}/{len(queries)}: {Fore.WHITE}{query}")
+        results = {}
+        for mode, tier in MODES.items():
+            duration, results[mode] = run_once(chain, query, tier)
+            latencies[mode].append(duration)
+            print(f"{Fore.BLUE}{mode:<8} {duration:6.2f}s {Fore.WHITE}{json.dumps(results[mode], ensure_ascii=False)}")
+
+        for mode in agreements:
+            if results[mode] == results["strong"]:
+                agreements[mode] += 1
+        print(f"{Fore.GREEN if results['routed'] == results['strong'] else Fore.YELLOW}"
+              f"Concordância com a faixa forte: fast {'SIM' if results['fast'] == results['strong'] else 'NÃO'}"
+              f" | routed {'SIM' if results['routed'] == results['strong'] else 'NÃO'}\n")
+
+        if i < len(queries) - 1:
+            time.sleep(DELAY_BETWEEN_QUERIES)
+
+    router = metrics.snapshot()["model_router"]
+
+    print(f"{Style.BRIGHT}{Fore.MAGENTA}=============================================")
+    print(f"{Style.BRIGHT}{Fore.MAGENTA}                 RESUMO")
+    print(f"{Style.BRIGHT}{Fore.MAGENTA}=============================================")
+    for mode, values in latencies.items():
+        print(f"{Fore.BLUE}{mode:<8} p50: {statistics.median(values):6.2f}s | p95: {percentile(values, 0.95):6.2f}s")
+    for mode, count in agreements.items():
+        print(f"{Fore.GREEN}Concordância {mode} x strong: {count}/{len(queries)} ({count / len(queries):.1%})")
+    print(f"{Fore.CYAN}Roteamento (nota >= {router['threshold']} -> strong):")
+    for tier, tier_stats in router["tiers"].items():
+        print(f"{Fore.CYAN}  {tier:<6} ({tier_stats['provider']}): {tier_stats['routing_ratio']:.1%} das perguntas"
+              f" | atendidas: {tier_stats['served']} | média: {tier_stats['avg_latency_seconds']:.2f}s"
+              f" | p95: {tier_stats['p95_latency_seconds']:.2f}s")
+    print(f"{Fore.CYAN}Escalonamentos: {router['escalations']} ({router['escalation_rate']:.1%} das rápidas)"
+          f" {router['escalations_by_reason']}\n")
+
+
+# Este bloco é o ponto de entrada do script quando executado diretamente pelo Python.
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(f"{Fore.RED}Erro: Por favor, especifique o nome do arquivo de testes.")
+        print(f"{Fore.YELLOW}Exemplo de uso: python scripts/benchmark_model_router.py testes.txt 20")
+        sys.exit(1)
+
+    load_dotenv()
+    os.environ.update(BENCHMARK_ENV)
+
+    queries_to_run = load_queries(f"tests_cases/{sys.argv[1]}")
+    if len(sys.argv) > 2:
+        queries_to_run = queries_to_run[:int(sys.argv[2])]
+
+    if not queries_to_run:
+        print(f"{Fore.YELLOW}Nenhuma query de teste encontrada.")
+    else:
+        run_benchmark(queries_to_run)
@@ -0,0 +1,155 @@
+# =================================================================================================
+# =================================================================================================
+#
+#                       BENCHMARK DOS MODOS DA LINHA DE MONTAGEM (DOIS ESTÁGIOS x CHAMADA ÚNICA)
+#
+# Visão Geral do Módulo:
+#
+# Compara, sobre o mesmo roteiro de testes, a linha de montagem padrão (Enhancer + Parser,
+# duas chamadas ao LLM) com o modo de chamada única (`FUSED_PROMPT`, uma chamada).
+#
+# Arquitetura e Fluxo de Trabalho:
+#
+# 1. Execução Local (sem HTTP):
+#    - As cadeias são construídas no próprio processo, uma vez por modo, com o cache de
+#      resultados, o cache do Enhancer e o caminho rápido DESATIVADOS, para que toda
+#      pergunta realmente passe pelo LLM.
+#
+# 2. Medição:
+#    - Para cada pergunta, executa os dois modos e registra a latência e o JSON final.
+#    - Latência: p50 e p95 por modo.
+#    - Acurácia (aproximada): taxa de concordância do JSON da chamada única com o JSON
+#      dos dois estágios, que é a referência de comportamento atual.
+#
+# 3. Controle de Taxa:
+#    - Pausa de `DELAY_BETWEEN_QUERIES` segundos entre as perguntas para evitar o rate limit.
+#
+# Como Usar:
+# > python scripts/benchmark_pipeline_modes.py testes.txt [limite_de_perguntas]
+#
+# =================================================================================================
+# =================================================================================================
+
+import os
+import sys
+import time
+import json
+import statistics
+
+from colorama import Fore, Style, init
+from dotenv import load_dotenv
+
+# Inicializa o colorama. `autoreset=True` garante que cada print volte ao estilo padrão.
+init(autoreset=True)
+
+# Permite importar o pacote `app` executando o script a partir da raiz do projeto.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# --- Bloco de Configurações ---
+
+# Pausa entre perguntas (cada pergunta custa 3 chamadas ao LLM somando os dois modos).
+DELAY_BETWEEN_QUERIES = 5  # segundos
+
+# Desativa tudo o que evitaria a chamada ao LLM. Deve ocorrer ANTES da criação das cadeias.
+BENCHMARK_ENV = {
+    "NT_AI_RESULT_CACHE_ENABLED": "false",
+    "NT_AI_ENHANCER_CACHE_ENABLED": "false",
+    "NT_AI_FAST_PATH_ENABLED": "false",
+}
+
+
+def load_queries(test_file_path):
+    """
+    Lê o roteiro de testes, ignorando comentários, linhas vazias e comentários no fim da linha.
+    """
+    with open(test_file_path, 'r', encoding='utf-8') as f:
+        lines = [line.split('#')[0].strip() for line in f.readlines()]
+    return [line for line in lines if line and not line.startswith('=')]
+
+
+def build_chains():
+    """
+    Constrói a cadeia principal de cada modo da linha de montagem.
+    """
+    from app.chains import master_chain as module
+
+    chains = {}
+    for mode in module.PIPELINE_MODES:
+        os.environ["NT_AI_PIPELINE_MODE"] = mode
+        chains[mode] = module.create_master_chain()
+    return chains
+
+
+def run_once(chain, query):
+    """
+    Executa a cadeia e retorna (latência em segundos, JSON final ou a mensagem de erro).
+    """
+    start = time.perf_counter()
+    try:
+        result = chain.invoke({"query": query})["parsed_json"]
+    except Exception as e:
+        result = f"ERRO: {e}"
+    return time.perf_counter() - start, result
+
+
+def percentile(values, fraction):
+    """
+    Percentil simples (vizinho mais próximo) de uma lista de latências.
+    """
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_benchmark(queries):
+    chains = build_chains()
+    latencies = {mode: [] for mode in chains}
+    agreements = 0
+
+    print(f"{Style.BRIGHT}{Fore.MAGENTA}=============================================")
+    print(f"{Style.BRIGHT}{Fore.MAGENTA} BENCHMARK DOS MODOS DA LINHA DE MONTAGEM ({len(queries)} perguntas)")
+    print(f"{Style.BRIGHT}{Fore.MAGENTA}=============================================\n")
+
+    for i, query in enumerate(queries):
+        print(f"{Style.BRIGHT}{Fore.CYAN}--- PERGUNTA #{i+1}/{len(queries)}: {Fore.WHITE}{query}")
+        results = {}
+        for mode, chain in chains.items():
+            duration, results[mode] = run_once(chain, query)
+            latencies[mode].append(duration)
+            print(f"{Fore.BLUE}{mode:<12} {duration:6.2f}s {Fore.WHITE}{json.dumps(results[mode], ensure_ascii=False)}")
+
+        if results["single_call"] == results["two_stage"]:
+            agreements += 1
+            print(f"{Fore.GREEN}Concordância: SIM\n")
+        else:
+            print(f"{Fore.YELLOW}Concordância: NÃO\n")
+
+        if i < len(queries) - 1:
+            time.sleep(DELAY_BETWEEN_QUERIES)
+
+    print(f"{Style.BRIGHT}{Fore.MAGENTA}=============================================")
+    print(f"{Style.BRIGHT}{Fore.MAGENTA}                 RESUMO")
+    print(f"{Style.BRIGHT}{Fore.MAGENTA}=============================================")
+    for mode, values in latencies.items():
+        print(f"{Fore.BLUE}{mode:<12} p50: {statistics.median(values):6.2f}s | p95: {percentile(values, 0.95):6.2f}s")
+    print(f"{Fore.GREEN}Concordância single_call x two_stage: {agreements}/{len(queries)} ({agreements / len(queries):.1%})\n")
+
+
+# Este bloco é o ponto de entrada do script quando executado diretamente pelo Python.
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(f"{Fore.RED}Erro: Por favor, especifique o nome do arquivo de testes.")
+        print(f"{Fore.YELLOW}Exemplo de uso: python scripts/benchmark_pipeline_modes.py testes.txt 20")
+        sys.exit(1)
+
+    load_dotenv()
+    os.environ.update(BENCHMARK_ENV)
+
+    queries_to_run = load_queries(f"tests_cases/{sys.argv[1]}")
+    if len(sys.argv) > 2:
+        queries_to_run = queries_to_run[:int(sys.argv[2])]
+
+    if not queries_to_run:
+        print(f"{Fore.YELLOW}Nenhuma query de teste encontrada.")
+    else:
+        run_benchmark(queries_to_run)
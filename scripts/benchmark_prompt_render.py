@@ -0,0 +1,90 @@
+# =================================================================================================
+# =================================================================================================
+#
+#                       MICROBENCHMARK DA RENDERIZAÇÃO DOS PROMPTS (TEMPLATE x SNAPSHOT)
+#
+# Visão Geral do Módulo:
+#
+# Mede o custo de CPU, por requisição, da preparação dos prompts, sem nenhuma chamada ao LLM:
+#
+# 1. Contexto de datas: cálculo completo (`_compute_dates`) x cópia do cálculo do dia
+#    (`_get_current_dates`).
+# 2. Prompts: `PromptTemplate.invoke` (renderização completa) x `PromptSnapshot.invoke_prompt`
+#    (prefixo do dia + pergunta), para o Enhancer, o Parser e o prompt fundido.
+#
+# Também confere que as duas renderizações produzem exatamente o mesmo texto.
+#
+# Como Usar:
+# > python scripts/benchmark_prompt_render.py [iterações]
+#
+# =================================================================================================
+# =================================================================================================
+
+import os
+import sys
+import timeit
+from datetime import datetime
+
+from colorama import Fore, Style, init
+
+# Inicializa o colorama. `autoreset=True` garante que cada print volte ao estilo padrão.
+init(autoreset=True)
+
+# Permite importar o pacote `app` executando o script a partir da raiz do projeto.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+SAMPLE_QUERY = "Me mostre as notas fiscais em trânsito ordenadas pelo maior valor"
+
+
+def report(label, before, after, iterations):
+    """
+    Imprime o custo médio por chamada (em microssegundos) antes e depois, e o ganho.
+    """
+    before_us, after_us = before / iterations * 1e6, after / iterations * 1e6
+    print(
+        f"{Fore.WHITE}{label:<28} {Fore.YELLOW}antes: {before_us:9.1f} µs {Fore.BLUE}depois: {after_us:9.1f} µs "
+        f"{Fore.GREEN}({before_us / after_us:5.1f}x)"
+    )
+
+
+def run_benchmark(iterations):
+    from app.chains.master_chain import _compute_dates, _get_current_dates
+    from app.chains.prompt_snapshot import PromptSnapshot
+    from app.prompts.filter_prompts import QUERY_ENHANCER_PROMPT, JSON_PARSER_PROMPT, FUSED_PROMPT
+
+    print(f"{Style.BRIGHT}{Fore.MAGENTA}=============================================")
+    print(f"{Style.BRIGHT}{Fore.MAGENTA} MICROBENCHMARK DE RENDERIZAÇÃO ({iterations} iterações)")
+    print(f"{Style.BRIGHT}{Fore.MAGENTA}=============================================\n")
+
+    report(
+        "Contexto de datas",
+        timeit.timeit(lambda: _compute_dates(datetime.now()), number=iterations),
+        timeit.timeit(lambda: _get_current_dates(None), number=iterations),
+        iterations,
+    )
+
+    dates = _get_current_dates(None)
+    cases = (
+        ("QUERY_ENHANCER_PROMPT", QUERY_ENHANCER_PROMPT, "query"),
+        ("JSON_PARSER_PROMPT", JSON_PARSER_PROMPT, "enhanced_query"),
+        ("FUSED_PROMPT", FUSED_PROMPT, "query"),
+    )
+    for label, prompt, query_variable in cases:
+        inputs = {**dates, query_variable: SAMPLE_QUERY}
+        inputs = {name: inputs[name] for name in prompt.input_variables}
+        snapshot = PromptSnapshot(prompt, query_variable)
+        if snapshot.invoke_prompt(inputs).to_string() != prompt.invoke(inputs).to_string():
+            print(f"{Fore.RED}ERRO: o snapshot de {label} difere da renderização do template.")
+            continue
+        report(
+            label,
+            timeit.timeit(lambda: prompt.invoke(inputs), number=iterations),
+            timeit.timeit(lambda: snapshot.invoke_prompt(inputs), number=iterations),
+            iterations,
+        )
+    print()
+
+
+# Este bloco é o ponto de entrada do script quando executado diretamente pelo Python.
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,135 @@
+# =================================================================================================
+# =================================================================================================
+#
+#                       BENCHMARK DA SAÍDA ESPARSA DO PARSER (JSON COMPLETO x ESPARSO)
+#
+# Visão Geral do Módulo:
+#
+# Mede o ganho do protocolo de saída esparsa (NT_AI_SPARSE_OUTPUT), em que o Parser escreve
+# apenas os campos preenchidos, sobre o roteiro de testes.
+#
+# Arquitetura e Fluxo de Trabalho:
+#
+# 1. Para cada pergunta, o Enhancer roda UMA vez (a entrada do Parser é a mesma nos dois formatos).
+# 2. O Parser roda com o `JSON_PARSER_PROMPT` (14 campos) e com o `SPARSE_PARSER_PROMPT`.
+# 3. Medição, por formato:
+#    - Tokens de saída (`usage_metadata` da resposta do LLM).
+#    - Latência do Parser: p50 e p95.
+#    - Concordância: o JSON esparso, reconstruído por `expand_filters`, deve ser idêntico ao completo.
+#
+# Como Usar:
+# > python scripts/benchmark_sparse_output.py testes.txt [limite_de_perguntas]
+#
+# =================================================================================================
+# =================================================================================================
+
+import os
+import sys
+import time
+import json
+import statistics
+
+from colorama import Fore, Style, init
+from dotenv import load_dotenv
+
+# Reaproveita a leitura do roteiro e o cálculo de percentis do benchmark dos modos da linha de montagem.
+from benchmark_pipeline_modes import DELAY_BETWEEN_QUERIES, load_queries, percentile
+
+# Inicializa o colorama. `autoreset=True` garante que cada print volte ao estilo padrão.
+init(autoreset=True)
+
+# Permite importar o pacote `app` executando o script a partir da raiz do projeto.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def run_parser(prompt, llm, inputs, repairer):
+    """
+    Executa o Parser com o prompt informado.
+    Retorna (latência em segundos, tokens de saída, JSON completo ou a mensagem de erro).
+    """
+    from app.prompts.schema import expand_filters
+
+    start = time.perf_counter()
+    try:
+        message = (prompt | llm).invoke(inputs)
+    except Exception as e:
+        return time.perf_counter() - start, 0, f"ERRO: {e}"
+    duration = time.perf_counter() - start
+    output_tokens = (message.usage_metadata or {}).get("output_tokens", 0)
+    parsed = repairer.repair(message.content if isinstance(message.content, str) else str(message.content))
+    return duration, output_tokens, expand_filters(parsed) if parsed is not None else "ERRO: JSON inválido"
+
+
+def run_benchmark(queries):
+    from langchain_core.output_parsers import StrOutputParser
+    from app.core.llm import get_llm_google
+    from app.chains.json_repair import JsonRepairer
+    from app.chains.master_chain import _get_current_dates
+    from app.prompts.filter_prompts import QUERY_ENHANCER_PROMPT, JSON_PARSER_PROMPT, SPARSE_PARSER_PROMPT
+
+    llm = get_llm_google()
+    enhancer = QUERY_ENHANCER_PROMPT | llm | StrOutputParser()
+    repairer = JsonRepairer()
+    prompts = {"completo": JSON_PARSER_PROMPT, "esparso": SPARSE_PARSER_PROMPT}
+    latencies = {name: [] for name in prompts}
+    tokens = {name: [] for name in prompts}
+    agreements = 0
+
+    print(f"{Style.BRIGHT}{Fore.MAGENTA}=============================================")
+    print(f"{Style.BRIGHT}{Fore.MAGENTA} BENCHMARK DA SAÍDA ESPARSA DO PARSER ({len(queries)} perguntas)")
+    print(f"{Style.BRIGHT}{Fore.MAGENTA}=============================================\n")
+
+    for i, query in enumerate(queries):
+        print(f"{Style.BRIGHT}{Fore.CYAN}--- PERGUNTA #{i+1}/{len(queries)}: {Fore.WHITE}{query}")
+        dates = _get_current_dates(None)
+        inputs = {**dates, "enhanced_query": enhancer.invoke({"query": query})}
+        results = {}
+        for name, prompt in prompts.items():
+            duration, output_tokens, results[name] = run_parser(prompt, llm, inputs, repairer)
+            latencies[name].append(duration)
+            tokens[name].append(output_tokens)
+            print(f"{Fore.BLUE}{name:<9} {duration:6.2f}s {output_tokens:4d} tokens {Fore.WHITE}{json.dumps(results[name], ensure_ascii=False)}")
+
+        if results["esparso"] == results["completo"]:
+            agreements += 1
+            print(f"{Fore.GREEN}Concordância: SIM\n")
+        else:
+            print(f"{Fore.YELLOW}Concordância: NÃO\n")
+
+        if i < len(queries) - 1:
+            time.sleep(DELAY_BETWEEN_QUERIES)
+
+    print(f"{Style.BRIGHT}{Fore.MAGENTA}=============================================")
+    print(f"{Style.BRIGHT}{Fore.MAGENTA}                 RESUMO")
+    print(f"{Style.BRIGHT}{Fore.MAGENTA}=============================================")
+    for name in prompts:
+        print(
+            f"{Fore.BLUE}{name:<9} tokens de saída (média): {statistics.mean(tokens[name]):6.1f} | "
+            f"p50: {statistics.median(latencies[name]):6.2f}s | p95: {percentile(latencies[name], 0.95):6.2f}s"
+        )
+    full_tokens, sparse_tokens = sum(tokens["completo"]), sum(tokens["esparso"])
+    if full_tokens:
+        print(f"{Fore.GREEN}Redução de tokens de saída: {1 - sparse_tokens / full_tokens:.1%}")
+    full_p50, sparse_p50 = statistics.median(latencies["completo"]), statistics.median(latencies["esparso"])
+    if full_p50:
+        print(f"{Fore.GREEN}Redução de latência (p50): {1 - sparse_p50 / full_p50:.1%}")
+    print(f"{Fore.GREEN}Concordância esparso x completo: {agreements}/{len(queries)} ({agreements / len(queries):.1%})\n")
+
+
+# Este bloco é o ponto de entrada do script quando executado diretamente pelo Python.
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(f"{Fore.RED}Erro: Por favor, especifique o nome do arquivo de testes.")
+        print(f"{Fore.YELLOW}Exemplo de uso: python scripts/benchmark_sparse_output.py testes.txt 20")
+        sys.exit(1)
+
+    load_dotenv()
+
+    queries_to_run = load_queries(f"tests_cases/{sys.argv[1]}")
+    if len(sys.argv) > 2:
+        queries_to_run = queries_to_run[:int(sys.argv[2])]
+
+    if not queries_to_run:
+        print(f"{Fore.YELLOW}Nenhuma query de teste encontrada.")
+    else:
+        run_benchmark(queries_to_run)
@@ -0,0 +1,73 @@
+# =================================================================================================
+# =================================================================================================
+#
+#                       RELATÓRIO DE TOKENS DO PROMPT DINÂMICO DO PARSER (OFFLINE)
+#
+# Visão Geral do Módulo:
+#
+# Compara, para cada pergunta do roteiro de testes, o tamanho do prompt do Parser montado pelo
+# `DynamicParserPrompt` (k exemplos + seções acionadas) com o do prompt estático.
+# Não faz nenhuma chamada ao LLM: a pergunta original é usada no lugar da pergunta normalizada
+# pelo Enhancer, o que é uma boa aproximação para a seleção de exemplos e seções.
+#
+# Como Usar:
+# > python scripts/report_prompt_tokens.py testes.txt [k]
+#
+# =================================================================================================
+# =================================================================================================
+
+import os
+import sys
+import statistics
+
+from colorama import Fore, Style, init
+
+from benchmark_pipeline_modes import load_queries
+
+# Inicializa o colorama. `autoreset=True` garante que cada print volte ao estilo padrão.
+init(autoreset=True)
+
+# Permite importar o pacote `app` executando o script a partir da raiz do projeto.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def run_report(queries, k):
+    from app.chains.dynamic_prompt import DynamicParserPrompt, estimate_tokens
+    from app.chains.master_chain import _get_current_dates
+    from app.prompts.filter_prompts import JSON_PARSER_PROMPT
+
+    dynamic_prompt = DynamicParserPrompt(JSON_PARSER_PROMPT.template, k=k)
+    dates = _get_current_dates(None)
+    static_tokens = estimate_tokens(JSON_PARSER_PROMPT.template.format(**dates, enhanced_query=""))
+    savings = []
+
+    print(f"{Style.BRIGHT}{Fore.MAGENTA}=============================================")
+    print(f"{Style.BRIGHT}{Fore.MAGENTA} TOKENS DO PROMPT DO PARSER (k={k}, {len(queries)} perguntas)")
+    print(f"{Style.BRIGHT}{Fore.MAGENTA}=============================================\n")
+
+    for query in queries:
+        prompt_tokens = estimate_tokens(dynamic_prompt.format({**dates, "enhanced_query": query}))
+        query_static_tokens = static_tokens + estimate_tokens(query)
+        savings.append(1 - prompt_tokens / query_static_tokens)
+        print(f"{Fore.WHITE}{query[:70]:<70} {Fore.BLUE}{prompt_tokens:5d} / {query_static_tokens:5d} tokens {Fore.GREEN}(-{savings[-1]:.1%})")
+
+    stats = dynamic_prompt.stats()
+    print(f"\n{Fore.BLUE}Média de tokens (dinâmico): {stats['avg_prompt_tokens']}")
+    print(f"{Fore.BLUE}Média de tokens (estático): {stats['avg_static_prompt_tokens']}")
+    print(f"{Fore.GREEN}Economia total: {stats['token_savings_rate']:.1%} | por requisição: mín {min(savings):.1%}, mediana {statistics.median(savings):.1%}, máx {max(savings):.1%}\n")
+
+
+# Este bloco é o ponto de entrada do script quando executado diretamente pelo Python.
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(f"{Fore.RED}Erro: Por favor, especifique o nome do arquivo de testes.")
+        print(f"{Fore.YELLOW}Exemplo de uso: python scripts/report_prompt_tokens.py testes.txt 4")
+        sys.exit(1)
+
+    queries_to_run = load_queries(f"tests_cases/{sys.argv[1]}")
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    if not queries_to_run:
+        print(f"{Fore.YELLOW}Nenhuma query de teste encontrada.")
+    else:
+        run_report(queries_to_run, k)
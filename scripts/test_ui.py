@@ -36,6 +36,11 @@
 #    - Exibe mensagens de erro amigáveis na interface caso o microsserviço esteja
 #      offline ou retorne um erro.
 #
+# 7. Modo Streaming:
+#    - Com o modo "Streaming" selecionado, a pergunta é enviada ao `/parse-query/stream`.
+#      A "Query Otimizada" aparece assim que o Enhancer termina, o JSON de filtros quando o
+#      Parser termina, junto com o tempo de cada etapa.
+#
 # Como Usar:
 #
 # 1. Certifique-se de que o microsserviço FastAPI esteja rodando (uvicorn app.main:app).
@@ -64,6 +69,40 @@ st.caption("Esta UI usa o endpoint de debug para mostrar os passos da IA.")
 
 # Define a URL do endpoint de debug do microsserviço FastAPI.
 MICROSERVICE_URL = "http://127.0.0.1:5001/debug-query"
+# URL do endpoint de streaming (NDJSON: um evento JSON por linha).
+STREAM_URL = "http://127.0.0.1:5001/parse-query/stream"
+
+
+def run_streaming(query):
+    """
+    Consome o `/parse-query/stream`, preenchendo cada seção da tela assim que o evento chega.
+    """
+    st.subheader("1. Query Otimizada (Enhanced Query):")
+    enhanced_placeholder = st.empty()
+    enhanced_placeholder.info("Aguardando o Enhancer...")
+    st.subheader("2. Filtros JSON Extraídos:")
+    json_placeholder = st.empty()
+    json_placeholder.info("Aguardando o Parser...")
+
+    with requests.post(STREAM_URL, json={"query": query}, stream=True) as response:
+        if response.status_code != 200:
+            error_details = response.json().get('detail', 'Erro desconhecido.')
+            st.error(f"Erro ao chamar o microsserviço (Status {response.status_code}): {error_details}")
+            return
+        for line in response.iter_lines():
+            if not line:
+                continue
+            event = json.loads(line)
+            if event["event"] == "enhanced_query":
+                enhanced_placeholder.info(f"{event['enhanced_query']}  ({event['elapsed_seconds']}s)")
+            elif event["event"] == "result":
+                json_placeholder.json(event["parsed_json"])
+                st.success(f"Análise concluída com sucesso! Caminho: '{event['path']}'.")
+                st.subheader("3. Tempo por Etapa (segundos):")
+                st.json(event["timings"])
+            elif event["event"] == "error":
+                json_placeholder.empty()
+                st.error(f"Erro ao chamar o microsserviço (Status {event['status']}): {event['detail']}")
 
 # --- Interface Interativa ---
 
@@ -73,12 +112,20 @@ query = st.text_input(
     placeholder="Ex: notas do cliente acme transp veloz ordene por valor"
 )
 
+# Escolhe o endpoint: o de debug (resposta única, com os passos) ou o de streaming.
+mode = st.radio("Modo:", ["Debug (/debug-query)", "Streaming (/parse-query/stream)"], horizontal=True)
+
 # Cria o botão que dispara a análise. O código dentro deste 'if' só é
 # executado quando o botão é clicado.
 if st.button("Analisar com IA"):
     # Validação de entrada: verifica se o usuário digitou algo.
     if not query:
         st.warning("Por favor, digite uma consulta antes de analisar.")
+    elif mode.startswith("Streaming"):
+        try:
+            run_streaming(query)
+        except requests.exceptions.RequestException as e:
+            st.error(f"Não foi possível conectar ao microsserviço. Verifique se ele está rodando. Detalhes: {e}")
     else:
         # Exibe uma mensagem de "carregando" enquanto a requisição está em andamento.
         # O bloco `with` garante que a mensagem desapareça ao final.
@@ -0,0 +1,5 @@
+# Permite importar o pacote `app` executando o pytest a partir da raiz do projeto.
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from app.core import circuit_breaker
+from app.core.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", fake)
+    return fake
+
+
+def _breaker():
+    return CircuitBreaker("groq", failure_threshold=2, open_seconds=30, failure_errors=(TimeoutError,))
+
+
+def _fail(error):
+    def _call():
+        raise error
+    return _call
+
+
+def test_provider_errors_open_the_circuit(clock):
+    breaker = _breaker()
+    for _ in range(2):
+        with pytest.raises(TimeoutError):
+            breaker.call(_fail(TimeoutError()))
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "ok")
+    clock.now += 30
+    assert breaker.state == HALF_OPEN
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == CLOSED
+
+
+def test_local_errors_are_not_provider_failures(clock):
+    breaker = _breaker()
+    for _ in range(5):
+        with pytest.raises(ValueError):
+            breaker.call(_fail(ValueError("schema")))
+    assert breaker.state == CLOSED
+    assert breaker.stats()["failures"] == 0
+
+
+def test_local_error_releases_the_half_open_probe(clock):
+    breaker = _breaker()
+    for _ in range(2):
+        with pytest.raises(TimeoutError):
+            breaker.call(_fail(TimeoutError()))
+    clock.now += 30
+
+    async def _local_error():
+        raise KeyError("bug")
+
+    with pytest.raises(KeyError):
+        asyncio.run(breaker.acall(_local_error))
+    assert breaker.state == HALF_OPEN
+    assert breaker.call(lambda: "ok") == "ok"
@@ -0,0 +1,60 @@
+from datetime import datetime
+
+import pytest
+
+from app.chains.date_resolver import DateResolver
+from app.chains.master_chain import _compute_dates
+
+DATES = _compute_dates(datetime(2025, 9, 17))
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("notas de hoje", ("2025-09-17", "2025-09-17")),
+    ("agenda para hoje", ("2025-09-17", "2025-09-17")),
+    ("notas da semana passada", ("2025-09-08", "2025-09-14")),
+    ("notas de 01/09/2025 até 10/09/2025", ("2025-09-01", "2025-09-10")),
+    ("entregues entre 1 e 15 de setembro de 2024", ("2024-09-01", "2024-09-15")),
+    ("entregues em setembro", ("2025-09-01", "2025-09-30")),
+    ("notas emitidas em 2024", ("2024-01-01", "2024-12-31")),
+    ("notas do ano de 2023", ("2023-01-01", "2023-12-31")),
+    ("notas desde março", ("2025-03-01", "2025-03-31")),
+    ("maio de 2024", ("2024-05-01", "2024-05-31")),
+])
+def test_resolve(query, expected):
+    assert DateResolver().resolve(query, DATES) == expected
+
+
+@pytest.mark.parametrize("query", [
+    "notas com valor acima de 2000",
+    "NF de 1234",
+    "nota de 2024",
+    "notas com número de 2023",
+    "notas emitidas em 1234",
+    "notas entregues em 15 de setembro de 1234",
+    "notas previstas para hoje",
+    "notas com entrega prevista para amanhã",
+    "notas de hoje e de ontem",
+    "notas de 31/02",
+    "notas do cliente Marco Aurelio",
+    "notas da transportadora Maio Transportes",
+    "entregues setembro",
+])
+def test_unresolved(query):
+    assert DateResolver().resolve(query, DATES) is None
+
+
+def test_apply_keeps_llm_dates_without_period():
+    parsed_json = {"NF": None, "DE": "2000-01-01", "ATE": "2000-12-31"}
+    assert DateResolver().apply("notas com valor acima de 2000", DATES, parsed_json) == parsed_json
+
+
+def test_apply_overrides_llm_dates():
+    parsed_json = {"NF": None, "DE": "2025-09-16", "ATE": "2025-09-16"}
+    assert DateResolver().apply("agenda para hoje", DATES, parsed_json)["DE"] == "2025-09-17"
+
+
+def test_apply_ignores_months_inside_names():
+    parsed_json = {"NF": None, "Transportadora": "Maio Transportes", "DE": None, "ATE": None}
+    assert DateResolver().apply("notas de Maio Transportes", DATES, parsed_json) == parsed_json
+    parsed_json = {"NF": None, "Cliente": "Marco Aurelio", "DE": "2025-09-01", "ATE": "2025-09-30"}
+    assert DateResolver().apply("notas de Marco Aurelio em setembro", DATES, parsed_json) == parsed_json
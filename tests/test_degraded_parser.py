@@ -0,0 +1,32 @@
+from datetime import datetime
+
+from app.chains.date_resolver import DateResolver
+from app.chains.degraded_parser import DegradedParser
+from app.chains.master_chain import _compute_dates
+
+DATES = _compute_dates(datetime(2025, 9, 17))
+
+
+def _parse(query):
+    result = DegradedParser(DateResolver()).parse(query, DATES)
+    return {field: value for field, value in result.items() if value is not None}
+
+
+def test_nf_overrides_other_fields():
+    assert _parse("nota 123 entregue hoje para SP") == {"NF": 123}
+
+
+def test_period_and_event():
+    assert _parse("notas entregues hoje para SP") == {
+        "DE": "2025-09-17", "ATE": "2025-09-17", "TipoData": "2", "UFDestino": "SP",
+    }
+
+
+def test_negation_drops_status():
+    assert "SituacaoNF" not in _parse("notas que não estão em trânsito")
+
+
+def test_unknown_query_is_all_null():
+    parser = DegradedParser(DateResolver())
+    assert not any(parser.parse("bom dia", DATES).values())
+    assert parser.stats() == {"served": 0, "empty": 1}
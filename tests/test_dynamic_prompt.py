@@ -0,0 +1,30 @@
+import pytest
+
+from app.chains.dynamic_prompt import DynamicParserPrompt
+from app.prompts.filter_prompts import parser_template
+
+LOCATION_RULES = "--- Regras de Localização ---"
+UF_RULES = 'Mapeamento para "UFDestino" (estado):'
+
+
+@pytest.mark.parametrize("query", [
+    "Me mostre as notas fiscais previstas para amanhã",
+    "Notas fiscais para o cliente Atacadão",
+    "Notas fiscais que se atrasaram",
+])
+def test_location_rules_are_pruned_without_location(query):
+    template = DynamicParserPrompt(parser_template).template_for(query)
+    assert LOCATION_RULES not in template
+    assert UF_RULES not in template
+
+
+@pytest.mark.parametrize("query", [
+    "Notas fiscais para o estado de São Paulo",
+    "Notas fiscais para SP",
+    "Notas fiscais entregues em Minas Gerais",
+    "Notas fiscais para a cidade de Manaus",
+])
+def test_location_rules_are_kept_for_locations(query):
+    template = DynamicParserPrompt(parser_template).template_for(query)
+    assert LOCATION_RULES in template
+    assert UF_RULES in template
@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.runnables import RunnableLambda
+
+from app.chains import master_chain
+from app.chains.master_chain import _compute_dates, _with_enhancer_cache, get_result_cache
+
+TODAY = _compute_dates(datetime.now())
+TOMORROW = _compute_dates(datetime.now() + timedelta(days=1))
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    monkeypatch.setattr(master_chain, "_enhancer_cache", None)
+    monkeypatch.setattr(master_chain, "_result_cache", None)
+    return []
+
+
+def _enhancer(calls):
+    def _enhance(inputs):
+        calls.append(inputs["query"])
+        return inputs["query"].capitalize()
+    return _with_enhancer_cache(RunnableLambda(_enhance))
+
+
+def test_parser_cache_miss_on_a_new_day_skips_the_enhancer(calls):
+    query = f"notas entregues em {TODAY['today']}"
+    enhancer, result_cache = _enhancer(calls), get_result_cache()
+    assert result_cache.get(query, TODAY) is None
+    enhancer.invoke({"query": query, "dates": TODAY})
+    result_cache.set(query, TODAY, {"DE": TODAY["today"], "ATE": TODAY["today"]})
+
+    assert result_cache.get(query, TOMORROW) is None
+    assert enhancer.invoke({"query": query, "dates": TOMORROW}) == query.capitalize()
+    assert calls == [query]
+
+
+def test_enhancer_prompt_change_invalidates_the_cache(calls, monkeypatch):
+    enhancer = _enhancer(calls)
+    enhancer.invoke({"query": "notas rodando"})
+    enhancer.invoke({"query": "notas rodando"})
+    monkeypatch.setattr(master_chain, "ENHANCER_FINGERPRINT", "outro prompt")
+    enhancer.invoke({"query": "notas rodando"})
+    assert calls == ["notas rodando", "notas rodando"]
+
+
+def test_tiers_report_separate_hit_rates(calls):
+    from app.main import app
+
+    enhancer, result_cache = _enhancer(calls), get_result_cache()
+    for _ in range(4):
+        assert result_cache.get("notas rodando", TODAY) is None
+        enhancer.invoke({"query": "notas rodando"})
+
+    stats = TestClient(app).get("/metrics").json()
+    assert stats["result_cache"]["hit_rate"] == 0.0
+    assert stats["enhancer_cache"]["hit_rate"] == 0.75
@@ -0,0 +1,34 @@
+import pytest
+
+from app.chains.fast_path import FastPathParser
+
+
+def _filled(result):
+    return {field: value for field, value in result.items() if value is not None}
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("nota 123456", {"NF": 123456}),
+    ("NF 998877 para SP", {"NF": 998877}),
+    ("notas para SP", {"UFDestino": "SP"}),
+    ("transportadora CNPJ 12.345.678/0001-90", {"CNPJRaizTransp": "12345678"}),
+    ("notas em trânsito", {"SituacaoNF": "TRÂNSITO"}),
+    ("notas da OutBound-SPO", {"Operacao": "OutBound-SPO"}),
+])
+def test_parse(query, expected):
+    assert _filled(FastPathParser().parse(query)) == expected
+
+
+@pytest.mark.parametrize("query", [
+    "notas rodando e retidas",
+    "notas que não estão em trânsito",
+    "notas entregues ontem para SP",
+    "notas de SP",
+])
+def test_uncertain_queries_fall_through(query):
+    assert FastPathParser().parse(query) is None
+
+
+def test_extract_ignores_unknown_words_and_conflicts():
+    assert FastPathParser.extract("notas entregues ontem para SP") == {"UFDestino": "SP"}
+    assert "SituacaoNF" not in FastPathParser.extract("notas rodando e retidas")
@@ -0,0 +1,13 @@
+from app.prompts.filter_prompts import fused_template, sparse_parser_template
+
+
+def test_fused_prompt_has_no_conflicting_format_rules():
+    assert "Responda APENAS com a frase reescrita." not in fused_template
+    assert "Sua resposta deve ser APENAS o objeto JSON" not in fused_template
+    assert "PERGUNTA NORMALIZADA: <a pergunta reescrita na ETAPA 1>" in fused_template
+
+
+def test_sparse_prompt_never_asks_for_null_fields():
+    assert "Se a pergunta for vaga, responda {{}}." in sparse_parser_template
+    assert "devem ser null" not in sparse_parser_template
+    assert "seu valor no JSON deve ser null" not in sparse_parser_template
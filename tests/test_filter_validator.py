@@ -0,0 +1,72 @@
+import pytest
+
+from app.chains.filter_validator import FilterValidator, coerce_date, coerce_nf, rejected_fields, snap_value
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("para SP", "SP"),
+    ("pra SP", "SP"),
+    ("de SP", "SP"),
+    ("São Paulo", "SP"),
+    ("Pará", "PA"),
+    ("mato grosso do sul", "MS"),
+    ("Rio de Janeiro", "RJ"),
+])
+def test_snap_uf(value, expected):
+    assert snap_value("UFDestino", value) == expected
+
+
+@pytest.mark.parametrize("value", ["NÃO ENTREGUE", "nao entregue", "sem entrega", "exceto ENTREGUE"])
+def test_snap_negation_is_rejected(value):
+    assert snap_value("SituacaoNF", value) is None
+
+
+def test_snap_contained_value():
+    assert snap_value("SituacaoNF", "EM TRÂNSITO") == "TRÂNSITO"
+
+
+def test_snap_edit_distance():
+    assert snap_value("StatusAnaliseData", "ATRASADO") == "ATRASO"
+    assert snap_value("Operacao", "Outbound-SPO") == "OutBound-SPO"
+
+
+def test_snap_tie_is_rejected():
+    assert snap_value("Operacao", "OutBound") is None
+
+
+def test_snap_multiple_contained_values_is_rejected():
+    assert snap_value("SituacaoNF", "ENTREGUE RETIDA") is None
+
+
+def test_coerce_date():
+    assert coerce_date("01/09/2025") == "2025-09-01"
+    assert coerce_date("2025-09-01T00:00:00") == "2025-09-01"
+    assert coerce_date("2025-02-30") is None
+
+
+def test_rejected_fields():
+    assert rejected_fields({"SituacaoNF": "NÃO ENTREGUE", "UFDestino": "para SP", "DE": "2025-13-01"}) == ["DE", "SituacaoNF"]
+
+
+def test_validate_nf_only():
+    result = FilterValidator().validate({"NF": 123, "UFDestino": "SP", "SituacaoNF": "TRÂNSITO"})
+    assert result["NF"] == 123
+    assert result["UFDestino"] is None and result["SituacaoNF"] is None
+
+
+@pytest.mark.parametrize("value, expected", [(123, 123), ("123", 123), ("123.456", 123456), (55.0, 55), ("abc", None), (True, None)])
+def test_coerce_nf(value, expected):
+    assert coerce_nf(value) == expected
+
+
+def test_validate_coerces_nf_to_int():
+    validator = FilterValidator()
+    result = validator.validate({"NF": "123", "UFDestino": "SP"})
+    assert result["NF"] == 123 and result["UFDestino"] is None
+    assert validator.stats()["corrections"]["nf_type:NF"] == 1
+
+
+def test_validate_rejects_non_numeric_nf():
+    result = FilterValidator().validate({"NF": "da semana", "UFDestino": "SP"})
+    assert result["NF"] is None and result["UFDestino"] == "SP"
+    assert rejected_fields({"NF": "da semana"}) == ["NF"]
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from app.chains.hedging import MIN_SAMPLES, HedgedStage
+
+
+def _valid(result):
+    return result != "invalido"
+
+
+def _stage(initial_delay=0.01):
+    return HedgedStage("parser", "google", "groq", initial_delay=initial_delay)
+
+
+def _stub(result=None, error=None, hold=None, calls=None, cancelled=None):
+    """
+    Runnable assíncrono: registra a chamada, espera `hold` (se houver) e devolve `result` ou levanta `error`.
+    """
+    async def _run(inputs):
+        if calls is not None:
+            calls.append(inputs)
+        try:
+            if hold is not None:
+                await hold.wait()
+        except asyncio.CancelledError:
+            if cancelled is not None:
+                cancelled.append(True)
+            raise
+        if error is not None:
+            raise error
+        return result
+    return RunnableLambda(lambda inputs: result, afunc=_run)
+
+
+def _race(stage, primary, secondary):
+    return asyncio.run(stage.ainvoke(primary, secondary, "x", {}, _valid))
+
+
+def test_fast_primary_wins_without_hedging():
+    stage, calls = _stage(initial_delay=5.0), []
+    assert _race(stage, _stub("google"), _stub("groq", calls=calls)) == "google"
+    assert calls == []
+    assert stage.stats()["hedged"] == 0 and stage.stats()["wins"] == {"google": 1}
+
+
+def test_slow_primary_is_hedged_and_the_loser_is_cancelled():
+    stage, cancelled = _stage(), []
+
+    async def main():
+        return await stage.ainvoke(_stub("google", hold=asyncio.Event(), cancelled=cancelled), _stub("groq"), "x", {}, _valid)
+
+    assert asyncio.run(main()) == "groq"
+    assert cancelled == [True]
+    assert stage.stats()["hedge_rate"] == 1.0
+
+
+def test_first_valid_wins_over_an_invalid_primary():
+    stage = _stage()
+    assert _race(stage, _stub("invalido"), _stub("groq")) == "groq"
+    assert stage.stats()["wins"] == {"groq": 1}
+
+
+def test_without_a_valid_answer_the_primary_answer_is_kept():
+    stage = _stage()
+    assert _race(stage, _stub("invalido"), _stub(error=TimeoutError("groq"))) == "invalido"
+    assert stage.stats()["failures"] == 1
+
+
+def test_when_both_fail_the_primary_error_is_raised():
+    with pytest.raises(ConnectionError):
+        _race(_stage(), _stub(error=ConnectionError("google")), _stub(error=TimeoutError("groq")))
+
+
+def test_sync_invoke_hedges_an_invalid_primary():
+    stage = _stage()
+    assert stage.invoke(RunnableLambda(lambda x: "invalido"), RunnableLambda(lambda x: "groq"), "x", {}, _valid) == "groq"
+
+
+def test_delay_follows_the_primary_latency_percentile():
+    stage = HedgedStage("parser", "google", "groq", percentile=0.9, initial_delay=1.0)
+    assert stage.delay() == 1.0
+    for i in range(MIN_SAMPLES):
+        stage._record(False, "google", primary_latency=0.1 * (i + 1))
+    assert stage.delay() == pytest.approx(1.9)
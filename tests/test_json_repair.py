@@ -0,0 +1,38 @@
+import pytest
+
+from app.chains.json_repair import repair_json
+
+EXPECTED = {"NF": None, "UFDestino": "SP"}
+
+
+def test_valid_json_needs_no_fix():
+    assert repair_json('{"NF": null, "UFDestino": "SP"}') == (EXPECTED, None)
+
+
+@pytest.mark.parametrize("text, fix", [
+    ('```json\n{"NF": null, "UFDestino": "SP"}\n```', "code_fence"),
+    ('Pensamento: ...\nJSON FINAL: {"NF": null, "UFDestino": "SP"}', "final_marker"),
+    ('Aqui está: {"NF": null, "UFDestino": "SP"} Espero ter ajudado.', "extra_text"),
+    ('{"NF": null, "UFDestino": "SP",}', "trailing_comma"),
+    ("{'NF': None, 'UFDestino': 'SP'}", "single_quotes"),
+    ('{"NF": None, "UFDestino": "SP"}', "python_literals"),
+])
+def test_local_fixes(text, fix):
+    parsed, applied = repair_json(text)
+    assert parsed == EXPECTED
+    assert fix in applied
+
+
+@pytest.mark.parametrize("text", ["", "sem json aqui", '["NF"]', '{"NF": '])
+def test_unrepairable_output(text):
+    assert repair_json(text)[0] is None
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"Cliente": "None Ltda", "NF": None}', {"Cliente": "None Ltda", "NF": None}),
+    ("{'Transportadora': 'True Log', 'Cliente': 'False & Cia', 'NF': None}",
+     {"Transportadora": "True Log", "Cliente": "False & Cia", "NF": None}),
+    ('{"Cliente": "Loja ,}", "NF": null,}', {"Cliente": "Loja ,}", "NF": None}),
+])
+def test_fixes_never_touch_string_values(text, expected):
+    assert repair_json(text)[0] == expected
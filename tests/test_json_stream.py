@@ -0,0 +1,55 @@
+import asyncio
+
+from langchain_core.messages import AIMessageChunk
+
+from app.chains.json_stream import JsonObjectScanner, JsonStreamReader
+
+
+def _chunks(*texts):
+    for text in texts:
+        yield AIMessageChunk(content=text)
+
+
+def test_scanner_ignores_braces_inside_strings_and_prefix():
+    scanner = JsonObjectScanner()
+    scanner.feed('JSON FINAL: {"Cliente": "a}b", ')
+    assert not scanner.closed
+    assert scanner.partial_fields() == {"Cliente": "a}b"}
+    scanner.feed('"NF": null} sobra')
+    assert scanner.complete_object() == {"Cliente": "a}b", "NF": None}
+
+
+def test_reader_stops_after_the_object_closes():
+    consumed = []
+
+    def chunks():
+        for text in ('{"NF": ', 'null}', " explicação", " longa"):
+            consumed.append(text)
+            yield AIMessageChunk(content=text)
+
+    reader = JsonStreamReader()
+    assert reader.read(chunks()).content == '{"NF": null}'
+    assert consumed == ['{"NF": ', "null}"]
+    assert reader.stats()["early_stops"] == 1
+
+
+def test_reader_reads_to_the_end_when_the_object_is_invalid():
+    reader = JsonStreamReader()
+    message = reader.read(_chunks('{"NF": nul}', " resto"))
+    assert message.content == '{"NF": nul} resto'
+    assert reader.stats()["early_stops"] == 0
+
+
+def test_async_reader_publishes_partial_fields():
+    published = []
+
+    async def chunks():
+        for text in ('{"NF": null, ', '"UFDestino": "SP", ', '"Cliente": null}', " fim"):
+            yield AIMessageChunk(content=text)
+
+    async def on_fields(fields):
+        published.append(fields)
+
+    message = asyncio.run(JsonStreamReader().aread(chunks(), on_fields))
+    assert message.content == '{"NF": null, "UFDestino": "SP", "Cliente": null}'
+    assert published == [{"NF": None}, {"NF": None, "UFDestino": "SP"}]
@@ -0,0 +1,59 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.chains.master_chain import PATH_DEGRADED, PATH_LLM
+from app.main import VAGUE_QUERY_DETAIL, empty_result_error
+
+
+class _StubChain:
+    """
+    Cadeia que emite apenas os eventos informados no `astream_events`.
+    """
+
+    def __init__(self, events):
+        self.events = events
+
+    async def astream_events(self, inputs, version):
+        for event in self.events:
+            yield event
+
+
+def _final(output):
+    return {"event": "on_chain_end", "name": "master", "run_id": "root", "parent_ids": [], "data": {"output": output}}
+
+
+def _stream(monkeypatch, events):
+    monkeypatch.setattr(main, "master_chain", _StubChain(events))
+    response = TestClient(main.app).post("/parse-query/stream", json={"query": "notas para SP"})
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_empty_degraded_result_is_unavailable():
+    assert empty_result_error(PATH_DEGRADED)[0] == 503
+
+
+def test_empty_llm_result_is_a_vague_query():
+    assert empty_result_error(PATH_LLM) == (400, VAGUE_QUERY_DETAIL)
+
+
+def test_stream_sends_the_result(monkeypatch):
+    lines = _stream(monkeypatch, [_final({"parsed_json": {"UFDestino": "SP"}, "path": PATH_LLM})])
+    assert [line["event"] for line in lines] == ["result"]
+    assert lines[0]["parsed_json"] == {"UFDestino": "SP"}
+    assert lines[0]["degraded"] is False
+
+
+@pytest.mark.parametrize("path, status", [(PATH_LLM, 400), (PATH_DEGRADED, 503)])
+def test_stream_reports_empty_results(monkeypatch, path, status):
+    lines = _stream(monkeypatch, [_final({"parsed_json": {"UFDestino": None}, "path": path})])
+    assert [line["event"] for line in lines] == ["error"]
+    assert lines[0]["status"] == status
+
+
+def test_stream_without_final_event_reports_an_error(monkeypatch):
+    lines = _stream(monkeypatch, [])
+    assert [line["event"] for line in lines] == ["error"]
+    assert lines[0]["status"] == 500
@@ -0,0 +1,40 @@
+import asyncio
+
+from app.chains.micro_batcher import MicroBatcher
+
+
+def _submit_all(batcher, queries):
+    async def main():
+        return await asyncio.gather(*(batcher.asubmit("group", {"q": q}, None) for q in queries))
+    return asyncio.run(main())
+
+
+async def _single(inputs, config):
+    return {"single": inputs["q"]}
+
+
+def test_batch_results_are_dispatched_in_order():
+    async def run_batch(items, configs):
+        return [{"batch": item["q"]} for item in items]
+
+    batcher = MicroBatcher("test", run_batch, _single, window_seconds=0.01)
+    assert _submit_all(batcher, ["a", "b", "c"]) == [{"batch": "a"}, {"batch": "b"}, {"batch": "c"}]
+    assert batcher.stats()["llm_calls_saved"] == 2
+
+
+def test_malformed_items_are_retried_individually():
+    async def run_batch(items, configs):
+        return [{"batch": "a"}, None]
+
+    batcher = MicroBatcher("test", run_batch, _single, window_seconds=0.01)
+    assert _submit_all(batcher, ["a", "b"]) == [{"batch": "a"}, {"single": "b"}]
+    assert batcher.stats()["fallback_items"] == 1
+
+
+def test_batch_failure_falls_back_to_individual_calls():
+    async def run_batch(items, configs):
+        raise TimeoutError("batch")
+
+    batcher = MicroBatcher("test", run_batch, _single, window_seconds=0.01)
+    assert _submit_all(batcher, ["a", "b"]) == [{"single": "a"}, {"single": "b"}]
+    assert batcher.stats()["fallback_items"] == 2
@@ -0,0 +1,32 @@
+import pytest
+
+from app.chains.model_router import TIER_FAST, TIER_STRONG, ComplexityRouter, score_complexity
+
+
+@pytest.mark.parametrize("query", ["notas de SP", "notas de sp", "notas para SP", "notas do estado de MG"])
+def test_uf_counts_as_entity(query):
+    assert score_complexity(query)[1]["entities"] == 1
+
+
+def test_common_words_are_not_ufs():
+    assert score_complexity("em se tratando de notas")[1]["entities"] == 0
+
+
+@pytest.mark.parametrize("query, dates", [
+    ("notas do cliente Marco Aurelio", 0),
+    ("notas da transportadora Maio Transportes", 0),
+    ("notas entregues em maio", 1),
+])
+def test_months_count_as_dates_only_when_used_as_dates(query, dates):
+    assert score_complexity(query)[1]["dates"] == dates
+
+
+def test_negation_and_ambiguity_weigh_more():
+    assert score_complexity("notas exceto as de SP")[0] == 3
+    assert score_complexity("notas rodando e retidas")[1]["ambiguous"]
+
+
+def test_route_by_threshold():
+    router = ComplexityRouter({TIER_FAST: "groq", TIER_STRONG: "google"}, threshold=3)
+    assert router.route("nota 123")[0] == TIER_FAST
+    assert router.route("notas de SP emitidas em maio exceto retidas")[0] == TIER_STRONG
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.runnables import RunnableLambda
+
+from app import main
+from app.chains.master_chain import PATH_DEGRADED, PATH_LLM
+from app.core.rate_limiter import PRIORITY_METADATA_KEY
+
+RESULTS = {
+    "notas para SP": ({"UFDestino": "SP"}, PATH_LLM),
+    "bom dia": ({"UFDestino": None}, PATH_LLM),
+    "notas retidas": ({"SituacaoNF": None}, PATH_DEGRADED),
+    "notas rodando": ({"SituacaoNF": "TRÂNSITO"}, PATH_DEGRADED),
+}
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    calls, running = [], {"now": 0, "max": 0}
+
+    async def run(inputs, config):
+        calls.append((inputs["query"], config["metadata"].get(PRIORITY_METADATA_KEY)))
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        await asyncio.sleep(0.01)
+        running["now"] -= 1
+        if inputs["query"] == "erro":
+            raise KeyError("bug")
+        parsed_json, path = RESULTS[inputs["query"]]
+        return {"parsed_json": parsed_json, "path": path}
+
+    monkeypatch.setattr(main, "master_chain", RunnableLambda(lambda inputs: None, afunc=run))
+    monkeypatch.setenv("NT_AI_BATCH_CONCURRENCY", "2")
+    return calls, running
+
+
+def _post(queries):
+    return TestClient(main.app).post("/parse-queries", json={"queries": queries})
+
+
+def test_each_item_has_its_own_status(stub):
+    response = _post(["notas para SP", "bom dia", "erro", "", "notas retidas", "notas rodando"])
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [item["status"] for item in results] == [200, 400, 500, 400, 503, 200]
+    assert results[0]["result"] == {"UFDestino": "SP"} and results[0]["degraded"] is False
+    assert results[5]["degraded"] is True
+
+
+def test_identical_queries_run_once(stub):
+    calls, _ = stub
+    response = _post(["notas para SP", "Notas para SP ", "notas  para sp"]).json()
+    assert response["distinct_queries"] == 1
+    assert [query for query, _ in calls] == ["notas para SP"]
+    assert [item["result"] for item in response["results"]] == [{"UFDestino": "SP"}] * 3
+
+
+def test_batch_runs_with_bounded_concurrency_and_batch_priority(stub):
+    calls, running = stub
+    _post(list(RESULTS))
+    assert {priority for _, priority in calls} == {"batch"}
+    assert running["max"] == 2
+
+
+@pytest.mark.parametrize("queries", [[], ["notas"] * 101])
+def test_invalid_batches_are_rejected(stub, queries):
+    calls, _ = stub
+    assert _post(queries).status_code == 400
+    assert calls == []
@@ -0,0 +1,61 @@
+from datetime import datetime
+
+import pytest
+
+from app.chains import master_chain
+from app.chains.master_chain import _compute_dates, _get_current_dates, _snapshot_prompt
+from app.chains.prompt_snapshot import PromptSnapshot
+from app.prompts.filter_prompts import JSON_PARSER_PROMPT, QUERY_ENHANCER_PROMPT
+
+DAY = _compute_dates(datetime(2025, 9, 17))
+NEXT_DAY = _compute_dates(datetime(2025, 9, 18))
+
+
+@pytest.mark.parametrize("prompt, variable", [
+    (QUERY_ENHANCER_PROMPT, "query"),
+    (JSON_PARSER_PROMPT, "enhanced_query"),
+])
+def test_snapshot_matches_the_template(prompt, variable):
+    snapshot = PromptSnapshot(prompt, variable)
+    inputs = {**DAY, variable: "notas {rodando} hoje"}
+    assert snapshot.render(inputs) == prompt.format(**inputs)
+    assert snapshot.invoke_prompt(inputs) == prompt.invoke(inputs)
+
+
+def test_prefix_rendered_once_per_day():
+    snapshot = PromptSnapshot(JSON_PARSER_PROMPT, "enhanced_query")
+    for query in ("notas rodando", "nota 123", "notas entregues"):
+        snapshot.render({**DAY, "enhanced_query": query})
+    assert snapshot.renders == 1
+
+
+def test_date_rollover_rerenders_the_prefix():
+    snapshot = PromptSnapshot(JSON_PARSER_PROMPT, "enhanced_query")
+    stale = snapshot.render({**DAY, "enhanced_query": "notas de hoje"})
+    rendered = snapshot.render({**NEXT_DAY, "enhanced_query": "notas de hoje"})
+
+    assert snapshot.renders == 2
+    assert rendered == JSON_PARSER_PROMPT.format(**NEXT_DAY, enhanced_query="notas de hoje")
+    assert rendered != stale
+
+
+def test_chain_snapshot_follows_the_date_context_across_midnight(monkeypatch):
+    class _Clock(datetime):
+        current = datetime(2025, 9, 17, 23, 59)
+
+        @classmethod
+        def now(cls, tz=None):
+            return cls.current.replace(tzinfo=tz)
+
+    monkeypatch.setattr(master_chain, "datetime", _Clock)
+    monkeypatch.setattr(master_chain, "_dates_snapshot", (None, None))
+    monkeypatch.setattr(master_chain, "_prompt_snapshots", {})
+    prompt = _snapshot_prompt(QUERY_ENHANCER_PROMPT, "query")
+
+    before = prompt.invoke({**_get_current_dates({}), "query": "notas de hoje"}).to_string()
+    _Clock.current = datetime(2025, 9, 18, 0, 1)
+    after = prompt.invoke({**_get_current_dates({}), "query": "notas de hoje"}).to_string()
+
+    assert before == QUERY_ENHANCER_PROMPT.format(**DAY, query="notas de hoje")
+    assert after == QUERY_ENHANCER_PROMPT.format(**NEXT_DAY, query="notas de hoje")
+    assert master_chain._prompt_snapshots[QUERY_ENHANCER_PROMPT.template].renders == 2
@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+from app.core import rate_limiter
+from app.core.rate_limiter import RateScheduler, TokenBucket, is_rate_limit_error
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.now += seconds
+        await _real_sleep(0)
+
+
+_real_sleep = asyncio.sleep
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", fake)
+    monkeypatch.setattr(rate_limiter.asyncio, "sleep", fake.sleep)
+    return fake
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+def test_token_bucket_refills_continuously(clock):
+    bucket = TokenBucket(60)
+    bucket.take(60)
+    assert bucket.wait_time(1, clock.now) == pytest.approx(1.0)
+    clock.now += 1
+    assert bucket.wait_time(1, clock.now) == 0.0
+
+
+def test_unlimited_bucket_never_waits(clock):
+    assert TokenBucket(0).wait_time(10_000, clock.now) == 0.0
+
+
+def test_priority_lanes_are_served_in_order(clock):
+    scheduler = RateScheduler("groq", rpm=1)
+    scheduler.requests.take(1)
+    order = []
+
+    async def call(priority):
+        await scheduler.aacquire(10, priority)
+        order.append(priority)
+
+    async def main():
+        await asyncio.gather(call("batch"), call("debug"), call("production"))
+
+    asyncio.run(main())
+    assert order == ["production", "debug", "batch"]
+    stats = scheduler.stats()
+    assert stats["granted"] == {"production": 1, "debug": 1, "batch": 1}
+    assert stats["queue_depth"] == 0
+
+
+def test_token_budget_delays_the_next_call(clock):
+    scheduler = RateScheduler("groq", tpm=600)
+    scheduler.acquire(600)
+    start = clock.now
+    asyncio.run(scheduler.aacquire(300))
+    assert clock.now - start == pytest.approx(30, abs=0.1)
+
+
+def test_rate_limit_backoff_doubles_and_resets(clock):
+    scheduler = RateScheduler("google", max_backoff_seconds=3)
+    for backoff in (1.0, 2.0, 3.0):
+        scheduler.record_failure(RateLimitError())
+        assert scheduler.stats()["backoff_seconds"] == backoff
+    ticket = scheduler._enqueue("production", 10)
+    assert scheduler._try_acquire(ticket, 10, 0) > 0
+    clock.now += 3
+    assert scheduler._try_acquire(ticket, 10, 0) == 0
+    scheduler.record_success(10, None)
+    assert scheduler.stats()["backoff_seconds"] == 0.0
+    assert scheduler.stats()["rate_limited"] == 3
+
+
+def test_other_errors_do_not_back_off(clock):
+    scheduler = RateScheduler("google")
+    scheduler.record_failure(TimeoutError("lento"))
+    assert scheduler.stats()["rate_limited"] == 0
+
+
+@pytest.mark.parametrize("error, expected", [
+    (RateLimitError(), True),
+    (RuntimeError("429 RESOURCE_EXHAUSTED"), True),
+    (RuntimeError("Rate limit reached for model"), True),
+    (ValueError("json inválido"), False),
+])
+def test_is_rate_limit_error(error, expected):
+    assert is_rate_limit_error(error) is expected
+
+
+def test_cancelled_waiter_leaves_the_queue(clock):
+    scheduler = RateScheduler("groq", rpm=1)
+    scheduler.requests.take(1)
+
+    async def main():
+        task = asyncio.ensure_future(scheduler.aacquire(10, "batch"))
+        await _real_sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert scheduler.stats()["queue_depth"] == 0
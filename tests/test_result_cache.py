@@ -0,0 +1,61 @@
+from datetime import datetime
+
+from app.chains.master_chain import _compute_dates
+from app.chains.result_cache import ResultCache, materialize_dates, pipeline_fingerprint, symbolize_dates
+
+DATES = _compute_dates(datetime(2025, 9, 17))
+NEXT_WEEK = _compute_dates(datetime(2025, 9, 24))
+
+
+def test_symbolize_and_materialize():
+    result = {"DE": "2025-09-15", "ATE": "2025-09-21", "SituacaoNF": "TRÂNSITO"}
+    symbolic = symbolize_dates(result, DATES)
+    assert symbolic == {"DE": "{week_start}", "ATE": "{week_end}", "SituacaoNF": "TRÂNSITO"}
+    assert materialize_dates(symbolic, NEXT_WEEK)["DE"] == "2025-09-22"
+
+
+def test_symbolize_unknown_period():
+    assert symbolize_dates({"DE": "2025-09-10", "ATE": "2025-09-17"}, DATES) is None
+
+
+def test_symbolize_without_dates():
+    assert symbolize_dates({"DE": None, "ATE": None, "NF": "123"}, DATES) == {"DE": None, "ATE": None, "NF": "123"}
+
+
+def test_explicit_dates_are_not_symbolized():
+    # O armazém datado expira na meia-noite seguinte ao 'today' do contexto: usa o dia atual.
+    today = _compute_dates(datetime.now())
+    result = {"DE": today["today"], "ATE": today["today"]}
+    cache = ResultCache()
+    cache.set(f"notas de {today['today']}", today, result)
+    assert cache.get(f"notas de {today['today']}", today) == result
+    assert cache.get(f"notas de {today['today']}", NEXT_WEEK) is None
+
+
+def test_month_names_in_client_names_are_not_explicit_dates():
+    cache = ResultCache()
+    cache.set("notas do cliente Marco Aurelio de hoje", DATES, {"Cliente": "Marco Aurelio", "DE": "2025-09-17", "ATE": "2025-09-17"})
+    assert cache.get("notas do cliente Marco Aurelio de hoje", NEXT_WEEK)["DE"] == "2025-09-24"
+
+
+def test_relative_dates_follow_the_calendar():
+    cache = ResultCache()
+    cache.set("notas de hoje", DATES, {"DE": "2025-09-17", "ATE": "2025-09-17"})
+    assert cache.get("notas de hoje", NEXT_WEEK) == {"DE": "2025-09-24", "ATE": "2025-09-24"}
+
+
+def test_fingerprint_changes_with_behavior_flags(monkeypatch):
+    before = pipeline_fingerprint()
+    monkeypatch.setenv("NT_AI_PIPELINE_MODE", "single_call")
+    assert pipeline_fingerprint() != before
+    monkeypatch.setenv("NT_AI_PIPELINE_MODE", "two_stage")
+    monkeypatch.setenv("NT_AI_SPARSE_OUTPUT", "true")
+    assert pipeline_fingerprint() != before
+
+
+def test_cache_ignores_entries_from_another_pipeline(monkeypatch):
+    cache = ResultCache()
+    cache.set("notas retidas", DATES, {"SituacaoNF": "RETIDA"})
+    monkeypatch.setenv("NT_AI_STRUCTURED_OUTPUT", "true")
+    cache.fingerprint = pipeline_fingerprint()
+    assert cache.get("notas retidas", DATES) is None
@@ -0,0 +1,29 @@
+import pytest
+
+from app.chains.rule_enhancer import RuleBasedEnhancer
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("nf 123", "Nota fiscal 123"),
+    ("nfs de hoje", "Notas fiscais de hoje"),
+    ("nf-e 123", "Nf-e 123"),
+    ("notas para SP", "Notas para o estado de São Paulo"),
+    ("notas SP", "Notas para o estado de São Paulo"),
+    ("notas com SP", "Notas com SP"),
+    ("notas exceto SP", "Notas exceto SP"),
+    ("notas rodando", "Notas em trânsito"),
+    ("notas previstas para amanhã", "Notas com status de análise DIA SEGUINTE"),
+])
+def test_rewrite(query, expected):
+    assert RuleBasedEnhancer().enhance(query) == (expected, False)
+
+
+@pytest.mark.parametrize("query", [
+    "notas rodando e retidas",
+    "agendadas previstas para amanhã",
+    "notas entregues previstas para hoje",
+])
+def test_ambiguous_queries_are_preserved(query):
+    rewritten, ambiguous = RuleBasedEnhancer().enhance(query)
+    assert ambiguous
+    assert rewritten == query[:1].upper() + query[1:]
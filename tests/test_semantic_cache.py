@@ -0,0 +1,86 @@
+import pytest
+
+from app.chains.semantic_cache import SemanticCache
+
+
+@pytest.fixture
+def cache_factory(monkeypatch):
+    def _make(**env):
+        monkeypatch.setenv("NT_AI_SEMANTIC_CACHE_ENABLED", "true")
+        for name, value in env.items():
+            monkeypatch.setenv(f"NT_AI_SEMANTIC_CACHE_{name}", str(value))
+        return SemanticCache()
+    return _make
+
+
+def test_synonyms_share_the_cached_result(cache_factory):
+    cache = cache_factory()
+    cache.add("notas rodando", {"SituacaoNF": "TRÂNSITO"})
+    assert cache.lookup("nf rodando") == {"SituacaoNF": "TRÂNSITO"}
+
+
+def test_different_nf_numbers_never_collide(cache_factory):
+    cache = cache_factory()
+    cache.add("nota 123", {"NF": 123})
+    assert cache.lookup("nota 124") is None
+    assert cache.lookup("nf 123") == {"NF": 123}
+
+
+def test_different_cnpj_roots_never_collide(cache_factory):
+    cache = cache_factory()
+    cache.add("notas da transportadora 12.345.678", {"CNPJRaizTransp": "12345678"})
+    assert cache.lookup("notas da transportadora 12.345.679") is None
+    assert cache.lookup("nfs da transportadora 12.345.678") == {"CNPJRaizTransp": "12345678"}
+
+
+def test_unprotected_nf_collides(cache_factory):
+    # Sem o NF na assinatura os números viram texto comparável e "nota 123" acerta "nota 124":
+    # é a proteção do campo que impede a colisão.
+    cache = cache_factory(PROTECTED_FIELDS="CNPJRaizTransp", THRESHOLD=0.5)
+    cache.add("nota 123", {"NF": 123})
+    assert cache.lookup("nota 124") == {"NF": 123}
+
+
+def test_lru_eviction(cache_factory):
+    cache = cache_factory(MAX_SIZE=2)
+    cache.add("notas rodando", {"SituacaoNF": "TRÂNSITO"})
+    cache.add("notas entregues", {"SituacaoNF": "ENTREGUE"})
+    assert cache.lookup("nf rodando") is not None
+    cache.add("notas canceladas", {"SituacaoNF": "CANCELADA"})
+
+    assert cache.lookup("nf entregues") is None
+    assert cache.lookup("nf rodando") == {"SituacaoNF": "TRÂNSITO"}
+    stats = cache.stats()
+    assert stats["size"] == 2
+    assert stats["evictions"] == 1
+    # O IDF não guarda n-gramas das entradas descartadas.
+    assert sum(cache._document_frequency.values()) == sum(
+        len(grams) for _, grams, _ in cache._entries.values()
+    )
+
+
+def test_similarity_histogram(cache_factory):
+    cache = cache_factory()
+    assert cache.lookup("notas rodando") is None
+    cache.add("notas rodando", {"SituacaoNF": "TRÂNSITO"})
+    assert cache.lookup("nf rodando") is not None
+    assert cache.lookup("nota 123") is None
+
+    stats = cache.stats()
+    assert stats["similarity_histogram"] == {"sem_candidatos": 2, "<=1.0": 1}
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 2, 0.3333)
+
+
+def test_similarity_below_threshold_lands_in_lower_bucket(cache_factory):
+    cache = cache_factory()
+    cache.add("quais notas estao rodando agora", {"SituacaoNF": "TRÂNSITO"})
+    assert cache.lookup("notas rodando") is None
+    assert cache.stats()["similarity_histogram"] == {"<0.6": 1}
+
+
+def test_disabled_cache_is_inert(monkeypatch):
+    monkeypatch.setenv("NT_AI_SEMANTIC_CACHE_ENABLED", "false")
+    cache = SemanticCache()
+    cache.add("notas rodando", {"SituacaoNF": "TRÂNSITO"})
+    assert cache.lookup("notas rodando") is None
+    assert cache.stats()["size"] == 0
@@ -0,0 +1,123 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from app.chains import master_chain
+from app.chains.master_chain import _with_single_flight
+from app.chains.model_router import TIER_FAST, TIER_METADATA_KEY, TIER_STRONG
+from app.core.rate_limiter import PRIORITY_METADATA_KEY
+from app.core.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    group, runs = SingleFlight("test"), []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return {"UFDestino": "SP"}
+
+    async def main():
+        return await asyncio.gather(*(group.ado("key", work, calls_per_execution=2) for _ in range(3)))
+
+    results = asyncio.run(main())
+    assert runs == [1] and results == [{"UFDestino": "SP"}] * 3
+    assert results[1] is not results[0]
+    assert group.stats() == {"executions": 1, "coalesced_requests": 2, "llm_calls_saved": 4, "in_flight": 0}
+
+
+def test_followers_receive_the_leader_error():
+    group = SingleFlight("test")
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise TimeoutError("provedor")
+
+    async def main():
+        return await asyncio.gather(group.ado("key", work), group.ado("key", work), return_exceptions=True)
+
+    assert all(isinstance(result, TimeoutError) for result in asyncio.run(main()))
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    group, release = SingleFlight("test"), None
+
+    async def work():
+        await release.wait()
+        return "ok"
+
+    async def main():
+        nonlocal release
+        release = asyncio.Event()
+        leader = asyncio.ensure_future(group.ado("key", work))
+        follower = asyncio.ensure_future(group.ado("key", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return await follower
+
+    assert asyncio.run(main()) == "ok"
+
+
+def test_sync_calls_share_one_execution():
+    group, started, release, runs = SingleFlight("test"), threading.Event(), threading.Event(), []
+
+    def work():
+        runs.append(1)
+        started.set()
+        release.wait()
+        return "ok"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(group.do("key", work)))
+    leader.start()
+    started.wait()
+    follower = threading.Thread(target=lambda: results.append(group.do("key", work)))
+    follower.start()
+    while group.stats()["coalesced_requests"] == 0:
+        time.sleep(0.001)
+    release.set()
+    leader.join(), follower.join()
+    assert runs == [1] and results == ["ok", "ok"]
+
+
+@pytest.fixture
+def coalesced_chain(monkeypatch):
+    monkeypatch.setattr(master_chain, "_single_flights", {})
+    runs = []
+
+    async def run(inputs):
+        runs.append(inputs["query"])
+        await asyncio.sleep(0.01)
+        return {"parsed_json": {}, "path": "llm"}
+
+    return _with_single_flight(RunnableLambda(lambda inputs: None, afunc=run), "test"), runs
+
+
+def _metadata(priority=None, tier=None):
+    metadata = {}
+    if priority:
+        metadata[PRIORITY_METADATA_KEY] = priority
+    if tier:
+        metadata[TIER_METADATA_KEY] = tier
+    return {"metadata": metadata}
+
+
+@pytest.mark.parametrize("configs, executions", [
+    ([_metadata(), _metadata()], 1),
+    ([_metadata("production"), _metadata("batch")], 2),
+    ([_metadata(tier=TIER_FAST), _metadata(tier=TIER_STRONG)], 2),
+    ([_metadata("batch", TIER_FAST), _metadata("batch", TIER_FAST)], 1),
+])
+def test_key_includes_priority_and_tier(coalesced_chain, configs, executions):
+    chain, runs = coalesced_chain
+
+    async def main():
+        await asyncio.gather(*(chain.ainvoke({"query": "Notas para SP"}, config=config) for config in configs))
+
+    asyncio.run(main())
+    assert len(runs) == executions
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from app.chains.speculative import SpeculativeParser, light_normalize, speculation_key
+
+
+def _parser_inputs(inputs, text):
+    return {"enhanced_query": text}
+
+
+class Stubs:
+    """
+    Enhancer e Parser de teste: o Enhancer devolve `enhanced`; o Parser registra cada texto
+    recebido e marca as execuções canceladas.
+    """
+
+    def __init__(self, enhanced, parser_error=None):
+        self.enhanced, self.parser_error = enhanced, parser_error
+        self.parsed, self.cancelled = [], []
+
+    def enhancer(self):
+        async def run(inputs):
+            await asyncio.sleep(0.01)
+            return self.enhanced
+        return RunnableLambda(lambda inputs: self.enhanced, afunc=run)
+
+    def parser(self):
+        async def run(inputs):
+            text = inputs["enhanced_query"]
+            self.parsed.append(text)
+            try:
+                await asyncio.sleep(0.05 if len(self.parsed) == 1 else 0)
+            except asyncio.CancelledError:
+                self.cancelled.append(text)
+                raise
+            if self.parser_error and len(self.parsed) == 1:
+                raise self.parser_error
+            return {"texto": text}
+
+        def run_sync(inputs):
+            self.parsed.append(inputs["enhanced_query"])
+            return {"texto": inputs["enhanced_query"]}
+        return RunnableLambda(run_sync, afunc=run)
+
+    def speculative(self):
+        return SpeculativeParser(self.enhancer(), self.parser(), _parser_inputs)
+
+
+def test_keys_ignore_case_accents_and_punctuation():
+    assert speculation_key("Notas em trânsito?") == speculation_key("notas  em transito")
+    assert light_normalize("  notas   rodando ") == "notas rodando"
+
+
+def test_equivalent_enhancement_uses_the_speculative_parse():
+    stubs = Stubs("Notas em trânsito.")
+    speculative = stubs.speculative()
+    result = asyncio.run(speculative.ainvoke({"query": "notas em  transito"}, {}))
+    assert result == {"enhanced_query": "Notas em trânsito.", "parsed_json": {"texto": "notas em transito"}}
+    assert stubs.parsed == ["notas em transito"]
+    assert speculative.stats()["hits"] == 1
+
+
+def test_different_enhancement_discards_the_speculative_parse():
+    stubs = Stubs("Notas fiscais em trânsito")
+    speculative = stubs.speculative()
+    result = asyncio.run(speculative.ainvoke({"query": "notas rodando"}, {}))
+    assert result["parsed_json"] == {"texto": "Notas fiscais em trânsito"}
+    assert stubs.parsed == ["notas rodando", "Notas fiscais em trânsito"]
+    assert stubs.cancelled == ["notas rodando"]
+    assert speculative.stats()["discarded"] == 1
+
+
+def test_failed_speculative_parse_falls_back_to_the_normal_parse():
+    stubs = Stubs("notas rodando", parser_error=TimeoutError("provedor"))
+    result = asyncio.run(stubs.speculative().ainvoke({"query": "notas rodando"}, {}))
+    assert result["parsed_json"] == {"texto": "notas rodando"}
+    assert len(stubs.parsed) == 2
+
+
+def test_enhancer_error_cancels_the_speculative_parse():
+    stubs = Stubs(None)
+
+    async def fail(inputs):
+        raise ConnectionError("provedor")
+
+    speculative = SpeculativeParser(RunnableLambda(lambda x: x, afunc=fail), stubs.parser(), _parser_inputs)
+
+    async def main():
+        with pytest.raises(ConnectionError):
+            await speculative.ainvoke({"query": "notas rodando"}, {})
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    assert stubs.cancelled == ["notas rodando"]
+
+
+def test_sync_invoke_discards_a_different_enhancement():
+    stubs = Stubs("Notas fiscais retidas")
+    result = stubs.speculative().invoke({"query": "notas bloqueadas"}, {})
+    assert result["parsed_json"] == {"texto": "Notas fiscais retidas"}